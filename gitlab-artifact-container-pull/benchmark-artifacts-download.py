@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for gitlab-artifacts-download.py.
+
+Starts fake-gitlab.py in-process on a free port and times the downloader's
+hot paths against it:
+
+  resolve/*    job-name resolution with the target job N jobs deep, through
+               the branch's pipelines and through the project job list
+  download/*   artifact download throughput with 1 and N connections
+  stream/*     streaming download + extraction (no zip on disk), and a
+               stream that has to fall back to a downloaded zip after piping
+               its first member into a sink (checked to be piped only once)
+  extract      extraction of an already downloaded artifacts.zip
+  vat/*        VAT rendering (text, long text, json) of a large response
+
+Each case runs --repeat times and the median is reported.  --save writes the
+results as a JSON baseline; --baseline compares against one and exits 1 when
+any case got slower by more than --threshold.
+
+    ./benchmark-artifacts-download.py --save baseline.json
+    # ... change gitlab-artifacts-download.py ...
+    ./benchmark-artifacts-download.py --baseline baseline.json
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import logging
+import os
+import shutil
+import statistics
+import struct
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+log = logging.getLogger(__name__)
+
+
+def load_script(name: str, filename: str):
+    """Import one of the hyphenated scripts next to this file as a module."""
+    spec = importlib.util.spec_from_file_location(name, HERE / filename)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+gad = load_script("gitlab_artifacts_download", "gitlab-artifacts-download.py")
+fake_gitlab = load_script("fake_gitlab", "fake-gitlab.py")
+
+logging.basicConfig(format="%(message)s", level=logging.INFO, force=True)
+for name in ("gitlab_artifacts_download", "fake_gitlab", "urllib3"):
+    logging.getLogger(name).setLevel(logging.ERROR)
+
+RESOLVE_PROJECT_BASE = 20000
+IMAGE_PROJECT = 30001
+VAT_PROJECT = 30002
+
+
+def timed(fn, repeat: int, setup=None) -> list[float]:
+    """Run fn repeat times (after setup, which isn't timed) and return the durations."""
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def result(name: str, times: list[float], size: int | None = None, **extra) -> dict:
+    median = statistics.median(times)
+    entry = {"name": name, "seconds": round(median, 6), "min": round(min(times), 6), "runs": len(times), **extra}
+    if size:
+        entry["mb_per_s"] = round(size / median / 1024**2, 1)
+    return entry
+
+
+def bench_resolve(client, depths: list[int], repeat: int, branch: str) -> list[dict]:
+    results = []
+    for depth in depths:
+        project_id = RESOLVE_PROJECT_BASE + depth
+        for path, ref in (("pipelines", branch), ("jobs", "")):
+            found = []
+
+            def run():
+                found[:] = [gad.get_latest_job_id_by_name(client, project_id, "create-tar", ref, scope=["success"])]
+
+            times = timed(run, repeat)
+            if not found[0]:
+                raise gad.ArtifactError(f"resolve/{path}/depth={depth}: create-tar job not found")
+            results.append(result(f"resolve/{path}/depth={depth}", times, depth=depth))
+    return results
+
+
+def bench_download(client, job_id: int, size: int, work: Path, connections: int, repeat: int) -> list[dict]:
+    url = f"/projects/{IMAGE_PROJECT}/jobs/{job_id}/artifacts"
+    dest = work / "artifacts.zip"
+
+    def clean():
+        for path in (dest, work / "artifacts.zip.part", work / "artifacts.zip.part.json"):
+            path.unlink(missing_ok=True)
+
+    results = []
+    for n in sorted({1, connections}):
+        times = timed(lambda: gad.download_file(client, url, dest, connections=n, label="bench"), repeat, clean)
+        results.append(result(f"download/connections={n}", times, size))
+    return results
+
+
+def bench_stream(client, job_id: int, size: int, work: Path, repeat: int) -> list[dict]:
+    out = work / "stream"
+
+    def run():
+        gad.download_and_extract(client, IMAGE_PROJECT, job_id, out, clean_output_dir=True, stream_extract=True)
+
+    return [result("stream/all", timed(run, repeat), size)]
+
+
+def _descriptor_zip(members: list[tuple[str, bytes]]) -> bytes:
+    """
+    A stored zip as written to a pipe, every member followed by a data
+    descriptor, with the last descriptor's (optional) signature left out so
+    the streaming extractor can't find the end of that member.
+    """
+
+    class Pipe(io.RawIOBase):
+        def __init__(self) -> None:
+            self.data = bytearray()
+
+        def writable(self) -> bool:
+            return True
+
+        def write(self, b) -> int:
+            self.data += b
+            return len(b)
+
+    pipe = Pipe()
+    with gad.zipfile.ZipFile(pipe, "w", gad.zipfile.ZIP_STORED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+    data = pipe.data
+    eocd = data.rfind(gad._ZIP_EOCD)
+    cd_offset = struct.unpack_from("<I", data, eocd + 16)[0]
+    sig = data.rfind(gad._ZIP_DATA_DESCRIPTOR, data.rfind(gad._ZIP_LOCAL_HEADER, 0, cd_offset), cd_offset)
+    del data[sig : sig + 4]
+    struct.pack_into("<I", data, eocd - 4 + 16, cd_offset - 4)
+    return bytes(data)
+
+
+def bench_stream_fallback(client, fake, project_id: int, job: dict, work: Path, repeat: int) -> list[dict]:
+    tar_name, info_name = "ci-artifacts/tar/fallback-amd64.tar", "ci-artifacts/build-info.json"
+    tar, info = os.urandom(4 * 1024 * 1024), json.dumps({"job": job["id"]}).encode()
+    artifact = fake.artifact(project_id, job)
+    artifact.write_bytes(_descriptor_zip([(tar_name, tar), (info_name, info)]))
+    out = work / "fallback"
+    sunk = []
+
+    class Sink:
+        def __init__(self, name: str) -> None:
+            self.name = name
+            self.data = bytearray()
+
+        def write(self, data: bytes) -> None:
+            self.data += data
+
+        def close(self) -> None:
+            sunk.append((self.name, bytes(self.data)))
+
+    def run():
+        sunk.clear()
+        extracted = gad.download_and_extract(
+            client,
+            project_id,
+            job["id"],
+            out,
+            clean_output_dir=True,
+            stream_extract=True,
+            sink_for=lambda name: Sink(name) if name.endswith(".tar") else None,
+        )
+        if sunk != [(tar_name, tar)]:
+            raise gad.ArtifactError(f"stream/fallback: {tar_name} was piped {len(sunk)} time(s) or got mangled")
+        if [p.relative_to(out).as_posix() for p in extracted] != [info_name] or extracted[0].read_bytes() != info:
+            raise gad.ArtifactError(f"stream/fallback: {info_name} wasn't extracted intact")
+
+    return [result("stream/fallback", timed(run, repeat), artifact.stat().st_size)]
+
+
+def bench_extract(client, job_id: int, size: int, work: Path, repeat: int) -> list[dict]:
+    zip_path = work / "artifacts.zip"
+    if not zip_path.exists():
+        gad.download_file(client, f"/projects/{IMAGE_PROJECT}/jobs/{job_id}/artifacts", zip_path)
+    out = work / "extract"
+    times = timed(
+        lambda: gad._extract_zip(zip_path, out, None),
+        repeat,
+        lambda: shutil.rmtree(out, ignore_errors=True),
+    )
+    return [result("extract", times, size)]
+
+
+def bench_vat(client, job_id: int, work: Path, repeat: int) -> list[dict]:
+    out = work / "vat"
+    extracted = gad.download_and_extract(client, VAT_PROJECT, job_id, out, clean_output_dir=True)
+    size = sum(f.stat().st_size for f in extracted if f.suffix == ".json")
+    results = []
+    for name, kwargs in (
+        ("text", {}),
+        ("long", {"long_output": True, "show_parent": True}),
+        ("json", {"output_format": "json", "show_parent": True}),
+    ):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            times = timed(lambda: gad.handle_vat(extracted, **kwargs), repeat)
+        results.append(result(f"vat/{name}", times, size))
+    return results
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """Print a comparison against baseline; return the names of regressed cases."""
+    previous = {r["name"]: r for r in baseline.get("results", [])}
+    regressed = []
+    print(f"\n{'case':<32} {'baseline':>10} {'now':>10} {'change':>8}")
+    for r in results:
+        before = previous.get(r["name"])
+        if not before:
+            print(f"{r['name']:<32} {'-':>10} {r['seconds']:>10.4f} {'new':>8}")
+            continue
+        change = r["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressed.append(r["name"])
+            flag = "  REGRESSED"
+        print(f"{r['name']:<32} {before['seconds']:>10.4f} {r['seconds']:>10.4f} {change:>+8.1%}{flag}")
+    return regressed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark gitlab-artifacts-download.py against a local fake GitLab",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the median is reported (default: 3)")
+    parser.add_argument(
+        "--only",
+        action="append",
+        choices=["resolve", "download", "stream", "extract", "vat"],
+        help="Run only these groups (repeatable)",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        action="append",
+        help="Target job depth for resolve cases (repeatable, default: 5 50 250)",
+    )
+    parser.add_argument("--connections", type=int, default=4, help="Parallel connections for download (default: 4)")
+    parser.add_argument("--tar-mb", type=float, default=64, help="Image layer size of the benchmark artifact (default: 64)")
+    parser.add_argument("--vat-findings", type=int, default=20000, help="Findings in the VAT response (default: 20000)")
+    parser.add_argument("--latency", type=float, default=0.005, help="Fake API latency per request (default: 0.005)")
+    parser.add_argument(
+        "--bandwidth",
+        type=fake_gitlab.parse_size,
+        default=0,
+        help="Per-connection bandwidth limit, e.g. 50M (default: unlimited)",
+    )
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Probability an artifact transfer is cut off")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability an API request answers 503")
+    parser.add_argument("--data-dir", help="Keep generated artifacts here between runs (default: a temp dir)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--save", metavar="PATH", help="Write results as a baseline to PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare against a baseline written by --save")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="Relative slowdown vs --baseline that counts as a regression (default: 0.15)",
+    )
+    args = parser.parse_args()
+
+    groups = set(args.only or ["resolve", "download", "stream", "extract", "vat"])
+    depths = args.depth or [5, 50, 250]
+    work = Path(tempfile.mkdtemp(prefix="bench-gad-"))
+    data_dir = Path(args.data_dir) if args.data_dir else work / "fake-gitlab"
+    config = fake_gitlab.FakeConfig(
+        data_dir=data_dir,
+        jobs=max(depths) + 50,
+        project_depths={RESOLVE_PROJECT_BASE + d: d for d in depths},
+        tar_mb=args.tar_mb,
+        vat_findings=args.vat_findings,
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        drop_rate=args.drop_rate,
+        error_rate=args.error_rate,
+    )
+    server = fake_gitlab.start_server(config)
+    fake = server.fake
+    client = gad.GitLabClient(server.url, "benchmark", pool_size=max(10, args.connections * 2), backoff=0.01)
+    results = []
+    try:
+        image_job = fake.job(IMAGE_PROJECT, config.depth)
+        vat_job = fake.job(VAT_PROJECT, config.depth + 1)
+        if groups & {"download", "stream", "extract"}:
+            log.info(f"Preparing {args.tar_mb:g} MB image artifact...")
+        size = fake.artifact(IMAGE_PROJECT, image_job).stat().st_size
+        if "vat" in groups:
+            log.info(f"Preparing VAT artifact with {args.vat_findings} findings...")
+            fake.artifact(VAT_PROJECT, vat_job)
+
+        if "resolve" in groups:
+            results += bench_resolve(client, depths, args.repeat, config.branch)
+        if "download" in groups:
+            results += bench_download(client, image_job["id"], size, work, args.connections, args.repeat)
+        if "stream" in groups:
+            results += bench_stream(client, image_job["id"], size, work, args.repeat)
+            fallback_job = fake.job(IMAGE_PROJECT, config.depth + 2)
+            results += bench_stream_fallback(client, fake, IMAGE_PROJECT, fallback_job, work, args.repeat)
+        if "extract" in groups:
+            results += bench_extract(client, image_job["id"], size, work, args.repeat)
+        if "vat" in groups:
+            results += bench_vat(client, vat_job["id"], work, args.repeat)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(work, ignore_errors=True)
+
+    report = {
+        "python": sys.version.split()[0],
+        "config": {
+            "tar_mb": args.tar_mb,
+            "vat_findings": args.vat_findings,
+            "latency": args.latency,
+            "bandwidth": args.bandwidth,
+            "connections": args.connections,
+            "repeat": args.repeat,
+        },
+        "requests": fake.requests,
+        "results": results,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{'case':<32} {'median s':>10} {'min s':>10} {'MB/s':>8}")
+        for r in results:
+            print(f"{r['name']:<32} {r['seconds']:>10.4f} {r['min']:>10.4f} {r.get('mb_per_s', ''):>8}")
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2) + "\n")
+        log.info(f"Baseline written to {args.save}")
+    if args.baseline:
+        regressed = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if regressed:
+            log.error(f"{len(regressed)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Fake GitLab server for exercising and benchmarking gitlab-artifacts-download.py
+offline.
+
+Implements the slice of the GitLab v4 API the downloader uses (job and
+pipeline lists with pagination headers, job details, artifact archives and
+single artifact files) over synthetic projects, with configurable latency,
+bandwidth and failure injection.  Artifacts are generated on first use and
+kept in a data directory:
+
+  create-tar   a zip holding ci-artifacts/tar/<service>-<job>-amd64.tar, a
+               `docker save` style tarball with --tar-mb of incompressible layer
+  vat          a zip holding vat_response.json (--vat-findings findings) and
+               parent_vat_response.json (--parent-images images)
+  other jobs   a zip holding a small log file
+
+Every project has --jobs jobs, newest first, five per pipeline, all on
+--branch.  The newest successful create-tar and vat jobs sit --depth jobs
+deep (per project with --project-depth PID=DEPTH); shallower jobs of those
+names failed.  With --new-pipeline-every, a new pipeline is added to every
+project at that interval, which moves all of them along (for --watch).
+--rate-limit answers with GitLab's RateLimit-* headers and 429s.
+
+    ./fake-gitlab.py --port 8765 --tar-mb 512 --bandwidth 50M --drop-rate 0.1
+    GITLAB_URL=http://127.0.0.1:8765 GITLAB_ACCESS_TOKEN=x \\
+        ./gitlab-artifacts-download.py -p 18631 -j create-tar
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+logging.basicConfig(format="%(message)s", level=logging.INFO)
+log = logging.getLogger(__name__)
+
+JOB_NAMES = ("build", "test", "lint", "scan")
+NEW_PIPELINE_JOBS = ("scan", "build", "test", "create-tar", "vat")
+JOBS_PER_PIPELINE = 5
+SEND_CHUNK = 64 * 1024
+
+
+def parse_size(text: str) -> int:
+    """Parse a byte count with an optional K/M/G suffix (powers of 1024)."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)i?B?\s*", text, re.IGNORECASE)
+    if not m:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+    return int(float(m.group(1)) * 1024 ** " KMG".index(m.group(2).upper() or " "))
+
+
+@dataclass
+class FakeConfig:
+    data_dir: Path
+    jobs: int = 300
+    depth: int = 50
+    project_depths: dict[int, int] = field(default_factory=dict)
+    branch: str = "development"
+    per_page_max: int = 100
+    tar_mb: float = 64
+    vat_findings: int = 20000
+    parent_images: int = 3
+    latency: float = 0.0
+    bandwidth: int = 0
+    drop_rate: float = 0.0
+    error_rate: float = 0.0
+    ranges: bool = True
+    redirect: bool = True
+    new_pipeline_every: float = 0.0
+    rate_limit: int = 0
+    seed: int = 0
+
+
+class FakeGitLab:
+    """Synthetic projects/jobs plus lazily generated artifacts for FakeConfig."""
+
+    def __init__(self, config: FakeConfig) -> None:
+        self.config = config
+        self.random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._building: dict[Path, threading.Lock] = {}
+        self.requests = 0
+        self.started = time.monotonic()
+        self._window = (0, 0)  # (minute, requests in it) for --rate-limit
+        config.data_dir.mkdir(parents=True, exist_ok=True)
+
+    def job_count(self) -> int:
+        if not self.config.new_pipeline_every:
+            return self.config.jobs
+        return self.config.jobs + JOBS_PER_PIPELINE * int((time.monotonic() - self.started) / self.config.new_pipeline_every)
+
+    def rate_limit(self) -> dict | None:
+        """RateLimit-* headers for one more request (with Retry-After once exhausted), or None without --rate-limit."""
+        if not self.config.rate_limit:
+            return None
+        now = time.time()
+        minute = int(now // 60)
+        with self._lock:
+            count = self._window[1] + 1 if self._window[0] == minute else 1
+            self._window = (minute, count)
+        headers = {
+            "RateLimit-Limit": self.config.rate_limit,
+            "RateLimit-Remaining": max(0, self.config.rate_limit - count),
+            "RateLimit-Reset": (minute + 1) * 60,
+        }
+        if count > self.config.rate_limit:
+            headers["Retry-After"] = int((minute + 1) * 60 - now) + 1
+        return headers
+
+    # --- jobs and pipelines ---------------------------------------------
+
+    def job_id(self, project_id: int, index: int) -> int:
+        return project_id * 100000 + self.job_count() - index
+
+    def job(self, project_id: int, index: int) -> dict:
+        """The job `index` positions from the newest (0) in project_id."""
+        added = self.job_count() - self.config.jobs
+        if index < added:
+            # pipelines added by --new-pipeline-every: every one builds and scans successfully
+            name, status = NEW_PIPELINE_JOBS[(added - index) % JOBS_PER_PIPELINE], "success"
+        else:
+            index -= added
+            depth = self.config.project_depths.get(project_id, self.config.depth)
+            name = JOB_NAMES[index % len(JOB_NAMES)]
+            status = "success" if index % 3 else "failed"
+            if index == depth:
+                name, status = "create-tar", "success"
+            elif index == depth + 1:
+                name, status = "vat", "success"
+            elif index < depth and index % 7 == 0:
+                name, status = ("create-tar", "vat")[index % 2], "failed"
+            index += added
+        job_id = self.job_id(project_id, index)
+        pipeline_id = project_id * 10000 + (self.job_count() - index - 1) // JOBS_PER_PIPELINE
+        return {
+            "id": job_id,
+            "name": name,
+            "status": status,
+            "ref": self.config.branch,
+            "stage": "build",
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_700_000_000 + job_id % 100000 * 60)),
+            "pipeline": {"id": pipeline_id, "ref": self.config.branch, "status": "success"},
+        }
+
+    def jobs(self, project_id: int) -> list[dict]:
+        return [self.job(project_id, i) for i in range(self.job_count())]
+
+    def find_job(self, project_id: int, job_id: int) -> dict | None:
+        count = self.job_count()
+        index = count - (job_id - project_id * 100000)
+        if job_id // 100000 != project_id or not 0 <= index < count:
+            return None
+        return self.job(project_id, index)
+
+    def pipelines(self, project_id: int) -> list[dict]:
+        seen: dict[int, dict] = {}
+        for job in self.jobs(project_id):
+            pipeline = job["pipeline"]
+            seen.setdefault(pipeline["id"], {**pipeline, "updated_at": job["created_at"]})
+        return list(seen.values())
+
+    # --- artifacts -------------------------------------------------------
+
+    def artifact(self, project_id: int, job: dict) -> Path:
+        """Path of the artifact zip of job, generating it on first use."""
+        path = self.config.data_dir / f"{project_id}-{job['id']}-{job['name']}.zip"
+        with self._lock:
+            lock = self._building.setdefault(path, threading.Lock())
+        with lock:
+            if not path.exists():
+                started = time.monotonic()
+                tmp = path.with_suffix(".tmp")
+                if job["name"] == "create-tar":
+                    self._write_image_artifact(tmp, project_id, job["id"])
+                elif job["name"] == "vat":
+                    self._write_vat_artifact(tmp, project_id, job["id"])
+                else:
+                    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zf:
+                        zf.writestr("logs/job.log", f"job {job['id']} ({job['name']}) ok\n" * 100)
+                os.replace(tmp, path)
+                log.info(f"generated {path.name} ({path.stat().st_size} bytes) in {time.monotonic() - started:.1f}s")
+        return path
+
+    def _write_image_artifact(self, path: Path, project_id: int, job_id: int) -> None:
+        layer_size = int(self.config.tar_mb * 1024 * 1024)
+        rng = random.Random(job_id)
+        config_json = json.dumps({"architecture": "amd64", "os": "linux", "job": job_id}).encode()
+        config_digest = hashlib.sha256(config_json).hexdigest()
+        layer_dir = hashlib.sha256(str(job_id).encode()).hexdigest()
+        manifest = json.dumps(
+            [
+                {
+                    "Config": f"{config_digest}.json",
+                    "RepoTags": [f"fake/service-{project_id}:{job_id}"],
+                    "Layers": [f"{layer_dir}/layer.tar"],
+                }
+            ]
+        ).encode()
+        with tempfile.TemporaryFile(dir=self.config.data_dir) as layer:
+            remaining = layer_size
+            while remaining:
+                n = min(remaining, 1024 * 1024)
+                layer.write(rng.randbytes(n))
+                remaining -= n
+            with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+                tar_name = f"ci-artifacts/tar/service-{project_id}-{job_id}-amd64.tar"
+                with zf.open(zipfile.ZipInfo(tar_name, time.gmtime(1_700_000_000)[:6]), "w", force_zip64=True) as out:
+                    with tarfile.open(fileobj=out, mode="w|") as tf:
+                        for name, data in ((f"{config_digest}.json", config_json), ("manifest.json", manifest)):
+                            info = tarfile.TarInfo(name)
+                            info.size = len(data)
+                            tf.addfile(info, io.BytesIO(data))
+                        info = tarfile.TarInfo(f"{layer_dir}/layer.tar")
+                        info.size = layer_size
+                        layer.seek(0)
+                        tf.addfile(info, layer)
+                zf.writestr("ci-artifacts/build-info.json", json.dumps({"job": job_id}))
+
+    def _vat_image(self, rng: random.Random, name: str, findings: int) -> dict:
+        severities = ("Critical", "High", "Medium", "Low", "")
+        statuses = ("Verified", "Needs Justification", "Justified", "Open")
+        return {
+            "imageName": name,
+            "tag": "latest",
+            "vatUrl": f"https://vat.example.org/{name}",
+            "snapshot": {"built": "2024-01-01T00:00:00Z"},
+            "state": {"abc": "Acceptable", "ora": "42", "percentVerified": 87, "factors": {"abc": {"issues": []}}},
+            "findings": [
+                {
+                    "findingId": i,
+                    "identifier": f"CVE-2024-{rng.randrange(100000):05d}",
+                    "severity": rng.choice(severities),
+                    "package": f"pkg-{rng.randrange(500)}",
+                    "packagePath": f"/usr/lib/pkg-{i % 97}" if i % 3 else None,
+                    "description": "Synthetic finding generated by fake-gitlab.py. " * rng.randrange(1, 6),
+                    "state": {"findingStatus": rng.choice(statuses)},
+                    "justificationGate": {"justification": "Not reachable."} if i % 11 == 0 else None,
+                }
+                for i in range(findings)
+            ],
+        }
+
+    def _write_vat_artifact(self, path: Path, project_id: int, job_id: int) -> None:
+        rng = random.Random(job_id)
+        findings = self.config.vat_findings
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            image = self._vat_image(rng, f"service-{project_id}", findings)
+            zf.writestr("vat_response.json", json.dumps({"image": image}))
+            parents = [
+                {"image": self._vat_image(rng, f"base-{project_id}-{n}", max(1, findings // 4))}
+                for n in range(self.config.parent_images)
+            ]
+            zf.writestr("parent_vat_response.json", json.dumps({"images": parents}))
+            zf.writestr("vat_request.json", json.dumps({"project": project_id, "job": job_id}))
+
+
+class FakeGitLabHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeGitLabServer"
+
+    def log_message(self, fmt: str, *args) -> None:
+        log.debug(fmt % args)
+
+    # --- helpers ---------------------------------------------------------
+
+    def _send(self, code: int, body: bytes = b"", headers: dict | None = None) -> None:
+        self.send_response(code)
+        for key, value in {**getattr(self, "rate_limit_headers", {}), **(headers or {})}.items():
+            self.send_header(key, str(value))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, data, headers: dict | None = None) -> None:
+        body = json.dumps(data).encode()
+        etag = f'W/"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, headers={"ETag": etag})
+            return
+        self._send(200, body, {"Content-Type": "application/json", "ETag": etag, **(headers or {})})
+
+    def _paginate(self, items: list, query: dict) -> None:
+        per_page = max(1, min(int(query.get("per_page", ["20"])[0]), self.server.fake.config.per_page_max))
+        page = max(1, int(query.get("page", ["1"])[0]))
+        total_pages = max(1, -(-len(items) // per_page))
+        headers = {
+            "X-Page": page,
+            "X-Per-Page": per_page,
+            "X-Total": len(items),
+            "X-Total-Pages": total_pages,
+            "X-Next-Page": page + 1 if page < total_pages else "",
+            "X-Prev-Page": page - 1 if page > 1 else "",
+        }
+        self._send_json(items[(page - 1) * per_page : page * per_page], headers)
+
+    def _send_file(self, path: Path) -> None:
+        """Serve path with Range/If-Range support, bandwidth limit and connection drops."""
+        config = self.server.fake.config
+        size = path.stat().st_size
+        stat = path.stat()
+        etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+        start, end, code = 0, size - 1, 200
+        spec = self.headers.get("Range", "")
+        if_range = self.headers.get("If-Range", "")
+        m = re.fullmatch(r"bytes=(\d*)-(\d*)", spec)
+        if config.ranges and m and (not if_range or if_range == etag):
+            first, last = m.groups()
+            if first:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            elif last:
+                start = max(0, size - int(last))
+            if start >= size:
+                self._send(416, headers={"Content-Range": f"bytes */{size}"})
+                return
+            code = 206
+        length = end - start + 1
+        self.send_response(code)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Length", str(length))
+        self.send_header("ETag", etag)
+        if config.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if code == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        drop_at = length // 2 if length > SEND_CHUNK and self.server.fake.random.random() < config.drop_rate else None
+        sent = 0
+        began = time.monotonic()
+        with open(path, "rb") as fh:
+            fh.seek(start)
+            while sent < length:
+                chunk = fh.read(min(SEND_CHUNK, length - sent))
+                if not chunk:
+                    break
+                if drop_at is not None and sent + len(chunk) > drop_at:
+                    self.wfile.write(chunk[: drop_at - sent])
+                    self.close_connection = True
+                    return
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if config.bandwidth:
+                    ahead = sent / config.bandwidth - (time.monotonic() - began)
+                    if ahead > 0:
+                        time.sleep(ahead)
+
+    # --- routing ---------------------------------------------------------
+
+    def do_HEAD(self) -> None:
+        self.do_GET()
+
+    def do_GET(self) -> None:
+        self.rate_limit_headers = {}
+        fake = self.server.fake
+        config = fake.config
+        with fake._lock:
+            fake.requests += 1
+        if config.latency:
+            time.sleep(config.latency)
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        m = re.fullmatch(r"/storage/(\d+)/(\d+)", url.path)
+        if m:
+            job = fake.find_job(int(m.group(1)), int(m.group(2)))
+            if job is None:
+                self._send(404)
+                return
+            self._send_file(fake.artifact(int(m.group(1)), job))
+            return
+
+        if not url.path.startswith("/api/v4/"):
+            self._send(404)
+            return
+        if not (self.headers.get("Authorization") or self.headers.get("PRIVATE-TOKEN")):
+            self._send(401, json.dumps({"message": "401 Unauthorized"}).encode())
+            return
+        limits = fake.rate_limit()
+        if limits and "Retry-After" in limits:
+            self._send(429, b'{"message": "429 Too Many Requests"}', limits)
+            return
+        self.rate_limit_headers = limits or {}
+        if config.error_rate and fake.random.random() < config.error_rate:
+            self._send(503, b'{"message": "503 Service Unavailable"}', {"Retry-After": "0"})
+            return
+
+        path = url.path[len("/api/v4") :]
+        m = re.fullmatch(r"/projects/(\d+)/(.*)", path)
+        if not m:
+            self._send(404)
+            return
+        project_id, rest = int(m.group(1)), m.group(2)
+        scope = set(query.get("scope[]", []))
+
+        if rest == "jobs":
+            jobs = [j for j in fake.jobs(project_id) if not scope or j["status"] in scope]
+            self._paginate(jobs, query)
+        elif rest == "pipelines":
+            ref = query.get("ref", [""])[0]
+            self._paginate([p for p in fake.pipelines(project_id) if not ref or p["ref"] == ref], query)
+        elif m := re.fullmatch(r"pipelines/(\d+)/jobs", rest):
+            pipeline_id = int(m.group(1))
+            jobs = [
+                j
+                for j in fake.jobs(project_id)
+                if j["pipeline"]["id"] == pipeline_id and (not scope or j["status"] in scope)
+            ]
+            self._paginate(jobs, query)
+        elif m := re.fullmatch(r"jobs/(\d+)(/artifacts(?:/(.+))?)?", rest):
+            job = fake.find_job(project_id, int(m.group(1)))
+            if job is None:
+                self._send(404, json.dumps({"message": "404 Job Not Found"}).encode())
+            elif not m.group(2):
+                artifact = fake.artifact(project_id, job)
+                self._send_json({**job, "artifacts_file": {"filename": "artifacts.zip", "size": artifact.stat().st_size}})
+            elif m.group(3):
+                with zipfile.ZipFile(fake.artifact(project_id, job)) as zf:
+                    try:
+                        body = zf.read(unquote(m.group(3)))
+                    except KeyError:
+                        self._send(404, json.dumps({"message": "404 File Not Found"}).encode())
+                        return
+                self._send(200, body, {"Content-Type": "application/octet-stream"})
+            elif config.redirect:
+                host = self.headers.get("Host", f"127.0.0.1:{self.server.server_address[1]}")
+                self._send(302, headers={"Location": f"http://{host}/storage/{project_id}/{job['id']}"})
+            else:
+                self._send_file(fake.artifact(project_id, job))
+        else:
+            self._send(404, json.dumps({"message": "404 Not Found"}).encode())
+
+
+class FakeGitLabServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], fake: FakeGitLab) -> None:
+        super().__init__(address, FakeGitLabHandler)
+        self.fake = fake
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_server(config: FakeConfig, host: str = "127.0.0.1", port: int = 0) -> FakeGitLabServer:
+    """Start a FakeGitLabServer on a background thread (port 0 picks a free port); stop with .shutdown()."""
+    server = FakeGitLabServer((host, port), FakeGitLab(config))
+    threading.Thread(target=server.serve_forever, name="fake-gitlab", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Fake GitLab API for offline tests and benchmarks of gitlab-artifacts-download.py",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Listen address (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Listen port (default: 8765)")
+    parser.add_argument("--data-dir", help="Where generated artifacts are kept (default: a temp dir)")
+    parser.add_argument("--jobs", type=int, default=300, help="Jobs per project (default: 300)")
+    parser.add_argument("--depth", type=int, default=50, help="Position of the newest successful create-tar job (default: 50)")
+    parser.add_argument(
+        "--project-depth",
+        action="append",
+        default=[],
+        metavar="PID=DEPTH",
+        help="Per-project --depth (repeatable)",
+    )
+    parser.add_argument("--branch", default="development", help="Ref of every job (default: development)")
+    parser.add_argument("--tar-mb", type=float, default=64, help="Image layer size in create-tar artifacts (default: 64)")
+    parser.add_argument("--vat-findings", type=int, default=20000, help="Findings in vat_response.json (default: 20000)")
+    parser.add_argument("--parent-images", type=int, default=3, help="Images in parent_vat_response.json (default: 3)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--bandwidth", type=parse_size, default=0, help="Per-connection artifact bandwidth, e.g. 20M (bytes/s)")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Probability an artifact transfer is cut off halfway")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability an API request answers 503")
+    parser.add_argument("--no-range", dest="ranges", action="store_false", help="Ignore Range requests")
+    parser.add_argument("--no-redirect", dest="redirect", action="store_false", help="Serve artifacts without the storage redirect")
+    parser.add_argument(
+        "--new-pipeline-every",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="Add a new pipeline to every project this often",
+    )
+    parser.add_argument("--rate-limit", type=int, default=0, help="API requests allowed per minute (RateLimit-* headers, 429s)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for failure injection")
+    args = parser.parse_args()
+
+    depths = {}
+    for item in args.project_depth:
+        pid, _, depth = item.partition("=")
+        depths[int(pid)] = int(depth)
+    data_dir = Path(args.data_dir) if args.data_dir else Path(tempfile.mkdtemp(prefix="fake-gitlab-"))
+    config = FakeConfig(
+        data_dir=data_dir,
+        jobs=args.jobs,
+        depth=args.depth,
+        project_depths=depths,
+        branch=args.branch,
+        tar_mb=args.tar_mb,
+        vat_findings=args.vat_findings,
+        parent_images=args.parent_images,
+        latency=args.latency,
+        bandwidth=args.bandwidth,
+        drop_rate=args.drop_rate,
+        error_rate=args.error_rate,
+        ranges=args.ranges,
+        redirect=args.redirect,
+        new_pipeline_every=args.new_pipeline_every,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+    )
+    server = FakeGitLabServer((args.host, args.port), FakeGitLab(config))
+    log.info(f"Fake GitLab listening on {server.url} (artifacts in {data_dir})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
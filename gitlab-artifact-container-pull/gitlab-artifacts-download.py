@@ -4,20 +4,59 @@ GitLab Artifacts Download Script
 Python port of the original bash script.
 """
 
+from __future__ import annotations
+
 import argparse
-import getpass
+import contextlib
+import fnmatch
+import heapq
+import importlib.util
+import itertools
 import json
 import logging
 import os
+import random
 import re
 import shutil
-import subprocess
+import signal
+import struct
 import sys
-import tempfile
-import zipfile
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-import requests
+
+def _lazy_import(name: str):
+    """
+    Return module `name`, executed only on first attribute access.  Keeps
+    heavy imports (requests alone is ~100ms) off the fast-start paths such as
+    --help, --list-services and --vat-query.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+getpass = _lazy_import("getpass")
+hashlib = _lazy_import("hashlib")
+sqlite3 = _lazy_import("sqlite3")
+subprocess = _lazy_import("subprocess")
+tarfile = _lazy_import("tarfile")
+tempfile = _lazy_import("tempfile")
+zipfile = _lazy_import("zipfile")
+requests = _lazy_import("requests")
+urllib3 = _lazy_import("urllib3")
 
 # ---------------------------------------------------------------------------
 # Logging setup
@@ -43,6 +82,199 @@ def log_error(msg: str) -> None:
     log.error(f"{RED}[ERROR]{NC} {msg}")
 
 
+class ArtifactError(Exception):
+    """Fatal error for a single project/job; main() logs it and exits, batch mode records it."""
+
+
+# Serializes handler output (VAT reports, load output) when jobs run concurrently
+_output_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Metrics (per-phase spans and counters, written at exit)
+# ---------------------------------------------------------------------------
+class _Span:
+    def __init__(self, metrics: "Metrics", name: str, labels: dict) -> None:
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+        self.attrs: dict = {}
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "_Span":
+        stack = self.metrics._stack()
+        if stack:
+            self.labels = {**stack[-1].labels, **self.labels}
+        stack.append(self)
+        self.wall = time.time()
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.metrics._stack().pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.metrics.record(self.name, time.monotonic() - self.start, self.wall, self.labels, **self.attrs)
+
+
+class Metrics:
+    """
+    Collects timing spans and counters for one run.  span() nests per thread:
+    a span inherits the labels of the one enclosing it, and add() counts into
+    the global counter as well as every open span of the calling thread.
+    Disabled (all calls are cheap no-ops) until enable(); flush() writes JSON
+    lines, or a Prometheus textfile when the path ends in .prom.  JSON lines
+    are appended as they're written (the file is started over once per run);
+    the textfile is replaced atomically every time.
+    """
+
+    def __init__(self) -> None:
+        self.path: Path | None = None
+        self.spans: list[dict] = []
+        self.counters: dict[str, float] = {}
+        # phase -> [seconds, spans], kept across checkpoint() for the textfile
+        self.phases: dict[str, list[float]] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # watch workers checkpoint concurrently
+        self._write_lock = threading.Lock()
+        self._appending = False
+
+    def enable(self, path: Path) -> None:
+        self.path = path
+
+    def _stack(self) -> list[_Span]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def span(self, name: str, **labels) -> _Span:
+        return _Span(self, name, labels)
+
+    def annotate(self, **attrs) -> None:
+        """Set attributes on the innermost open span of the calling thread."""
+        stack = self._stack()
+        if stack:
+            stack[-1].set(**attrs)
+
+    def add(self, name: str, n: float = 1) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            for span in self._stack():
+                span.attrs[name] = span.attrs.get(name, 0) + n
+
+    def bind(self, fn):
+        """Wrap fn so that, run on a pool thread, it counts into the caller's open spans."""
+        stack = list(self._stack())
+
+        def run(*args, **kwargs):
+            saved = self._stack()
+            self._local.stack = list(stack)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._local.stack = saved
+
+        return run
+
+    def record(self, name: str, seconds: float, wall: float | None = None, labels: dict | None = None, **attrs) -> None:
+        """Record a finished span directly (for work timed outside a with block)."""
+        if self.path is None:
+            return
+        entry = {"type": "span", "name": name, "start": round(wall or time.time() - seconds, 3), "seconds": round(seconds, 4)}
+        entry["labels"] = {k: v for k, v in (labels or {}).items() if v not in (None, "")}
+        entry.update(attrs)
+        if attrs.get("bytes_downloaded") and seconds > 0:
+            entry["bytes_per_second"] = round(attrs["bytes_downloaded"] / seconds)
+        with self._lock:
+            self.spans.append(entry)
+            total = self.phases.setdefault(name, [0.0, 0])
+            total[0] += entry["seconds"]
+            total[1] += 1
+
+    def _take_spans(self) -> list[dict]:
+        with self._lock:
+            spans, self.spans = self.spans, []
+        return spans
+
+    def checkpoint(self) -> None:
+        """Write the spans recorded since the last write (counters keep running); for long-running modes."""
+        if self.path is None:
+            return
+        if self.path.suffix == ".prom":
+            self.flush()
+            self._take_spans()
+        else:
+            self._write_lines(self._take_spans())
+
+    def flush(self, exit_code: int = 0) -> None:
+        if self.path is None:
+            return
+        run = {"type": "run", "start": round(self.started, 3), "seconds": round(time.time() - self.started, 4), "exit_code": exit_code}
+        if self.path.suffix != ".prom":
+            with self._lock:
+                counters = sorted(self.counters.items())
+            self._write_lines([run, *self._take_spans(), *({"type": "counter", "name": k, "value": v} for k, v in counters)])
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # atomic, so a textfile collector never reads a half-written file
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(self._prometheus(run))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log_warn(f"Could not write metrics to {self.path}: {e}")
+
+    def _write_lines(self, lines: list[dict]) -> None:
+        """Append JSON lines, starting the file over on the first write of the run."""
+        if not lines:
+            return
+        text = "".join(json.dumps(line) + "\n" for line in lines)
+        try:
+            with self._write_lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a" if self._appending else "w") as fh:
+                    fh.write(text)
+                self._appending = True
+        except OSError as e:
+            log_warn(f"Could not write metrics to {self.path}: {e}")
+
+    def _prometheus(self, run: dict) -> str:
+        with self._lock:
+            phases = {name: list(total) for name, total in self.phases.items()}
+            counters = sorted(self.counters.items())
+        out = [
+            "# HELP gitlab_artifacts_run_seconds Wall time of the last run.",
+            "# TYPE gitlab_artifacts_run_seconds gauge",
+            f"gitlab_artifacts_run_seconds {run['seconds']}",
+            "# HELP gitlab_artifacts_last_run_timestamp_seconds Start of the last run.",
+            "# TYPE gitlab_artifacts_last_run_timestamp_seconds gauge",
+            f"gitlab_artifacts_last_run_timestamp_seconds {run['start']}",
+            "# HELP gitlab_artifacts_exit_code Exit code of the last run.",
+            "# TYPE gitlab_artifacts_exit_code gauge",
+            f"gitlab_artifacts_exit_code {run['exit_code']}",
+            "# HELP gitlab_artifacts_phase_seconds Time spent per phase in the last run (summed over jobs and threads).",
+            "# TYPE gitlab_artifacts_phase_seconds gauge",
+        ]
+        out += [f'gitlab_artifacts_phase_seconds{{phase="{name}"}} {round(t[0], 4)}' for name, t in sorted(phases.items())]
+        out += [
+            "# HELP gitlab_artifacts_phase_spans Number of spans per phase in the last run.",
+            "# TYPE gitlab_artifacts_phase_spans gauge",
+        ]
+        out += [f'gitlab_artifacts_phase_spans{{phase="{name}"}} {t[1]}' for name, t in sorted(phases.items())]
+        for name, value in counters:
+            out += [f"# TYPE gitlab_artifacts_{name} gauge", f"gitlab_artifacts_{name} {value}"]
+        return "\n".join(out) + "\n"
+
+
+metrics = Metrics()
+
+
 # ---------------------------------------------------------------------------
 # Service → project-ID map
 # ---------------------------------------------------------------------------
@@ -100,6 +332,11 @@ SERVICE_TO_PROJECT_ID_MAP: dict[str, int] = {
 # ---------------------------------------------------------------------------
 # Environment file loader (replicates bash `source globalenviron / .envrc`)
 # ---------------------------------------------------------------------------
+_ENV_REF_RE = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}|\$([A-Za-z_][A-Za-z0-9_]*)")
+_ENV_EXPORT_RE = re.compile(r"^export\s+")
+_ENV_KEY_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
 def _expand_env_value(val: str) -> str:
     """
     Expand $VAR and ${VAR} references in val against os.environ.
@@ -110,7 +347,9 @@ def _expand_env_value(val: str) -> str:
         var_name = m.group(1) or m.group(2)
         return os.environ.get(var_name, m.group(0))
 
-    return re.sub(r"\$\{([A-Za-z_][A-Za-z0-9_]*)\}|\$([A-Za-z_][A-Za-z0-9_]*)", replacer, val)
+    if "$" not in val:
+        return val
+    return _ENV_REF_RE.sub(replacer, val)
 
 
 def load_env_file(path: Path) -> None:
@@ -124,13 +363,13 @@ def load_env_file(path: Path) -> None:
             line = line.strip()
             if not line or line.startswith("#"):
                 continue
-            line = re.sub(r"^export\s+", "", line)
+            line = _ENV_EXPORT_RE.sub("", line)
             if "=" not in line:
                 continue
             key, _, val = line.partition("=")
             key = key.strip()
             val = _expand_env_value(val.strip().strip("'\""))
-            if key and re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", key):
+            if key and _ENV_KEY_RE.fullmatch(key):
                 os.environ.setdefault(key, val)
     except OSError:
         pass
@@ -208,6 +447,80 @@ def check_dependencies(load_image: bool, container_engine: str) -> None:
     # requests, zipfile, json are stdlib / declared deps — no need to check at runtime
 
 
+# ---------------------------------------------------------------------------
+# Persistent job cache
+# ---------------------------------------------------------------------------
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "gitlab-artifacts-download"
+
+
+class JobCache:
+    """
+    Small JSON file cache shared by every run of the script:
+
+      names: (gitlab_url, project_id, branch, job name, scope) -> resolved job ID
+             plus the "latest pipeline/job" marker that was current when it was
+             resolved, so later runs can revalidate with a single cheap request
+      jobs:  (gitlab_url, project_id, job_id) -> job JSON and its ETag
+
+    Entries older than ttl seconds are evicted.  Safe to share between threads;
+    the file is rewritten atomically after every update.
+    """
+
+    def __init__(self, path: Path, ttl: float = 3600) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, json.JSONDecodeError):
+            data = {}
+        now = time.time()
+        self._data = {
+            section: {k: v for k, v in data.get(section, {}).items() if now - v.get("stored", 0) <= ttl}
+            for section in ("names", "jobs")
+        }
+
+    @staticmethod
+    def _key(*parts) -> str:
+        return "|".join(str(p) for p in parts)
+
+    def _get(self, section: str, key: str) -> dict | None:
+        with self._lock:
+            entry = self._data[section].get(key)
+            if entry and time.time() - entry.get("stored", 0) > self.ttl:
+                del self._data[section][key]
+                entry = None
+            return entry
+
+    def _put(self, section: str, key: str, entry: dict) -> None:
+        with self._lock:
+            self._data[section][key] = {**entry, "stored": time.time()}
+            self._save()
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(self._data))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            log_warn(f"Could not write job cache {self.path}: {e}")
+
+    def get_name(self, gitlab_url: str, project_id: int, branch: str, name: str, scope) -> dict | None:
+        return self._get("names", self._key(gitlab_url, project_id, branch, name, ",".join(scope or [])))
+
+    def put_name(self, gitlab_url: str, project_id: int, branch: str, name: str, scope, entry: dict) -> None:
+        self._put("names", self._key(gitlab_url, project_id, branch, name, ",".join(scope or [])), entry)
+
+    def get_job(self, gitlab_url: str, project_id: int, job_id: int) -> dict | None:
+        return self._get("jobs", self._key(gitlab_url, project_id, job_id))
+
+    def put_job(self, gitlab_url: str, project_id: int, job_id: int, entry: dict) -> None:
+        self._put("jobs", self._key(gitlab_url, project_id, job_id), entry)
+
+
 # ---------------------------------------------------------------------------
 # GitLab API helpers
 # ---------------------------------------------------------------------------
@@ -215,14 +528,112 @@ def make_headers(token: str) -> dict:
     return {"Authorization": f"Bearer {token}"}
 
 
-def get_job_info(gitlab_url: str, project_id: int, job_id: int, token: str) -> dict:
-    url = f"{gitlab_url}/api/v4/projects/{project_id}/jobs/{job_id}"
+# Statuses worth retrying: rate limiting and transient server/proxy failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Requests left in GitLab's rate-limit window below which pollers hold off until it resets
+RATE_LIMIT_RESERVE = 10
+
+
+class GitLabClient:
+    """
+    Thin wrapper around one pooled, keep-alive requests.Session for a GitLab
+    instance.  Auth headers are set once on the session; 429/5xx responses
+    are retried with exponential backoff, honoring Retry-After when present.
+    The session is shared across threads, so pool_size should be at least the
+    number of concurrent workers.  job_cache, if given, lets name lookups and
+    job info requests be answered or revalidated from disk.  GitLab's
+    RateLimit-* headers are tracked so pollers can wait (throttle_delay())
+    rather than run into 429s.
+    """
+
+    def __init__(
+        self,
+        gitlab_url: str,
+        token: str,
+        pool_size: int = 10,
+        retries: int = 5,
+        backoff: float = 0.5,
+        timeout: float = 30,
+        job_cache: JobCache | None = None,
+    ) -> None:
+        self.gitlab_url = gitlab_url.rstrip("/")
+        self.api_url = f"{self.gitlab_url}/api/v4"
+        self.timeout = timeout
+        self.job_cache = job_cache
+        self.throttled_until = 0.0
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.headers.update(make_headers(token))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path: str) -> str:
+        """Absolute URL for an API path such as /projects/1/jobs (absolute URLs pass through)."""
+        return path if "://" in path else f"{self.api_url}{path}"
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        metrics.add("http_requests")
+        resp = self.session.get(self.url(path), **kwargs)
+        self._note_rate_limit(resp)
+        return resp
+
+    def _note_rate_limit(self, resp: requests.Response) -> None:
+        remaining = resp.headers.get("RateLimit-Remaining", "")
+        if resp.status_code != 429 and not (remaining.isdigit() and int(remaining) <= RATE_LIMIT_RESERVE):
+            return
+        reset = resp.headers.get("RateLimit-Reset", "")
+        retry_after = resp.headers.get("Retry-After", "")
+        if reset.isdigit():
+            until = float(reset)
+        else:
+            until = time.time() + (float(retry_after) if retry_after.isdigit() else 60)
+        self.throttled_until = max(self.throttled_until, until)
+
+    def throttle_delay(self) -> float:
+        """Seconds until GitLab's rate-limit window resets, if it was (nearly) used up; else 0."""
+        return max(0.0, self.throttled_until - time.time())
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "GitLabClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def get_job_info(client: GitLabClient, project_id: int, job_id: int) -> dict:
+    url = client.url(f"/projects/{project_id}/jobs/{job_id}")
     log_info(f"Fetching job information from {url}")
-    resp = requests.get(url, headers=make_headers(token), allow_redirects=True, timeout=30)
-    data = resp.json()
-    if "message" in data:
-        log_error(f"Failed to fetch job info: {data['message']}")
-        sys.exit(1)
+    cache = client.job_cache
+    cached = cache.get_job(client.gitlab_url, project_id, job_id) if cache else None
+    headers = {"If-None-Match": cached["etag"]} if cached and cached.get("etag") else {}
+    resp = client.get(url, headers=headers, allow_redirects=True)
+    if resp.status_code == 304 and cached:
+        log_info(f"Job {job_id} unchanged since last run (ETag match); using cached job info")
+        data = cached["job"]
+    else:
+        data = resp.json()
+        if "message" in data:
+            raise ArtifactError(f"Failed to fetch job info: {data['message']}")
+        if cache:
+            cache.put_job(client.gitlab_url, project_id, job_id, {"job": data, "etag": resp.headers.get("ETag", "")})
     job_name = data.get("name", "unknown")
     job_status = data.get("status", "unknown")
     log_info(f"Job: {job_name} (Status: {job_status})")
@@ -231,103 +642,1462 @@ def get_job_info(gitlab_url: str, project_id: int, job_id: int, token: str) -> d
     return data
 
 
+# Jobs per page for list endpoints (GitLab's maximum)
+JOBS_PER_PAGE = 100
+# Recent pipelines on a branch to search for a job name before falling back to the job list
+PIPELINE_SEARCH_DEPTH = 20
+
+
+def _get_list_page(client: GitLabClient, path: str, params: dict, what: str) -> tuple[list, dict]:
+    """GET one page of a GitLab list endpoint. Returns (items, headers); raises ArtifactError on failure."""
+    resp = client.get(path, params=params)
+    metrics.add("api_pages")
+    if resp.status_code == 401:
+        raise ArtifactError(f"401 Unauthorized fetching {what} — check your token. Response: {resp.text[:200]}")
+    if resp.status_code != 200:
+        raise ArtifactError(f"Unexpected HTTP {resp.status_code} fetching {what}. Response: {resp.text[:200]}")
+    items = resp.json()
+    if not isinstance(items, list):
+        raise ArtifactError(f"Unexpected response format (expected list): {str(items)[:200]}")
+    return items, resp.headers
+
+
+def _first_match_ordered(tasks, check, concurrency: int):
+    """
+    Run the zero-argument callables in tasks on a small thread pool, keeping at
+    most `concurrency` in flight, and feed their results to check() strictly in
+    task order.  Returns the first non-None check() result; requests that are
+    still queued at that point are cancelled and in-flight ones are abandoned.
+    """
+    tasks = iter(tasks)
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="lookup")
+    try:
+        pending = deque(pool.submit(metrics.bind(task)) for task in itertools.islice(tasks, max(1, concurrency)))
+        while pending:
+            result = pending.popleft().result()
+            task = next(tasks, None)
+            if task is not None:
+                pending.append(pool.submit(metrics.bind(task)))
+            found = check(result)
+            if found is not None:
+                return found
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return None
+
+
+def _match_job(jobs: list, name: str, branch: str) -> tuple[int, str] | None:
+    for job in jobs:
+        if job.get("name") != name:
+            continue
+        if branch and job.get("ref") != branch:
+            continue
+        return int(job["id"]), job.get("ref", "")
+    return None
+
+
+def _scope_params(scope: list[str] | None) -> dict:
+    return {"scope[]": list(scope)} if scope else {}
+
+
+def _search_pipelines(
+    client: GitLabClient,
+    project_id: int,
+    name: str,
+    branch: str,
+    scope: list[str] | None,
+    concurrency: int,
+) -> tuple[int, str] | None:
+    """Look for the job in the most recent pipelines on branch (newest first)."""
+    pipelines, _ = _get_list_page(
+        client,
+        f"/projects/{project_id}/pipelines",
+        {"ref": branch, "order_by": "id", "sort": "desc", "per_page": PIPELINE_SEARCH_DEPTH},
+        "pipeline list",
+    )
+
+    def pipeline_jobs(pipeline_id: int) -> list:
+        path = f"/projects/{project_id}/pipelines/{pipeline_id}/jobs"
+        params = {"per_page": JOBS_PER_PAGE, **_scope_params(scope)}
+        jobs, headers = _get_list_page(client, path, params, "pipeline jobs")
+        next_page = headers.get("X-Next-Page", "").strip()
+        while next_page:
+            more, headers = _get_list_page(client, path, {**params, "page": int(next_page)}, "pipeline jobs")
+            jobs.extend(more)
+            next_page = headers.get("X-Next-Page", "").strip()
+        return jobs
+
+    return _first_match_ordered(
+        (lambda pid=p["id"]: pipeline_jobs(pid) for p in pipelines),
+        lambda jobs: _match_job(jobs, name, branch),
+        concurrency,
+    )
+
+
+def _search_job_list(
+    client: GitLabClient,
+    project_id: int,
+    name: str,
+    branch: str,
+    scope: list[str] | None,
+    concurrency: int,
+) -> tuple[int, str] | None:
+    """
+    Walk /projects/:id/jobs (newest first).  Once page 1 reports X-Total-Pages
+    the remaining pages are fetched concurrently; GitLab omits the totals on
+    very large collections, in which case X-Next-Page is followed serially.
+    """
+    path = f"/projects/{project_id}/jobs"
+    params = {"per_page": JOBS_PER_PAGE, **_scope_params(scope)}
+    jobs, headers = _get_list_page(client, path, {**params, "page": 1}, "job list")
+    found = _match_job(jobs, name, branch)
+    if found:
+        return found
+
+    total_pages = headers.get("X-Total-Pages", "").strip()
+    if total_pages.isdigit():
+        return _first_match_ordered(
+            (
+                lambda page=page: _get_list_page(client, path, {**params, "page": page}, "job list")[0]
+                for page in range(2, int(total_pages) + 1)
+            ),
+            lambda jobs: _match_job(jobs, name, branch),
+            concurrency,
+        )
+
+    next_page = headers.get("X-Next-Page", "").strip()
+    while next_page:
+        jobs, headers = _get_list_page(client, path, {**params, "page": int(next_page)}, "job list")
+        found = _match_job(jobs, name, branch)
+        if found:
+            return found
+        next_page = headers.get("X-Next-Page", "").strip()
+    return None
+
+
+def _probe_latest(
+    client: GitLabClient,
+    project_id: int,
+    branch: str,
+    scope: list[str] | None,
+    etag: str = "",
+) -> tuple[list | None, str]:
+    """
+    One cheap request identifying the newest pipeline on branch (or newest job
+    in the project when there is no branch).  Returns (marker, etag); marker is
+    None when the server answered 304 Not Modified to If-None-Match.  If the
+    marker is unchanged since a cached lookup, that lookup is still valid.
+    """
+    if branch:
+        path = f"/projects/{project_id}/pipelines"
+        params = {"ref": branch, "order_by": "id", "sort": "desc", "per_page": 1}
+        fields = ("id", "status", "updated_at")
+    else:
+        path = f"/projects/{project_id}/jobs"
+        params = {"per_page": 1, **_scope_params(scope)}
+        fields = ("id", "status")
+    resp = client.get(path, params=params, headers={"If-None-Match": etag} if etag else {})
+    if resp.status_code == 304:
+        return None, etag
+    if resp.status_code != 200:
+        raise ArtifactError(f"Unexpected HTTP {resp.status_code} revalidating job cache")
+    items = resp.json()
+    marker = [items[0].get(f) for f in fields] if isinstance(items, list) and items else []
+    return marker, resp.headers.get("ETag", "")
+
+
 def get_latest_job_id_by_name(
-    gitlab_url: str,
+    client: GitLabClient,
     project_id: int,
-    token: str,
     name: str,
     branch: str = "",
+    scope: list[str] | None = None,
+    concurrency: int = 4,
 ) -> tuple[int, str] | None:
     """
     Return (job_id, ref) for the most recent job matching name (and branch if given).
+    scope optionally restricts job statuses server-side (e.g. ["success"]).
+    With a branch, the branch's recent pipelines are searched first, which
+    normally resolves the name in two requests; otherwise (or if that fails)
+    the project job list is searched with concurrent page fetches.
+    If the client has a job cache and nothing newer than a cached lookup has
+    run, the cached answer is returned after a single revalidation request.
     Returns None if not found.
     """
-    page = 1
-    while True:
-        resp = requests.get(
-            f"{gitlab_url}/api/v4/projects/{project_id}/jobs",
-            headers=make_headers(token),
-            params={"per_page": 100, "page": page},
-            timeout=30,
+    cache = client.job_cache
+    if not cache:
+        return _resolve_job_name(client, project_id, name, branch, scope, concurrency)
+
+    cached = cache.get_name(client.gitlab_url, project_id, branch, name, scope)
+    try:
+        marker, etag = _probe_latest(client, project_id, branch, scope, cached["etag"] if cached else "")
+    except (ArtifactError, requests.RequestException, ValueError) as e:
+        log_warn(f"Could not revalidate cached job lookup: {e}")
+        return _resolve_job_name(client, project_id, name, branch, scope, concurrency)
+    if cached and (marker is None or marker == cached["marker"]):
+        log_info(f'Using cached job {cached["job_id"]} for "{name}" (no newer pipelines/jobs)')
+        return int(cached["job_id"]), cached["ref"]
+
+    found = _resolve_job_name(client, project_id, name, branch, scope, concurrency)
+    if found:
+        entry = {"job_id": found[0], "ref": found[1], "marker": marker, "etag": etag}
+        cache.put_name(client.gitlab_url, project_id, branch, name, scope, entry)
+    return found
+
+
+def _resolve_job_name(
+    client: GitLabClient,
+    project_id: int,
+    name: str,
+    branch: str,
+    scope: list[str] | None,
+    concurrency: int,
+) -> tuple[int, str] | None:
+    try:
+        if branch:
+            found = _search_pipelines(client, project_id, name, branch, scope, concurrency)
+            if found:
+                return found
+            log_info(f'"{name}" not in the last {PIPELINE_SEARCH_DEPTH} "{branch}" pipelines; searching job list')
+        return _search_job_list(client, project_id, name, branch, scope, concurrency)
+    except ArtifactError as e:
+        log_error(str(e))
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Artifact cache
+# ---------------------------------------------------------------------------
+# FICLONE ioctl (Linux): copy-on-write clone of a whole file on btrfs/xfs/etc.
+_FICLONE = 0x40049409
+
+
+def _link(src: Path, dst: Path) -> bool:
+    """Hardlink src to dst, or across filesystems reflink it. False if neither works (dst may be left empty)."""
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        pass
+    try:
+        import fcntl
+
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            fcntl.ioctl(fout.fileno(), _FICLONE, fin.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except (ImportError, OSError):
+        return False
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    """Hardlink src to dst; across filesystems try a reflink, then fall back to a real copy."""
+    if not _link(src, dst):
+        shutil.copy2(src, dst)
+
+
+class ArtifactStore:
+    """
+    Content-addressed store of extracted job artifacts:
+
+      objects/<sha256 of artifacts.zip>/...   extracted tree, shared by every
+                                              job whose archive has that digest
+                                              (suffixed with a hash of the member
+                                              patterns for partial extractions)
+      index.json                              (gitlab_url, project_id, job_id)
+                                              -> object, zip size, member
+                                              patterns, extracted bytes, last use
+
+    A repeat request for a cached job links the stored files into the output
+    directory instead of downloading.  Files are hardlinked where possible, so
+    handlers must treat extracted files as read-only.  Output directories the
+    store can neither hardlink nor reflink into (another filesystem without
+    reflinks) aren't stored from, as that would write every artifact twice.
+    Least-recently-used objects are evicted once the store exceeds max_bytes.
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index_path = root / "index.json"
+        # (store device, output device) -> whether files can be linked between them
+        self._linkable: dict[tuple[int, int], bool] = {}
+
+    @staticmethod
+    def _key(gitlab_url: str, project_id: int, job_id: int) -> str:
+        return f"{gitlab_url}|{project_id}|{job_id}"
+
+    def _load_index(self) -> dict:
+        try:
+            return json.loads(self._index_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self, index: dict) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._index_path.with_name(f"index.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(index))
+        os.replace(tmp, self._index_path)
+
+    def lookup(
+        self,
+        gitlab_url: str,
+        project_id: int,
+        job_id: int,
+        size: int | None = None,
+        members: list[str] | None = None,
+    ) -> Path | None:
+        """
+        Return the cached extraction directory for a job, or None.  A known
+        artifact size must match, and the cached extraction must cover the
+        requested member patterns (a full extraction covers everything).
+        """
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(self._key(gitlab_url, project_id, job_id))
+            if not entry or entry.get("members") not in (None, members):
+                return None
+            obj = self.root / "objects" / entry.get("object", entry["digest"])
+            if (size and entry.get("size") != size) or not obj.is_dir():
+                return None
+            entry["last_used"] = time.time()
+            self._save_index(index)
+            return obj
+
+    def can_link(self, output_dir: Path) -> bool:
+        """
+        Whether files can be hardlinked or reflinked between the store and
+        output_dir; probed once per pair of filesystems, logged when they can't.
+        """
+        objects = self.root / "objects"
+        objects.mkdir(parents=True, exist_ok=True)
+        key = (objects.stat().st_dev, output_dir.stat().st_dev)
+        with self._lock:
+            if key not in self._linkable:
+                fd, probe = tempfile.mkstemp(prefix=".link-probe-", dir=objects)
+                os.close(fd)
+                target = output_dir / Path(probe).name
+                try:
+                    self._linkable[key] = _link(Path(probe), target)
+                finally:
+                    target.unlink(missing_ok=True)
+                    os.unlink(probe)
+                if not self._linkable[key]:
+                    log_info(
+                        f"Artifact cache {self.root} can't hardlink or reflink into {output_dir}; "
+                        "not caching artifacts extracted there"
+                    )
+            return self._linkable[key]
+
+    def add(
+        self,
+        gitlab_url: str,
+        project_id: int,
+        job_id: int,
+        digest: str,
+        size: int,
+        files: list[Path],
+        base: Path,
+        members: list[str] | None = None,
+    ) -> None:
+        """
+        Record the files extracted under base (matching members) for a job
+        whose archive had this digest/size, unless they'd have to be copied.
+        """
+        if not self.can_link(base):
+            return
+        name = digest if members is None else f"{digest}-{hashlib.sha1(json.dumps(members).encode()).hexdigest()[:12]}"
+        obj = self.root / "objects" / name
+        total = sum(f.stat().st_size for f in files)
+        if total > self.max_bytes:
+            log_info(f"Artifact for job {job_id} ({total} bytes) exceeds the cache budget; not caching")
+            return
+        if not obj.is_dir():
+            staging = self.root / "objects" / f".{name}.{os.getpid()}.{threading.get_ident()}"
+            shutil.rmtree(staging, ignore_errors=True)
+            for f in files:
+                dst = staging / f.relative_to(base)
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                _link_or_copy(f, dst)
+            staging.mkdir(parents=True, exist_ok=True)
+            try:
+                os.rename(staging, obj)
+            except OSError:
+                # another worker stored the same content first
+                shutil.rmtree(staging, ignore_errors=True)
+        with self._lock:
+            index = self._load_index()
+            index[self._key(gitlab_url, project_id, job_id)] = {
+                "digest": digest,
+                "object": name,
+                "members": members,
+                "size": size,
+                "bytes": total,
+                "last_used": time.time(),
+            }
+            self._evict(index)
+            self._save_index(index)
+
+    def materialize(self, obj: Path, output_dir: Path) -> list[Path]:
+        """Link every file of a cached object into output_dir. Returns the linked paths."""
+        linked = []
+        for src in obj.rglob("*"):
+            if src.is_file():
+                dst = output_dir / src.relative_to(obj)
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                if dst.exists():
+                    dst.unlink()
+                _link_or_copy(src, dst)
+                linked.append(dst)
+        return linked
+
+    def _evict(self, index: dict) -> None:
+        """Drop least-recently-used objects (and the index entries pointing at them) until under budget."""
+        objects: dict[str, dict] = {}
+        for entry in index.values():
+            obj = objects.setdefault(entry.get("object", entry["digest"]), {"bytes": entry["bytes"], "last_used": 0})
+            obj["last_used"] = max(obj["last_used"], entry["last_used"])
+        total = sum(o["bytes"] for o in objects.values())
+        for name, obj in sorted(objects.items(), key=lambda kv: kv[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            log_info(f"Evicting cached artifact {name[:12]} ({obj['bytes']} bytes)")
+            shutil.rmtree(self.root / "objects" / name, ignore_errors=True)
+            for key in [k for k, e in index.items() if e.get("object", e["digest"]) == name]:
+                del index[key]
+            total -= obj["bytes"]
+
+
+# ---------------------------------------------------------------------------
+# Resumable downloads
+# ---------------------------------------------------------------------------
+# Adaptive read size bounds, and the time one read should take on a steady link
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 8 * 1024 * 1024
+TARGET_CHUNK_SECONDS = 0.25
+# Don't split downloads into segments smaller than this
+MIN_SEGMENT_BYTES = 32 * 1024 * 1024
+DOWNLOAD_RETRIES = 5
+PROGRESS_INTERVAL = 5.0
+
+
+def _transient_download_errors() -> tuple[type[BaseException], ...]:
+    """Errors after which a download is resumed from where it stopped."""
+    return (
+        requests.ConnectionError,
+        requests.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+        urllib3.exceptions.HTTPError,
+        ConnectionError,
+        TimeoutError,
+    )
+
+
+def _human_bytes(n: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n) < 1024 or unit == "GiB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{int(n)} B"
+        n /= 1024
+    return f"{n:.1f} GiB"
+
+
+class _ChunkSizer:
+    """Grow or shrink the read size so each read takes roughly TARGET_CHUNK_SECONDS."""
+
+    def __init__(self) -> None:
+        self.size = 64 * 1024
+
+    def update(self, nbytes: int, elapsed: float) -> None:
+        if nbytes < self.size:
+            return
+        if elapsed < TARGET_CHUNK_SECONDS / 2 and self.size < MAX_CHUNK:
+            self.size *= 2
+        elif elapsed > TARGET_CHUNK_SECONDS * 2 and self.size > MIN_CHUNK:
+            self.size //= 2
+
+
+class _Progress:
+    """Thread-safe byte counter that logs progress/throughput every PROGRESS_INTERVAL seconds."""
+
+    def __init__(self, label: str, total: int | None, already: int = 0) -> None:
+        self.label = label
+        self.total = total
+        self.done = already
+        self.start_done = already
+        self.start = self.last_log = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, n: int) -> None:
+        with self._lock:
+            self.done += n
+            now = time.monotonic()
+            if now - self.last_log < PROGRESS_INTERVAL:
+                return
+            self.last_log = now
+        pct = f" ({100 * self.done / self.total:.0f}%)" if self.total else ""
+        total = f" / {_human_bytes(self.total)}" if self.total else ""
+        log_info(f"{self.label}: {_human_bytes(self.done)}{total}{pct} at {_human_bytes(self.rate())}/s")
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.start
+        return (self.done - self.start_done) / elapsed if elapsed > 0 else 0.0
+
+    def finish(self) -> None:
+        metrics.add("bytes_downloaded", self.done - self.start_done)
+        log_info(
+            f"{self.label}: {_human_bytes(self.done - self.start_done)} in {time.monotonic() - self.start:.1f}s "
+            f"({_human_bytes(self.rate())}/s)"
         )
-        if resp.status_code == 401:
-            log_error(f"401 Unauthorized fetching job list — check your token. Response: {resp.text[:200]}")
-            return None
-        if resp.status_code != 200:
-            log_error(f"Unexpected HTTP {resp.status_code} fetching job list. Response: {resp.text[:200]}")
-            return None
-        jobs = resp.json()
-        if not isinstance(jobs, list):
-            log_error(f"Unexpected response format (expected list): {str(jobs)[:200]}")
+
+
+def _raise_for_download_status(resp: requests.Response, label: str) -> None:
+    if resp.status_code == 404:
+        raise ArtifactError(f"Artifacts not found for {label}. They may not exist or may have expired.")
+    elif resp.status_code == 401:
+        raise ArtifactError("Authentication failed. Check your access token.")
+    elif resp.status_code not in (200, 206):
+        raise ArtifactError(f"Failed to download artifacts. HTTP status: {resp.status_code}")
+
+
+def _request_headers(client: GitLabClient, url: str) -> dict:
+    # Artifacts usually redirect to object storage; never send the GitLab token there
+    return {} if url.startswith(client.gitlab_url) else {"Authorization": None}
+
+
+def _open_range(client: GitLabClient, url: str, start: int, end: int | None, etag: str) -> requests.Response:
+    headers = _request_headers(client, client.url(url))
+    headers["Range"] = f"bytes={start}-{'' if end is None else end}"
+    if etag:
+        headers["If-Range"] = etag
+    return client.get(url, headers=headers, stream=True, allow_redirects=True, timeout=120)
+
+
+def _stream_to(resp: requests.Response, write, progress: _Progress, limit: int | None = None) -> int:
+    """Copy a response body through write() with adaptive read sizes. Returns bytes copied."""
+    sizer = _ChunkSizer()
+    copied = 0
+    while limit is None or copied < limit:
+        want = sizer.size if limit is None else min(sizer.size, limit - copied)
+        t0 = time.monotonic()
+        chunk = resp.raw.read(want, decode_content=True)
+        if not chunk:
             break
+        sizer.update(len(chunk), time.monotonic() - t0)
+        write(chunk)
+        copied += len(chunk)
+        progress.add(len(chunk))
+    return copied
 
-        for job in jobs:
-            if job.get("name") != name:
-                continue
-            if branch and job.get("ref") != branch:
+
+def _total_from_response(resp: requests.Response, start: int) -> int | None:
+    content_range = resp.headers.get("Content-Range", "")
+    if "/" in content_range and content_range.rsplit("/", 1)[1].isdigit():
+        return int(content_range.rsplit("/", 1)[1])
+    length = resp.headers.get("Content-Length", "")
+    return int(length) + (start if resp.status_code == 206 else 0) if length.isdigit() else None
+
+
+def download_file(
+    client: GitLabClient,
+    url: str,
+    dest: Path,
+    connections: int = 1,
+    label: str = "download",
+) -> str | None:
+    """
+    Download url to dest via dest.part, resuming the .part file with HTTP Range
+    requests after a failure (within this call or from an earlier run).  If
+    connections > 1 and the server supports ranges, large files are fetched
+    as that many parallel byte ranges.  Returns the sha256 hex digest when it
+    could be computed while streaming (a single uninterrupted pass from byte
+    0), otherwise None.
+    """
+    part = dest.with_name(dest.name + ".part")
+    meta_path = dest.with_name(dest.name + ".part.json")
+    try:
+        meta = json.loads(meta_path.read_text()) if part.exists() else {}
+    except (OSError, json.JSONDecodeError):
+        meta = {}
+    if meta.get("url") != url:
+        meta = {"url": url}
+        part.unlink(missing_ok=True)
+
+    def save_meta() -> None:
+        meta_path.write_text(json.dumps(meta))
+
+    if meta.get("segments"):
+        start = 0
+    else:
+        start = part.stat().st_size if part.exists() else 0
+    if start:
+        log_info(f"{label}: resuming partial download at {_human_bytes(start)}")
+
+    resp = _open_range(client, url, start, None, meta.get("etag", ""))
+    if resp.status_code == 416 and start and start == meta.get("total"):
+        resp.close()
+        part.replace(dest)
+        meta_path.unlink(missing_ok=True)
+        return None
+    _raise_for_download_status(resp, label)
+    ranged = resp.status_code == 206
+    if not ranged:
+        # Server ignored Range (or the artifact changed under If-Range); start over
+        start = 0
+        meta.pop("segments", None)
+    total = _total_from_response(resp, start)
+    if total != meta.get("total") or resp.headers.get("ETag", "") != meta.get("etag", ""):
+        meta.pop("segments", None)
+    meta.update({"total": total, "etag": resp.headers.get("ETag", "")})
+    save_meta()
+
+    if ranged and total and (connections > 1 or meta.get("segments")) and total >= 2 * MIN_SEGMENT_BYTES:
+        # Re-request ranges from the final (post-redirect) URL rather than repeating the redirect
+        final_url = resp.url
+        resp.close()
+        _download_segments(client, final_url, part, meta, save_meta, total, connections, label)
+        digest = None
+    else:
+        digest = _download_sequential(client, url, resp, part, start, total, meta, label)
+
+    part.replace(dest)
+    meta_path.unlink(missing_ok=True)
+    return digest
+
+
+def _download_sequential(
+    client: GitLabClient,
+    url: str,
+    resp: requests.Response,
+    part: Path,
+    start: int,
+    total: int | None,
+    meta: dict,
+    label: str,
+) -> str | None:
+    progress = _Progress(label, total, start)
+    hasher = hashlib.sha256() if start == 0 else None
+    attempt = 0
+    with open(part, "r+b" if start else "wb") as fh:
+        fh.seek(start)
+        fh.truncate()
+        while True:
+
+            def write(chunk: bytes) -> None:
+                fh.write(chunk)
+                if hasher:
+                    hasher.update(chunk)
+
+            try:
+                with resp:
+                    _stream_to(resp, write, progress)
+                if total is None or fh.tell() >= total:
+                    break
+                raise requests.exceptions.ChunkedEncodingError(f"connection closed at {fh.tell()} of {total} bytes")
+            except _transient_download_errors() as e:
+                attempt += 1
+                if attempt > DOWNLOAD_RETRIES:
+                    raise
+                fh.flush()
+                log_warn(f"{label}: {e}; resuming at {_human_bytes(fh.tell())} (attempt {attempt}/{DOWNLOAD_RETRIES})")
+                time.sleep(min(2**attempt, 30))
+                resp = _open_range(client, url, fh.tell(), None, meta.get("etag", ""))
+                _raise_for_download_status(resp, label)
+                if resp.status_code != 206:
+                    # no range support after all: start over
+                    fh.seek(0)
+                    fh.truncate()
+                    hasher = hashlib.sha256()
+                    progress = _Progress(label, total)
+    progress.finish()
+    return hasher.hexdigest() if hasher else None
+
+
+def _download_segments(
+    client: GitLabClient,
+    url: str,
+    part: Path,
+    meta: dict,
+    save_meta,
+    total: int,
+    connections: int,
+    label: str,
+) -> None:
+    """Fetch [start, end] byte ranges of url concurrently into part, recording per-segment progress in meta."""
+    if not meta.get("segments"):
+        count = max(1, min(connections, total // MIN_SEGMENT_BYTES))
+        size = -(-total // count)
+        meta["segments"] = [[i, min(i + size, total) - 1, 0] for i in range(0, total, size)]
+        with open(part, "wb") as fh:
+            fh.truncate(total)
+    segments = meta["segments"]
+    lock = threading.Lock()
+    last_save = [time.monotonic()]
+    already = sum(seg[2] for seg in segments)
+    progress = _Progress(label, total, already)
+    log_info(f"{label}: fetching {_human_bytes(total)} over {len(segments)} connection(s)")
+    fd = os.open(part, os.O_RDWR)
+
+    def fetch(seg: list) -> None:
+        attempt = 0
+        while seg[0] + seg[2] <= seg[1]:
+            offset = seg[0] + seg[2]
+            try:
+                with _open_range(client, url, offset, seg[1], meta.get("etag", "")) as resp:
+                    _raise_for_download_status(resp, label)
+                    if resp.status_code != 206:
+                        raise ArtifactError(f"{label}: server stopped honoring range requests")
+
+                    def write(chunk: bytes) -> None:
+                        os.pwrite(fd, chunk, seg[0] + seg[2])
+                        with lock:
+                            seg[2] += len(chunk)
+                            if time.monotonic() - last_save[0] > PROGRESS_INTERVAL:
+                                last_save[0] = time.monotonic()
+                                save_meta()
+
+                    _stream_to(resp, write, progress, limit=seg[1] - offset + 1)
+                if seg[0] + seg[2] <= seg[1]:
+                    raise requests.exceptions.ChunkedEncodingError("segment ended early")
+            except _transient_download_errors() as e:
+                attempt += 1
+                if attempt > DOWNLOAD_RETRIES:
+                    raise
+                log_warn(f"{label}: segment at {seg[0]}: {e}; retrying ({attempt}/{DOWNLOAD_RETRIES})")
+                time.sleep(min(2**attempt, 30))
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix="segment") as pool:
+            for future in [pool.submit(metrics.bind(fetch), seg) for seg in segments if seg[0] + seg[2] <= seg[1]]:
+                future.result()
+    finally:
+        os.close(fd)
+        with lock:
+            save_meta()
+    progress.finish()
+
+
+def _file_sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(MAX_CHUNK), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Streaming zip extraction
+# ---------------------------------------------------------------------------
+_ZIP_LOCAL_HEADER = b"PK\x03\x04"
+_ZIP_DATA_DESCRIPTOR = b"PK\x07\x08"
+_ZIP_LOCAL_HEADER_STRUCT = struct.Struct("<4sHHHHHIIIHH")
+_ZIP_END_SIGNATURES = (b"PK\x01\x02", b"PK\x05\x06", b"PK\x06\x06")
+_ZIP32_MAX = 0xFFFFFFFF
+
+
+class _StreamUnsupported(Exception):
+    """The archive uses a feature the streaming extractor can't handle; extract from a downloaded file instead."""
+
+
+class _ArtifactStream:
+    """
+    Sequential, buffered reader over an artifact download.  Hashes every byte
+    (sha256, for the artifact cache), reports progress, and after a transient
+    network error reopens the request with a Range header at the current
+    offset so the caller never notices.
+    """
+
+    def __init__(self, client: GitLabClient, url: str, label: str) -> None:
+        self.client = client
+        self.url = url
+        self.label = label
+        self.offset = 0  # bytes received from the server
+        self.etag = ""
+        self.sha256 = hashlib.sha256()
+        self._buf = bytearray()
+        self._pos = 0
+        self._eof = False
+        self._sizer = _ChunkSizer()
+        self._resp = self._open()
+        total = _total_from_response(self._resp, 0)
+        self.progress = _Progress(label, total)
+
+    def _open(self) -> requests.Response:
+        resp = _open_range(self.client, self.url, self.offset, None, self.etag) if self.offset else None
+        if resp is None:
+            resp = self.client.get(self.url, stream=True, allow_redirects=True, timeout=120)
+        _raise_for_download_status(resp, self.label)
+        if self.offset and resp.status_code != 206:
+            resp.close()
+            raise ArtifactError(f"{self.label}: server can't resume at byte {self.offset} (no range support)")
+        self.etag = self.etag or resp.headers.get("ETag", "")
+        return resp
+
+    def _fill(self, want: int) -> None:
+        """Buffer at least want unread bytes (fewer only at end of stream)."""
+        if self._pos > 1024 * 1024 and self._pos * 2 > len(self._buf):
+            del self._buf[: self._pos]
+            self._pos = 0
+        attempt = 0
+        while len(self._buf) - self._pos < want and not self._eof:
+            try:
+                t0 = time.monotonic()
+                chunk = self._resp.raw.read(self._sizer.size, decode_content=True)
+                self._sizer.update(len(chunk), time.monotonic() - t0)
+            except _transient_download_errors() as e:
+                attempt += 1
+                if attempt > DOWNLOAD_RETRIES:
+                    raise
+                log_warn(f"{self.label}: {e}; resuming at {_human_bytes(self.offset)} (attempt {attempt}/{DOWNLOAD_RETRIES})")
+                self._resp.close()
+                time.sleep(min(2**attempt, 30))
+                self._resp = self._open()
                 continue
-            return int(job["id"]), job.get("ref", "")
+            if not chunk:
+                self._eof = True
+                break
+            self.offset += len(chunk)
+            self.sha256.update(chunk)
+            self.progress.add(len(chunk))
+            self._buf += chunk
+
+    def peek(self, n: int) -> bytes:
+        self._fill(n)
+        return bytes(self._buf[self._pos : self._pos + n])
+
+    def read(self, n: int) -> bytes:
+        """Up to n bytes; fewer only at end of stream. Reads whatever is buffered before touching the network."""
+        if self._pos >= len(self._buf):
+            self._fill(1)
+        data = bytes(self._buf[self._pos : self._pos + n])
+        self._pos += len(data)
+        return data
+
+    def read_exact(self, n: int) -> bytes:
+        self._fill(n)
+        if len(self._buf) - self._pos < n:
+            raise ArtifactError(f"{self.label}: artifact archive is truncated")
+        data = bytes(self._buf[self._pos : self._pos + n])
+        self._pos += n
+        return data
 
-        next_page = resp.headers.get("X-Next-Page", "").strip()
-        if not next_page:
+    def unread(self, data: bytes) -> None:
+        """Push back bytes that were read past the end of a member."""
+        if data:
+            self._buf[self._pos : self._pos] = data
+
+    def drain(self) -> None:
+        """Read (and hash) the rest of the archive, e.g. the central directory."""
+        while self.read(MAX_CHUNK):
+            pass
+
+    def close(self) -> None:
+        self._resp.close()
+
+
+def _safe_member_path(output_dir: Path, name: str) -> Path | None:
+    """Map a zip member name below output_dir, dropping absolute/../ components (as zipfile.extract does)."""
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+    return output_dir.joinpath(*parts) if parts else None
+
+
+def _member_wanted(name: str, members: list[str] | None) -> bool:
+    return members is None or any(fnmatch.fnmatchcase(name, pattern) for pattern in members)
+
+
+def _zip64_sizes(extra: bytes, csize: int, usize: int) -> tuple[int, int, bool]:
+    """Apply a zip64 extended-information extra field (0x0001) to local header sizes."""
+    i = 0
+    while i + 4 <= len(extra):
+        tag, size = struct.unpack_from("<HH", extra, i)
+        if tag == 0x0001:
+            field = extra[i + 4 : i + 4 + size]
+            values = [struct.unpack_from("<Q", field, j)[0] for j in range(0, len(field) - 7, 8)]
+            if usize == _ZIP32_MAX and values:
+                usize = values.pop(0)
+            if csize == _ZIP32_MAX and values:
+                csize = values.pop(0)
+            return csize, usize, True
+        i += 4 + size
+    return csize, usize, False
+
+
+def _read_data_descriptor(stream: _ArtifactStream, crc: int, csize: int, zip64: bool) -> None:
+    """Consume the data descriptor after a member and check it against what was actually read."""
+    if stream.peek(4) == _ZIP_DATA_DESCRIPTOR:
+        stream.read_exact(4)
+    head = stream.peek(20)
+    # 32-bit sizes unless the member is zip64 (writers differ in how they signal that, so check both)
+    for wide in (zip64 or csize >= _ZIP32_MAX, not (zip64 or csize >= _ZIP32_MAX)):
+        fmt = "<IQQ" if wide else "<III"
+        if len(head) < struct.calcsize(fmt):
+            continue
+        d_crc, d_csize, _ = struct.unpack_from(fmt, head)
+        if d_crc == crc and d_csize == csize:
+            stream.read_exact(struct.calcsize(fmt))
+            return
+    raise ArtifactError(f"{stream.label}: zip data descriptor doesn't match member data")
+
+
+def _copy_stored_with_descriptor(stream: _ArtifactStream, write) -> tuple[int, int]:
+    """
+    Copy a stored member whose size is only given in a trailing data descriptor:
+    scan for the descriptor signature and accept the first one whose CRC and
+    size match the bytes before it.  Returns (crc, size).
+    """
+    crc = size = 0
+    window = bytearray()
+    search_from = 0
+    while True:
+        chunk = stream.read(MAX_CHUNK)
+        if not chunk:
+            raise _StreamUnsupported("stored member without a locatable data descriptor")
+        window += chunk
+        while True:
+            p = window.find(_ZIP_DATA_DESCRIPTOR, search_from)
+            if p < 0:
+                # a signature may straddle the next read
+                safe = len(window) - 3
+                break
+            if len(window) < p + 24:
+                safe = p
+                break
+            d_crc, d_csize = struct.unpack_from("<II", window, p + 4)
+            d_csize64 = struct.unpack_from("<Q", window, p + 8)[0]
+            if d_crc == zlib.crc32(window[:p], crc) and (size + p) in (d_csize, d_csize64):
+                write(bytes(window[:p]))
+                stream.unread(bytes(window[p:]))
+                return zlib.crc32(window[:p], crc), size + p
+            search_from = p + 1
+        if safe > 0:
+            write(bytes(window[:safe]))
+            crc = zlib.crc32(window[:safe], crc)
+            size += safe
+            del window[:safe]
+            search_from = max(0, search_from - safe)
+
+
+def _decompressor(method: int):
+    if method == zipfile.ZIP_DEFLATED:
+        return zlib.decompressobj(-15)
+    if method == zipfile.ZIP_BZIP2:
+        import bz2
+
+        return bz2.BZ2Decompressor()
+    raise _StreamUnsupported(f"compression method {method}")
+
+
+def _stream_extract(
+    stream: _ArtifactStream,
+    output_dir: Path,
+    members: list[str] | None,
+    sink_for=None,
+    done: dict[str, Path | None] | None = None,
+) -> list[Path]:
+    """
+    Extract a zip archive from its local file headers as it arrives, writing
+    only the members matching the members patterns (all if None).  Returns the
+    extracted paths.  sink_for(name), if given, may return a sink
+    (write()/close()) that consumes a wanted member instead of a file on disk.
+
+    Raises _StreamUnsupported for archives it can't handle (encryption, unusual
+    compression, a stored member whose data descriptor can't be found).  That
+    may happen partway through the archive: every member finished by then is
+    recorded in done (name -> extracted path, None if a sink consumed it), so
+    a fallback to _extract_zip can skip them, and a member cut off on disk is
+    removed.  A sink can't be fed a member twice, so if one is cut off an
+    ArtifactError is raised instead.
+    """
+    extracted: list[Path] = []
+    done = {} if done is None else done
+    while True:
+        sig = stream.peek(4)
+        if not sig or sig in _ZIP_END_SIGNATURES:
             break
-        page = int(next_page)
+        if sig != _ZIP_LOCAL_HEADER:
+            raise _StreamUnsupported(f"unexpected zip record {sig!r} at byte {stream.offset}")
+        _, _, flags, method, _, _, crc, csize, usize, name_len, extra_len = _ZIP_LOCAL_HEADER_STRUCT.unpack(
+            stream.read_exact(_ZIP_LOCAL_HEADER_STRUCT.size)
+        )
+        raw_name = stream.read_exact(name_len)
+        name = raw_name.decode("utf-8" if flags & 0x800 else "cp437")
+        csize, usize, zip64 = _zip64_sizes(stream.read_exact(extra_len), csize, usize)
+        if flags & 0x1:
+            raise _StreamUnsupported("encrypted members")
+        has_descriptor = bool(flags & 0x8)
+        # checked before any sink or file is opened for the member
+        decomp = _decompressor(method) if method != zipfile.ZIP_STORED else None
 
-    return None
+        target = _safe_member_path(output_dir, name)
+        wanted = target is not None and not name.endswith("/") and _member_wanted(name, members)
+        fh = sink_for(name) if wanted and sink_for else None
+        if fh:
+            wanted = False
+        elif wanted:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists():
+                # may be a hardlink into the artifact cache; replace rather than overwrite in place
+                target.unlink()
+            fh = open(target, "wb")
+        sunk = fh is not None and not wanted
+        write = fh.write if fh else (lambda data: None)
+        try:
+            out_crc = 0
+            if method == zipfile.ZIP_STORED and has_descriptor:
+                out_crc, csize = _copy_stored_with_descriptor(stream, write)
+            elif method == zipfile.ZIP_STORED:
+                remaining = csize
+                while remaining:
+                    data = stream.read(min(remaining, MAX_CHUNK))
+                    if not data:
+                        raise ArtifactError(f"{stream.label}: artifact archive is truncated")
+                    remaining -= len(data)
+                    out_crc = zlib.crc32(data, out_crc)
+                    write(data)
+            else:
+                consumed = 0
+                while not decomp.eof and (has_descriptor or consumed < csize):
+                    want = MAX_CHUNK if has_descriptor else min(MAX_CHUNK, csize - consumed)
+                    data = stream.read(want)
+                    if not data:
+                        raise ArtifactError(f"{stream.label}: artifact archive is truncated")
+                    out = decomp.decompress(data)
+                    unused = decomp.unused_data if decomp.eof else b""
+                    consumed += len(data) - len(unused)
+                    stream.unread(unused)
+                    out_crc = zlib.crc32(out, out_crc)
+                    write(out)
+                csize = consumed
+            if has_descriptor:
+                _read_data_descriptor(stream, out_crc, csize, zip64)
+            elif out_crc != crc:
+                raise ArtifactError(f"{stream.label}: CRC mismatch for {name}")
+        except _StreamUnsupported as e:
+            if fh:
+                fh.close()
+                fh = None
+            if sunk:
+                raise ArtifactError(f"{stream.label}: can't finish streaming {name} ({e}) and it can't be fed again") from e
+            if wanted:
+                log_warn(f"{stream.label}: removing partially extracted {name}")
+                target.unlink()
+            raise
+        finally:
+            if fh:
+                fh.close()
+        if wanted:
+            extracted.append(target)
+        if wanted or sunk:
+            done[name] = target if wanted else None
+    stream.drain()
+    return extracted
+
+
+# ---------------------------------------------------------------------------
+# Remote (HTTP range) member extraction
+# ---------------------------------------------------------------------------
+_ZIP_EOCD = b"PK\x05\x06"
+_ZIP64_EOCD_LOCATOR = b"PK\x06\x07"
+_ZIP_EOCD_STRUCT = struct.Struct("<4s4H2LH")
+_ZIP64_EOCD_STRUCT = struct.Struct("<4sQ2H2L4Q")
+_ZIP_CENTRAL_STRUCT = struct.Struct("<4s4B4HL2L5H2L")
+# EOCD record plus the longest possible archive comment
+_ZIP_TAIL_BYTES = _ZIP_EOCD_STRUCT.size + 0xFFFF
+
+
+def _fetch_range(client: GitLabClient, url: str, spec: str, label: str) -> tuple[bytes, requests.Response] | None:
+    """
+    GET a byte range ("a-b" or "-n").  Returns (body, response), or None if the
+    server answered without honoring the range (its body is never read).
+    """
+    headers = _request_headers(client, client.url(url))
+    headers["Range"] = f"bytes={spec}"
+    with client.get(url, headers=headers, stream=True, allow_redirects=True, timeout=120) as resp:
+        if resp.status_code != 206:
+            _raise_for_download_status(resp, label)
+            return None
+        body = resp.raw.read(decode_content=True)
+        metrics.add("bytes_downloaded", len(body))
+        return body, resp
+
+
+def _zip_central_directory(tail: bytes, tail_start: int, fetch) -> tuple[bytes, int]:
+    """Locate the central directory from the archive tail. Returns (directory bytes, entry count)."""
+    pos = tail.rfind(_ZIP_EOCD)
+    if pos < 0:
+        raise _StreamUnsupported("no end-of-central-directory record")
+    _, _, _, _, count, cd_size, cd_offset, _ = _ZIP_EOCD_STRUCT.unpack_from(tail, pos)
+    if cd_offset == _ZIP32_MAX or count == 0xFFFF:
+        loc = pos - 20
+        if loc < 0 or tail[loc : loc + 4] != _ZIP64_EOCD_LOCATOR:
+            raise _StreamUnsupported("zip64 locator not in fetched tail")
+        eocd64_offset = struct.unpack_from("<Q", tail, loc + 8)[0]
+        if eocd64_offset >= tail_start:
+            record = tail[eocd64_offset - tail_start : eocd64_offset - tail_start + _ZIP64_EOCD_STRUCT.size]
+        else:
+            record = fetch(eocd64_offset, eocd64_offset + _ZIP64_EOCD_STRUCT.size - 1)
+        fields = _ZIP64_EOCD_STRUCT.unpack(record)
+        count, cd_size, cd_offset = fields[7], fields[8], fields[9]
+    if cd_offset >= tail_start:
+        return tail[cd_offset - tail_start : cd_offset - tail_start + cd_size], count
+    return fetch(cd_offset, cd_offset + cd_size - 1), count
+
+
+def _parse_central_directory(cd: bytes, count: int) -> list[dict]:
+    entries = []
+    pos = 0
+    for _ in range(count):
+        fields = _ZIP_CENTRAL_STRUCT.unpack_from(cd, pos)
+        if fields[0] != b"PK\x01\x02":
+            raise _StreamUnsupported("malformed central directory")
+        flags, method, crc, csize, usize, name_len, extra_len, comment_len = (
+            fields[5],
+            fields[6],
+            fields[9],
+            fields[10],
+            fields[11],
+            fields[12],
+            fields[13],
+            fields[14],
+        )
+        offset = fields[18]
+        pos += _ZIP_CENTRAL_STRUCT.size
+        name = cd[pos : pos + name_len].decode("utf-8" if flags & 0x800 else "cp437")
+        extra = cd[pos + name_len : pos + name_len + extra_len]
+        pos += name_len + extra_len + comment_len
+        # zip64 extra field: present values appear in the order usize, csize, offset
+        i = 0
+        while i + 4 <= len(extra):
+            tag, size = struct.unpack_from("<HH", extra, i)
+            if tag == 0x0001:
+                values = [struct.unpack_from("<Q", extra, j)[0] for j in range(i + 4, i + 4 + size - 7, 8)]
+                if usize == _ZIP32_MAX and values:
+                    usize = values.pop(0)
+                if csize == _ZIP32_MAX and values:
+                    csize = values.pop(0)
+                if offset == _ZIP32_MAX and values:
+                    offset = values.pop(0)
+                break
+            i += 4 + size
+        entries.append(
+            {
+                "name": name,
+                "flags": flags,
+                "method": method,
+                "crc": crc,
+                "csize": csize,
+                "usize": usize,
+                "offset": offset,
+                "extra_len": extra_len,
+            }
+        )
+    return entries
+
+
+def remote_extract(
+    client: GitLabClient,
+    url: str,
+    output_dir: Path,
+    members: list[str],
+    label: str,
+) -> tuple[list[Path], str, int] | None:
+    """
+    Extract only the members matching members from a remote zip without
+    downloading the whole archive: read the central directory from the tail
+    of the file with HTTP Range requests, then fetch just the byte ranges of
+    the wanted members.  Returns (extracted paths, sha256 of the central
+    directory, archive size), or None if the server doesn't support ranges.
+    """
+    fetched = _fetch_range(client, url, f"-{_ZIP_TAIL_BYTES}", label)
+    if fetched is None:
+        return None
+    tail, resp = fetched
+    # Ranges go straight to the final (post-redirect) URL
+    final_url = resp.url
+    total = _total_from_response(resp, 0)
+    if not total:
+        return None
+    tail_start = total - len(tail)
+
+    def fetch(start: int, end: int) -> bytes:
+        fetched = _fetch_range(client, final_url, f"{start}-{end}", label)
+        if fetched is None:
+            raise ArtifactError(f"{label}: server stopped honoring range requests")
+        return fetched[0]
+
+    cd, count = _zip_central_directory(tail, tail_start, fetch)
+    entries = [
+        e
+        for e in _parse_central_directory(cd, count)
+        if not e["name"].endswith("/") and _member_wanted(e["name"], members)
+    ]
+    for e in entries:
+        if e["flags"] & 0x1:
+            raise _StreamUnsupported("encrypted members")
+        if e["method"] not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2):
+            raise _StreamUnsupported(f"compression method {e['method']}")
+
+    def extract(entry: dict) -> Path | None:
+        target = _safe_member_path(output_dir, entry["name"])
+        if target is None:
+            return None
+        start = entry["offset"]
+        # the local header's extra field may differ from the central one; read it to find the data
+        header = fetch(start, start + _ZIP_LOCAL_HEADER_STRUCT.size - 1)
+        _, _, _, _, _, _, _, _, _, name_len, extra_len = _ZIP_LOCAL_HEADER_STRUCT.unpack(header)
+        data_start = start + _ZIP_LOCAL_HEADER_STRUCT.size + name_len + extra_len
+        decomp = None if entry["method"] == zipfile.ZIP_STORED else _decompressor(entry["method"])
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.exists():
+            # may be a hardlink into the artifact cache; replace rather than overwrite in place
+            target.unlink()
+        out_crc = received = 0
+        with open(target, "wb") as fh:
+            if entry["csize"]:
+                headers = _request_headers(client, client.url(final_url))
+                headers["Range"] = f"bytes={data_start}-{data_start + entry['csize'] - 1}"
+                with client.get(final_url, headers=headers, stream=True, allow_redirects=True, timeout=120) as resp:
+                    if resp.status_code != 206:
+                        _raise_for_download_status(resp, label)
+                        raise ArtifactError(f"{label}: server stopped honoring range requests")
+                    for block in resp.iter_content(MAX_CHUNK):
+                        received += len(block)
+                        out = decomp.decompress(block) if decomp else block
+                        out_crc = zlib.crc32(out, out_crc)
+                        fh.write(out)
+                metrics.add("bytes_downloaded", received)
+        if received != entry["csize"]:
+            raise ArtifactError(f"{label}: member {entry['name']} is truncated")
+        if out_crc != entry["crc"]:
+            raise ArtifactError(f"{label}: CRC mismatch for {entry['name']}")
+        return target
+
+    log_info(f"{label}: fetching {len(entries)} of {count} archive member(s) with range requests")
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="member") as pool:
+        extracted = [p for p in pool.map(metrics.bind(extract), entries) if p is not None]
+    return extracted, hashlib.sha256(cd).hexdigest(), total
+
+
+def fetch_artifact_files(
+    client: GitLabClient,
+    project_id: int,
+    job_id: int,
+    output_dir: Path,
+    paths: list[str],
+) -> list[Path]:
+    """Fetch individual files through GitLab's single-file artifact endpoint; missing ones are skipped."""
+    extracted = []
+    for path in paths:
+        target = _safe_member_path(output_dir, path)
+        if target is None:
+            continue
+        url = f"/projects/{project_id}/jobs/{job_id}/artifacts/{path}"
+        with client.get(url, stream=True, allow_redirects=True) as resp:
+            if resp.status_code == 404:
+                continue
+            _raise_for_download_status(resp, f"job {job_id} artifact {path}")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists():
+                target.unlink()
+            with open(target, "wb") as fh:
+                for block in resp.iter_content(MAX_CHUNK):
+                    fh.write(block)
+        extracted.append(target)
+    return extracted
 
 
 # ---------------------------------------------------------------------------
 # Artifact download + extraction
 # ---------------------------------------------------------------------------
+def _extract_zip(
+    zip_path: Path,
+    output_dir: Path,
+    members: list[str] | None,
+    sink_for=None,
+    done: dict[str, Path | None] | None = None,
+) -> list[Path]:
+    """
+    Extract the members matching members (all if None); the file list comes
+    from the central directory.  sink_for works as for _stream_extract.
+    Members in done (already handled by an interrupted _stream_extract) are
+    skipped; the paths it extracted are returned along with the rest.
+    """
+    done = done or {}
+    extracted = [path for path in done.values() if path is not None]
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not _member_wanted(info.filename, members) or info.filename in done:
+                continue
+            sink = sink_for(info.filename) if sink_for else None
+            if sink:
+                try:
+                    with zf.open(info) as src:
+                        for block in iter(lambda: src.read(MAX_CHUNK), b""):
+                            sink.write(block)
+                finally:
+                    sink.close()
+                continue
+            target = _safe_member_path(output_dir, info.filename)
+            if target is not None and target.is_file():
+                # may be a hardlink into the artifact cache; replace rather than overwrite in place
+                target.unlink()
+            extracted.append(Path(zf.extract(info, output_dir)))
+    return extracted
+
+
 def download_and_extract(
-    gitlab_url: str,
+    client: GitLabClient,
     project_id: int,
     job_id: int,
-    token: str,
     output_dir: Path,
     clean_output_dir: bool,
+    artifact_store: ArtifactStore | None = None,
+    expected_size: int | None = None,
+    connections: int = 1,
+    members: list[str] | None = None,
+    stream_extract: bool = True,
+    remote_paths: list[str] | None = None,
+    sink_for=None,
 ) -> list[Path]:
-    """Download the artifact zip and extract it. Returns list of extracted files."""
-    url = f"{gitlab_url}/api/v4/projects/{project_id}/jobs/{job_id}/artifacts"
+    """
+    Download the artifact zip and extract it. Returns list of extracted files.
+    Only members matching the members glob patterns are extracted (all if None).
+    With an artifact_store, a previously fetched job (whose artifact size
+    still matches expected_size, if known) is linked in from the store
+    instead of being downloaded again.
+
+    With stream_extract (and a single connection) members are extracted while
+    the archive downloads and the zip itself is never written to disk; a
+    dropped connection is resumed in-flight.  Otherwise the archive is saved
+    as artifacts.zip first; an interrupted download leaves
+    artifacts.zip.part behind, which the next call for the same job resumes.
+
+    remote_paths (a list, possibly empty) enables remote extraction: the
+    matching members are pulled out of the remote archive with range requests
+    (see remote_extract).  If the server doesn't do ranges, the listed paths
+    are tried through the single-file artifact endpoint before falling back to
+    a full download.
+
+    sink_for(member name) may return a sink that consumes a member instead of
+    writing it to disk (see EngineLoadPipe); such members are not returned,
+    and the job isn't added to the artifact store.
+    """
+    url = f"/projects/{project_id}/jobs/{job_id}/artifacts"
     zip_path = output_dir / "artifacts.zip"
+    label = f"job {job_id}"
 
     if clean_output_dir and output_dir.exists():
         log_info(f"Cleaning output directory: {output_dir}")
-        shutil.rmtree(output_dir)
+        # keep any partial download so it can be resumed
+        keep = {"artifacts.zip.part", "artifacts.zip.part.json"}
+        for child in output_dir.iterdir():
+            if child.name in keep:
+                continue
+            if child.is_dir() and not child.is_symlink():
+                shutil.rmtree(child)
+            else:
+                child.unlink()
 
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    log_info(f"Downloading artifacts from job {job_id}...")
-    with requests.get(url, headers=make_headers(token), stream=True, allow_redirects=True, timeout=120) as resp:
-        if resp.status_code == 404:
-            log_error(f"Artifacts not found for job {job_id}. They may not exist or may have expired.")
-            sys.exit(1)
-        elif resp.status_code == 401:
-            log_error("Authentication failed. Check your access token.")
-            sys.exit(1)
-        elif resp.status_code != 200:
-            log_error(f"Failed to download artifacts. HTTP status: {resp.status_code}")
-            sys.exit(1)
+    cached = (
+        artifact_store.lookup(client.gitlab_url, project_id, job_id, expected_size, members)
+        if artifact_store
+        else None
+    )
+    if cached:
+        metrics.annotate(source="cache")
+        log_info(f"Artifacts for job {job_id} found in cache: {cached}")
+        extracted = artifact_store.materialize(cached, output_dir)
+        log_info(f"Linked {len(extracted)} cached file(s) into: {output_dir}")
+        return extracted
 
-        with open(zip_path, "wb") as fh:
-            for chunk in resp.iter_content(chunk_size=8192):
-                fh.write(chunk)
+    extracted = None
+    if remote_paths is not None and members is not None:
+        try:
+            with metrics.span("remote_extract"):
+                remote = remote_extract(client, url, output_dir, members, label)
+        except _StreamUnsupported as e:
+            log_warn(f"Can't extract artifacts for job {job_id} remotely ({e}); downloading the archive")
+            remote = None
+        if remote:
+            metrics.annotate(source="remote")
+            extracted, digest, size = remote
+            log_info(f"Extracted {len(extracted)} file(s) to: {output_dir}")
+            if artifact_store:
+                artifact_store.add(client.gitlab_url, project_id, job_id, digest, size, extracted, output_dir, members)
+            return extracted
+        if remote_paths:
+            with metrics.span("fetch_files"):
+                extracted = fetch_artifact_files(client, project_id, job_id, output_dir, remote_paths)
+            if extracted:
+                metrics.annotate(source="single-file")
+                log_info(f"Fetched {len(extracted)} file(s) through the single-file artifact endpoint")
+                return extracted
+        extracted = None
 
-    log_info(f"Artifacts downloaded to: {zip_path}")
-    log_info("Extracting artifacts...")
-    with zipfile.ZipFile(zip_path, "r") as zf:
-        zf.extractall(output_dir)
+    # members a stream extraction got through before it had to give up
+    done: dict[str, Path | None] = {}
+    if stream_extract and connections <= 1:
+        log_info(f"Downloading and extracting artifacts from job {job_id}...")
+        stream = _ArtifactStream(client, url, label)
+        try:
+            with metrics.span("stream_extract"):
+                extracted = _stream_extract(stream, output_dir, members, sink_for, done)
+                stream.progress.finish()
+            metrics.annotate(source="stream")
+            digest, size = stream.sha256.hexdigest(), stream.offset
+        except _StreamUnsupported as e:
+            log_warn(
+                f"Can't stream-extract artifacts for job {job_id} ({e}); downloading the archive first"
+                + (f" (keeping the {len(done)} member(s) already extracted)" if done else "")
+            )
+        finally:
+            stream.close()
+
+    if extracted is None:
+        log_info(f"Downloading artifacts from job {job_id}...")
+        with metrics.span("download", connections=connections):
+            digest = download_file(client, url, zip_path, connections=connections, label=label)
+        log_info(f"Artifacts downloaded to: {zip_path}")
+        log_info("Extracting artifacts...")
+        with metrics.span("extract"):
+            extracted = _extract_zip(zip_path, output_dir, members, sink_for, done)
+        metrics.annotate(source="download")
+        digest, size = digest or _file_sha256(zip_path), zip_path.stat().st_size
 
-    extracted = [p for p in output_dir.rglob("*") if p.is_file() and p.name != "artifacts.zip"]
     log_info(f"Extracted {len(extracted)} file(s) to: {output_dir}")
+    if artifact_store and not sink_for:
+        artifact_store.add(client.gitlab_url, project_id, job_id, digest, size, extracted, output_dir, members)
     return extracted
 
 
 # ---------------------------------------------------------------------------
 # Job-specific post-processing handlers
 # ---------------------------------------------------------------------------
-def handle_create_tar(extracted: list[Path], output_dir: Path, container_engine: str, docker_image_tag: str) -> None:
-    load_docker_image(output_dir, container_engine, docker_image_tag)
+def handle_create_tar(
+    extracted: list[Path],
+    output_dir: Path,
+    container_engine: str,
+    docker_image_tag: str,
+    loaded: list[dict] | None = None,
+    image_loader: "ImageLoader | None" = None,
+) -> None:
+    load_docker_image(output_dir, container_engine, docker_image_tag, loaded=loaded, image_loader=image_loader)
+
+
+# Artifact members each handler actually reads (glob patterns; other jobs extract everything)
+JOB_ARTIFACT_MEMBERS: dict[str, list[str]] = {
+    "create-tar": ["*.tar"],
+    "vat": ["*.json"],
+}
+
+
+# Jobs whose few small members are pulled from the remote archive with range requests
+# instead of downloading it, with well-known paths for servers that don't support ranges
+JOB_REMOTE_PATHS: dict[str, list[str]] = {
+    "vat": ["vat_response.json", "parent_vat_response.json"],
+}
 
 
 # Severity order for display
@@ -338,21 +2108,102 @@ def _normalize_severity(s: str) -> str:
     return s.strip().capitalize() if s else "Unknown"
 
 
-def _summarize_vat_image(image: dict, is_parent: bool) -> dict:
-    """Extract the summary fields from a VAT image dict into a plain Python dict."""
-    from collections import defaultdict
+class _FindingsIndexer:
+    """
+    Builds the findings index for one image in a single pass, one finding at
+    a time: every finding is flattened once into the findings_detail shape,
+    kept in report order under "all" and filed under its severity, lowercased
+    status and package.  "counts" holds the per-severity status counts shown
+    in the summary.  Details are only kept if keep_details is set, and then
+    only those matching status_filter; the counts always cover everything.
+    sink, if given, is called with every detail (kept or not) as it is made.
+    """
+
+    def __init__(self, keep_details: bool = True, status_filter: list[str] | None = None, sink=None) -> None:
+        from collections import defaultdict
+
+        self.keep_details = keep_details
+        self.wanted = {s.lower() for s in status_filter} if status_filter else None
+        self.sink = sink
+        self.details: list[dict] = []
+        self.by_sev: dict[str, list[dict]] = defaultdict(list)
+        self.by_status: dict[str, list[dict]] = defaultdict(list)
+        self.by_package: dict[str, list[dict]] = defaultdict(list)
+        self.counts: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, f: dict) -> None:
+        state = f.get("state", {})
+        severity = _normalize_severity(f.get("severity", ""))
+        self.counts[severity][state.get("findingStatus", "Unknown")] += 1
+        status_key = (state.get("findingStatus") or "").lower()
+        keep = self.keep_details and (self.wanted is None or status_key in self.wanted)
+        if not keep and self.sink is None:
+            return
+        detail = {
+            "findingId": f.get("findingId"),
+            "identifier": f.get("identifier"),
+            "severity": severity,
+            "package": f.get("package"),
+            "packagePath": f.get("packagePath"),
+            "status": state.get("findingStatus"),
+            "description": f.get("description"),
+            "justification": (f.get("justificationGate") or {}).get("justification"),
+        }
+        if self.sink is not None:
+            self.sink(detail)
+        if not keep:
+            return
+        self.details.append(detail)
+        self.by_sev[severity].append(detail)
+        self.by_status[status_key].append(detail)
+        self.by_package[detail["package"] or "?"].append(detail)
+
+    def index(self) -> dict:
+        return {
+            "all": self.details,
+            "severity": dict(self.by_sev),
+            "status": dict(self.by_status),
+            "package": dict(self.by_package),
+            "counts": {sev: dict(self.counts[sev]) for sev in SEVERITY_ORDER if sev in self.counts},
+        }
+
+
+def _index_vat_findings(findings, keep_details: bool = True, status_filter: list[str] | None = None) -> dict:
+    """Index an iterable of raw VAT findings (see _FindingsIndexer)."""
+    indexer = _FindingsIndexer(keep_details, status_filter)
+    for f in findings:
+        indexer.add(f)
+    return indexer.index()
+
+
+def _indexed_findings(index: dict, severity: str | None = None, status_filter: list[str] | None = None) -> list[dict]:
+    """
+    Findings from an index in report order (only those of severity, if given),
+    limited to the statuses in status_filter if given.
+    """
+    rows = index["severity"].get(severity, []) if severity else index["all"]
+    if not status_filter:
+        return rows
+    wanted = {s.lower() for s in status_filter}
+    if severity:
+        return [d for d in rows if (d["status"] or "").lower() in wanted]
+    if len(wanted) == 1:
+        return index["status"].get(next(iter(wanted)), [])
+    return [d for d in rows if (d["status"] or "").lower() in wanted]
 
+
+def _summarize_vat_image(image: dict, is_parent: bool, index: dict | None = None) -> dict:
+    """
+    Extract the summary fields from a VAT image dict into a plain Python dict,
+    with the findings indexed once (see _FindingsIndexer) for both renderers.
+    index is the prebuilt index when the findings were consumed while streaming.
+    """
     name = image.get("imageName", "?")
     tag = image.get("tag", "?")
     state = image.get("state", {})
     factors = state.get("factors", {})
-    by_sev: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
-    for f in image.get("findings", []):
-        sev = _normalize_severity(f.get("severity", ""))
-        status = f.get("state", {}).get("findingStatus", "Unknown")
-        by_sev[sev][status] += 1
-    findings_summary = {sev: dict(by_sev[sev]) for sev in SEVERITY_ORDER if sev in by_sev}
-    raw_findings = image.get("findings", [])
+    if index is None:
+        index = _index_vat_findings(image.get("findings", []))
     return {
         "isParent": is_parent,
         "imageName": name,
@@ -363,8 +2214,8 @@ def _summarize_vat_image(image: dict, is_parent: bool) -> dict:
         "ora": state.get("ora", "?"),
         "percentVerified": state.get("percentVerified", "?"),
         "issues": factors.get("abc", {}).get("issues", []),
-        "findings": findings_summary,
-        "raw_findings": raw_findings,
+        "findings": index["counts"],
+        "index": index,
     }
 
 
@@ -403,24 +2254,15 @@ def _print_vat_image(summary: dict, long_output: bool = False, status_filter: li
         if not long_output:
             continue
         # Individual findings for this severity, filtered by status
-        sev_findings = [
-            f
-            for f in summary["raw_findings"]
-            if _normalize_severity(f.get("severity", "")) == sev
-            and (
-                not status_filter
-                or f.get("state", {}).get("findingStatus", "").lower() in {s.lower() for s in status_filter}
-            )
-        ]
-        for f in sev_findings:
-            fid = f.get("findingId", "?")
-            identifier = f.get("identifier", "?")
-            package = f.get("package", "?")
-            pkg_path = f.get("packagePath") or ""
-            status = f.get("state", {}).get("findingStatus", "?")
-            desc = (f.get("description") or "").strip()
+        for f in _indexed_findings(summary["index"], sev, status_filter):
+            fid = f["findingId"] if f["findingId"] is not None else "?"
+            identifier = f["identifier"] if f["identifier"] is not None else "?"
+            package = f["package"] if f["package"] is not None else "?"
+            pkg_path = f["packagePath"] or ""
+            status = f["status"] if f["status"] is not None else "?"
+            desc = (f["description"] or "").strip()
             pkg_str = f"{package}  {pkg_path}" if pkg_path else package
-            just = (f.get("justificationGate") or {}).get("justification", "").strip()
+            just = (f["justification"] or "").strip()
             print(f"      [{fid}] {identifier}  {pkg_str}  ({status})")
             if desc:
                 for line in textwrap.wrap(desc, width=100, initial_indent="        ", subsequent_indent="        "):
@@ -431,27 +2273,177 @@ def _print_vat_image(summary: dict, long_output: bool = False, status_filter: li
                 print("\n          ".join(just_lines))
 
 
-def _collect_vat_images(ordered: list) -> list[tuple[dict, bool]]:
+class _JsonStream:
+    """
+    Minimal pull parser over a text file: the caller walks objects and arrays
+    with members()/elements() and decodes the values it wants whole with
+    value() (json's C raw_decode), so only one value at a time is in memory.
+    """
+
+    CHUNK = 1 << 20
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, fh) -> None:
+        self.fh = fh
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        data = self.fh.read(size)
+        if not data:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at end of input), not consumed."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill(self.CHUNK):
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"expected {ch!r}, got {got!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete value."""
+        self.peek()
+        size = self.CHUNK
+        while True:
+            try:
+                obj, end = self._decoder.raw_decode(self.buf, self.pos)
+                # a number running into the end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(size)
+            size *= 2  # a value spanning many chunks is re-scanned O(log n) times, not O(n)
+
+    def members(self):
+        """Iterate the keys of the object that comes next; consume each value before the next key."""
+        self.expect("{")
+        first = True
+        while self.peek() != "}":
+            if not first:
+                self.expect(",")
+            first = False
+            key = self.value()
+            self.expect(":")
+            yield key
+        self.pos += 1
+
+    def elements(self):
+        """Iterate the array that comes next; consume each element before the next."""
+        self.expect("[")
+        first = True
+        while self.peek() != "]":
+            if not first:
+                self.expect(",")
+            first = False
+            yield
+        self.pos += 1
+
+
+def _vat_image_events(js: _JsonStream, is_parent: bool):
+    meta = {}
+    for key in js.members():
+        if key == "findings" and js.peek() == "[":
+            for _ in js.elements():
+                yield ("finding", js.value(), is_parent)
+        else:
+            meta[key] = js.value()
+    yield ("image", meta, is_parent)
+
+
+def _vat_events(path: Path):
+    """
+    Walk a VAT response with _JsonStream, yielding ("finding", finding,
+    is_parent) for each entry of an image's findings[] as it is parsed, then
+    ("image", image_without_findings, is_parent) once the image object ends.
+    Handles {"image": {...}} and {"images": [{"image": {...}}, ...]}.
+    """
+    with open(path, encoding="utf-8") as fh:
+        js = _JsonStream(fh)
+        if js.peek() != "{":
+            return
+        for key in js.members():
+            if key == "image" and js.peek() == "{":
+                yield from _vat_image_events(js, False)
+            elif key == "images" and js.peek() == "[":
+                for _ in js.elements():
+                    if js.peek() != "{":
+                        js.value()
+                        continue
+                    for entry_key in js.members():
+                        if entry_key == "image" and js.peek() == "{":
+                            yield from _vat_image_events(js, True)
+                        else:
+                            js.value()
+            else:
+                js.value()
+
+
+def _iter_vat_summaries(
+    ordered: list,
+    show_parent: bool = False,
+    keep_details: bool = False,
+    status_filter: list[str] | None = None,
+    run: "VatRun | None" = None,
+):
     """
-    Parse the ordered list of (filename, Path) tuples and return
-    [(image_dict, is_parent), ...] in display order.
+    Stream the ordered list of (filename, Path) tuples and yield
+    (summary, shown) per image in display order, where shown is False for
+    parent images hidden by show_parent.  Findings are indexed as they are
+    parsed; their details are only kept for shown images when keep_details
+    is set, and only those matching status_filter, so memory stays flat in
+    the size of the report.  With a run, every image and every finding is
+    written to the VAT store as it is parsed, and a file that fails to
+    parse marks the run failed.
     """
-    result = []
     for filename, json_file in ordered:
+        indexers: dict[bool, _FindingsIndexer] = {}
+        image_ids: dict[bool, int] = {}
         try:
-            data = json.loads(json_file.read_text())
-        except json.JSONDecodeError as e:
+            for kind, obj, is_parent in _vat_events(json_file):
+                shown = show_parent or not is_parent
+                indexer = indexers.get(is_parent)
+                if indexer is None:
+                    sink = None
+                    if run is not None:
+                        image_id = image_ids[is_parent] = run.begin_image(is_parent)
+                        sink = lambda detail, image_id=image_id: run.add_finding(image_id, detail)
+                    indexer = indexers[is_parent] = _FindingsIndexer(keep_details and shown, status_filter, sink)
+                if kind == "finding":
+                    indexer.add(obj)
+                    continue
+                del indexers[is_parent]
+                image_id = image_ids.pop(is_parent, None)
+                if obj or indexer.details or indexer.counts:
+                    summary = _summarize_vat_image(obj, is_parent, indexer.index())
+                    if image_id is not None:
+                        run.end_image(image_id, summary)
+                    yield summary, shown
+                elif image_id is not None:
+                    run.drop_image(image_id)
+        except ValueError as e:
             log_error(f"Failed to parse {json_file}: {e}")
+            if run is not None:
+                run.failed = True
             continue
-        if "image" in data:
-            result.append((data["image"], False))
-        elif "images" in data:
-            for entry in data.get("images", []):
-                img = entry.get("image", {})
-                if img:
-                    result.append((img, True))
-        # else: unrecognized structure (e.g. vat_request.json) — silently skip
-    return result
+        # unrecognized structures (e.g. vat_request.json) yield nothing
 
 
 def handle_vat(
@@ -460,54 +2452,342 @@ def handle_vat(
     show_parent: bool = False,
     long_output: bool = False,
     status_filter: list[str] | None = None,
+    vat_store: "VatStore | None" = None,
+    source: dict | None = None,
 ) -> None:
+    """
+    Print the VAT summaries found in the extracted JSON files.  With a
+    vat_store, every image (parents included) is also recorded there under
+    source ({service, project_id, job_id, ref}).
+    """
     json_files = {f.name: f for f in extracted if f.suffix.lower() == ".json"}
     if not json_files:
         log_warn("No JSON files found in VAT artifacts.")
         return
 
-    # Process vat_response.json first, then parent_vat_response.json, then any others
-    ordered: list[tuple[str, Path]] = []
-    for priority in ("vat_response.json", "parent_vat_response.json"):
-        if priority in json_files:
-            ordered.append((priority, json_files.pop(priority)))
-    for name, path in sorted(json_files.items()):
-        ordered.append((name, path))
+    # Process vat_response.json first, then parent_vat_response.json, then any others
+    ordered: list[tuple[str, Path]] = []
+    for priority in ("vat_response.json", "parent_vat_response.json"):
+        if priority in json_files:
+            ordered.append((priority, json_files.pop(priority)))
+    for name, path in sorted(json_files.items()):
+        ordered.append((name, path))
+
+    seen = False
+    out = {}
+    with vat_store.record(**source) if vat_store else contextlib.nullcontext() as run:
+        recording = run if run is not None and run.id is not None else None
+        for s, shown in _iter_vat_summaries(ordered, show_parent, long_output, status_filter, recording):
+            seen = True
+            if not shown:
+                continue
+            if output_format == "json":
+                key = f"{s['imageName']}:{s['tag']}"
+                entry = {k: v for k, v in s.items() if k != "index"}
+                if long_output:
+                    entry["findings_detail"] = _indexed_findings(s["index"], status_filter=status_filter)
+                out[key] = entry
+            else:
+                # text output is printed per image as soon as its findings are indexed
+                _print_vat_image(s, long_output=long_output, status_filter=status_filter)
+    if output_format == "json" and seen:
+        print(json.dumps(out, indent=2))
+
+
+# ---------------------------------------------------------------------------
+# VAT findings store
+# ---------------------------------------------------------------------------
+VAT_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    recorded REAL NOT NULL,
+    service TEXT NOT NULL,
+    project_id INTEGER NOT NULL,
+    job_id INTEGER NOT NULL,
+    ref TEXT,
+    complete INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (service, job_id)
+);
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    image TEXT NOT NULL,
+    is_parent INTEGER NOT NULL,
+    built TEXT,
+    abc TEXT,
+    ora TEXT,
+    percent_verified TEXT,
+    vat_url TEXT
+);
+CREATE TABLE IF NOT EXISTS findings (
+    image_id INTEGER NOT NULL REFERENCES images(id) ON DELETE CASCADE,
+    finding_id TEXT,
+    identifier TEXT,
+    severity TEXT,
+    package TEXT,
+    package_path TEXT,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_service ON runs (service, id);
+CREATE INDEX IF NOT EXISTS images_run ON images (run_id);
+CREATE INDEX IF NOT EXISTS findings_image ON findings (image_id);
+CREATE INDEX IF NOT EXISTS findings_identifier ON findings (identifier);
+CREATE INDEX IF NOT EXISTS findings_package ON findings (package);
+CREATE INDEX IF NOT EXISTS findings_status ON findings (status COLLATE NOCASE);
+"""
+
+
+class VatStore:
+    """
+    SQLite store of VAT results across services and runs.  A run is one vat
+    job of one service; recording the same (service, job) again is a no-op,
+    since job artifacts never change.  Queries look at each service's latest
+    complete run (and the one before it for changes()), so they never need
+    GitLab.  Safe to share between batch worker threads: each run is recorded
+    in a transaction of its own (see record()).
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(VAT_STORE_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # --- recording -------------------------------------------------------
+
+    def record(self, service: str, project_id: int, job_id: int, ref: str = "") -> "VatRun":
+        """Record one run: `with store.record(...) as run:` (see VatRun)."""
+        return VatRun(self, service, project_id, job_id, ref)
+
+    # --- queries ---------------------------------------------------------
+
+    _LATEST = "SELECT MAX(id) FROM runs WHERE complete GROUP BY service"
+
+    def carrying(self, identifier: str, include_parents: bool = False) -> list[dict]:
+        """Images in each service's latest run that carry identifier (e.g. a CVE)."""
+        rows = self.conn.execute(
+            f"""
+            SELECT r.service, r.job_id, i.image, i.is_parent, f.package, f.package_path, f.severity, f.status
+            FROM findings f JOIN images i ON i.id = f.image_id JOIN runs r ON r.id = i.run_id
+            WHERE f.identifier = ? AND r.id IN ({self._LATEST}) AND (? OR NOT i.is_parent)
+            ORDER BY r.service, i.image, f.package
+            """,
+            (identifier, include_parents),
+        )
+        keys = ("service", "job_id", "image", "is_parent", "package", "package_path", "severity", "status")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def status_counts(self, status: str, include_parents: bool = False) -> list[dict]:
+        """Number of findings with status (case-insensitive) per service, from each latest run."""
+        rows = self.conn.execute(
+            f"""
+            SELECT r.service, r.job_id, COUNT(f.image_id)
+            FROM runs r JOIN images i ON i.run_id = r.id
+            LEFT JOIN findings f ON f.image_id = i.id AND f.status = ? COLLATE NOCASE
+            WHERE r.id IN ({self._LATEST}) AND (? OR NOT i.is_parent)
+            GROUP BY r.id ORDER BY COUNT(f.image_id) DESC, r.service
+            """,
+            (status, include_parents),
+        )
+        return [{"service": svc, "job_id": job_id, "count": n} for svc, job_id, n in rows]
+
+    def changes(self, include_parents: bool = False) -> list[dict]:
+        """
+        Per service, findings added, removed or changed status between the
+        previous and latest runs.  A finding is identified by image name
+        (without tag), identifier, package and package path.
+        """
+        runs: dict[str, list[tuple[int, int]]] = {}
+        for run_id, service, job_id in self.conn.execute(
+            "SELECT id, service, job_id FROM runs WHERE complete ORDER BY service, id DESC"
+        ):
+            if len(runs.setdefault(service, [])) < 2:
+                runs[service].append((run_id, job_id))
+        result = []
+        for service, pair in runs.items():
+            if len(pair) < 2:
+                continue
+            (new_run, new_job), (old_run, old_job) = pair
+            new, old = self._finding_states(new_run, include_parents), self._finding_states(old_run, include_parents)
+            diff = {"service": service, "old_job_id": old_job, "new_job_id": new_job, "added": [], "removed": [], "changed": []}
+            for key in sorted(new.keys() - old.keys(), key=str):
+                diff["added"].append(self._change_row(key, None, new[key]))
+            for key in sorted(old.keys() - new.keys(), key=str):
+                diff["removed"].append(self._change_row(key, old[key], None))
+            for key in sorted(new.keys() & old.keys(), key=str):
+                if new[key] != old[key]:
+                    diff["changed"].append(self._change_row(key, old[key], new[key]))
+            result.append(diff)
+        return result
+
+    def _finding_states(self, run_id: int, include_parents: bool) -> dict[tuple, str]:
+        rows = self.conn.execute(
+            """
+            SELECT i.image, f.identifier, f.package, f.package_path, f.status
+            FROM findings f JOIN images i ON i.id = f.image_id
+            WHERE i.run_id = ? AND (? OR NOT i.is_parent)
+            """,
+            (run_id, include_parents),
+        )
+        return {(image.rsplit(":", 1)[0], ident, pkg, path): status for image, ident, pkg, path, status in rows}
+
+    @staticmethod
+    def _change_row(key: tuple, old_status: str | None, new_status: str | None) -> dict:
+        image, identifier, package, package_path = key
+        return {
+            "image": image,
+            "identifier": identifier,
+            "package": package,
+            "packagePath": package_path,
+            "old_status": old_status,
+            "new_status": new_status,
+        }
+
+
+class VatRun:
+    """
+    One run being recorded by VatStore.record().  Images and their findings
+    are written as they are parsed, inside one transaction that holds the
+    store until the block ends, so concurrent batch workers never commit
+    each other's half-written runs.  Leaving the block commits the run,
+    marked complete unless failed was set (a file didn't parse); an
+    exception rolls it back.  Queries ignore incomplete runs, and the next
+    attempt replaces them.  id is None if the job is already stored.
+    """
+
+    def __init__(self, store: VatStore, service: str, project_id: int, job_id: int, ref: str) -> None:
+        self.store = store
+        self.source = (service, project_id, job_id, ref)
+        self.id: int | None = None
+        self.failed = False
+
+    def __enter__(self) -> "VatRun":
+        service, project_id, job_id, ref = self.source
+        conn = self.store.conn
+        self.store._lock.acquire()
+        try:
+            row = conn.execute(
+                "SELECT id, complete FROM runs WHERE service = ? AND job_id = ?",
+                (service, job_id),
+            ).fetchone()
+            if row and row[1]:
+                log_info(f"VAT results of {service} job {job_id} already stored")
+                return self
+            if row:  # an interrupted or failed earlier attempt
+                conn.execute("DELETE FROM runs WHERE id = ?", (row[0],))
+            self.id = conn.execute(
+                "INSERT INTO runs (recorded, service, project_id, job_id, ref) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), service, project_id, job_id, ref),
+            ).lastrowid
+        except BaseException:
+            conn.rollback()
+            self.store._lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        conn = self.store.conn
+        try:
+            if exc_type is not None:
+                conn.rollback()
+                return
+            if self.id is not None and self.failed:
+                log_warn(f"VAT results of {self.source[0]} job {self.source[2]} left incomplete")
+            elif self.id is not None:
+                conn.execute("UPDATE runs SET complete = 1 WHERE id = ?", (self.id,))
+            conn.commit()
+        finally:
+            self.store._lock.release()
 
-    images = _collect_vat_images(ordered)
-    if not images:
-        return
+    def begin_image(self, is_parent: bool) -> int:
+        """Add an image whose findings are about to be parsed; end_image() fills in the rest."""
+        return self.store.conn.execute(
+            "INSERT INTO images (run_id, image, is_parent) VALUES (?, '?', ?)",
+            (self.id, int(is_parent)),
+        ).lastrowid
+
+    def add_finding(self, image_id: int, d: dict) -> None:
+        self.store.conn.execute(
+            "INSERT INTO findings (image_id, finding_id, identifier, severity, package, package_path, status)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                image_id,
+                None if d["findingId"] is None else str(d["findingId"]),
+                d["identifier"],
+                d["severity"],
+                d["package"],
+                d["packagePath"],
+                d["status"],
+            ),
+        )
+
+    def end_image(self, image_id: int, summary: dict) -> None:
+        self.store.conn.execute(
+            "UPDATE images SET image = ?, built = ?, abc = ?, ora = ?, percent_verified = ?, vat_url = ? WHERE id = ?",
+            (
+                f"{summary['imageName']}:{summary['tag']}",
+                str(summary["built"]),
+                str(summary["abc"]),
+                str(summary["ora"]),
+                str(summary["percentVerified"]),
+                summary["vatUrl"],
+                image_id,
+            ),
+        )
+
+    def drop_image(self, image_id: int) -> None:
+        self.store.conn.execute("DELETE FROM images WHERE id = ?", (image_id,))
 
-    summaries = [_summarize_vat_image(img, is_parent) for img, is_parent in images]
-    if not show_parent:
-        summaries = [s for s in summaries if not s["isParent"]]
+
+def run_vat_query(store: VatStore, query: list[str], output_format: str = "text", include_parents: bool = False) -> int:
+    """
+    Answer a --vat-query from the store and print the result.  Queries:
+    "cve <identifier>", "status <status>" and "changes".  Returns the exit code.
+    """
+    kind, rest = query[0].lower(), " ".join(query[1:])
+    if kind in ("cve", "identifier") and rest:
+        rows = store.carrying(rest, include_parents)
+    elif kind == "status" and rest:
+        rows = store.status_counts(rest, include_parents)
+    elif kind == "changes" and not rest:
+        rows = store.changes(include_parents)
+    else:
+        log_error(f"Unknown VAT query: {' '.join(query)!r}; expected 'cve <ID>', 'status <STATUS>' or 'changes'")
+        return 2
 
     if output_format == "json":
-        out = {}
-        for s in summaries:
-            key = f"{s['imageName']}:{s['tag']}"
-            entry = {k: v for k, v in s.items() if k != "raw_findings"}
-            if long_output:
-                entry["findings_detail"] = [
-                    {
-                        "findingId": f.get("findingId"),
-                        "identifier": f.get("identifier"),
-                        "severity": _normalize_severity(f.get("severity", "")),
-                        "package": f.get("package"),
-                        "packagePath": f.get("packagePath"),
-                        "status": f.get("state", {}).get("findingStatus"),
-                        "description": f.get("description"),
-                        "justification": (f.get("justificationGate") or {}).get("justification"),
-                    }
-                    for f in s["raw_findings"]
-                    if not status_filter
-                    or f.get("state", {}).get("findingStatus", "").lower() in {s.lower() for s in status_filter}
-                ]
-            out[key] = entry
-        print(json.dumps(out, indent=2))
+        print(json.dumps(rows, indent=2))
+        return 0
+    if not rows:
+        print("No matching VAT results in the store.")
+        return 0
+    if kind == "status":
+        width = max(len(r["service"]) for r in rows)
+        for r in rows:
+            print(f"{r['service']:<{width}}  {r['count']:>6}  (job {r['job_id']})")
+    elif kind == "changes":
+        for r in rows:
+            print(f"\n=== {r['service']}: job {r['old_job_id']} -> {r['new_job_id']} ===")
+            if not (r["added"] or r["removed"] or r["changed"]):
+                print("  no changes")
+            for label in ("added", "removed", "changed"):
+                for c in r[label]:
+                    status = c["new_status"] if label == "added" else c["old_status"]
+                    if label == "changed":
+                        status = f"{c['old_status']} -> {c['new_status']}"
+                    print(f"  {label:<8} {c['image']}  {c['identifier']}  {c['package']}  ({status})")
     else:
-        for s in summaries:
-            _print_vat_image(s, long_output=long_output, status_filter=status_filter)
+        for r in rows:
+            suffix = " (parent)" if r["is_parent"] else ""
+            pkg = f"{r['package']}  {r['package_path']}" if r["package_path"] else r["package"]
+            print(f"{r['service']}  {r['image']}{suffix}  {pkg}  {r['severity']}  ({r['status']})")
+    return 0
 
 
 def handle_unknown_job(job_name: str, extracted: list[Path]) -> None:
@@ -526,17 +2806,25 @@ def dispatch_job(
     show_parent: bool = False,
     long_output: bool = False,
     status_filter: list[str] | None = None,
+    loaded: list[dict] | None = None,
+    image_loader: "ImageLoader | None" = None,
+    vat_store: VatStore | None = None,
+    source: dict | None = None,
 ) -> None:
     if job_name == "create-tar":
-        handle_create_tar(extracted, output_dir, container_engine, docker_image_tag)
+        with metrics.span("image_load"):
+            handle_create_tar(extracted, output_dir, container_engine, docker_image_tag, loaded, image_loader)
     elif job_name == "vat":
-        handle_vat(
-            extracted,
-            output_format=output_format,
-            show_parent=show_parent,
-            long_output=long_output,
-            status_filter=status_filter,
-        )
+        with _output_lock, metrics.span("vat_render"):
+            handle_vat(
+                extracted,
+                output_format=output_format,
+                show_parent=show_parent,
+                long_output=long_output,
+                status_filter=status_filter,
+                vat_store=vat_store,
+                source=source,
+            )
     else:
         handle_unknown_job(job_name, extracted)
 
@@ -544,59 +2832,283 @@ def dispatch_job(
 # ---------------------------------------------------------------------------
 # Docker image load
 # ---------------------------------------------------------------------------
-def load_docker_image(output_dir: Path, container_engine: str, image_tag: str) -> None:
+class EngineLoadPipe:
+    """
+    Sink that feeds an image tarball into `<engine> load` on stdin as it is
+    extracted from the artifact archive, so the tar never touches the disk.
+    Works with docker and podman.  close() waits for the engine and returns
+    a result dict for load_docker_image().
+    """
+
+    def __init__(self, container_engine: str, name: str) -> None:
+        self.name = name
+        self.failed = False
+        self.started = time.monotonic()
+        log_info(f"Streaming {name} into {container_engine} load...")
+        self.proc = subprocess.Popen(
+            [container_engine, "load"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        # drain output concurrently so a chatty engine can't block on a full pipe while we write
+        self._out: dict[str, bytes] = {}
+        self._readers = [
+            threading.Thread(target=lambda k=k, f=f: self._out.__setitem__(k, f.read()), daemon=True)
+            for k, f in (("stdout", self.proc.stdout), ("stderr", self.proc.stderr))
+        ]
+        for reader in self._readers:
+            reader.start()
+
+    def write(self, data: bytes) -> None:
+        if self.failed:
+            return
+        try:
+            self.proc.stdin.write(data)
+        except (BrokenPipeError, ValueError):
+            # engine exited early; keep consuming the archive, the error surfaces in close()
+            self.failed = True
+
+    def close(self) -> dict:
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.proc.wait()
+        for reader in self._readers:
+            reader.join()
+        return {
+            "source": self.name,
+            "returncode": returncode,
+            "stdout": self._out.get("stdout", b"").decode(errors="replace"),
+            "stderr": self._out.get("stderr", b"").decode(errors="replace"),
+            "load_seconds": time.monotonic() - self.started,
+        }
+
+
+def engine_load_sinks(container_engine: str, loaded: list[dict]):
+    """
+    sink_for() callback for download_and_extract that pipes each image
+    tarball under ci-artifacts/tar/ straight into the container engine,
+    appending its load result to loaded.  Other members go to disk as usual.
+    """
+
+    class _Sink(EngineLoadPipe):
+        def close(self) -> dict:
+            result = super().close()
+            loaded.append(result)
+            return result
+
+    def sink_for(name: str) -> EngineLoadPipe | None:
+        if not fnmatch.fnmatchcase(name, "*ci-artifacts/tar/*.tar"):
+            return None
+        return _Sink(container_engine, name)
+
+    return sink_for
+
+
+# Parallel `<engine> load`s per engine: dockerd unpacks layers of separate
+# loads concurrently, while podman serializes on its storage lock, so extra
+# podman loads only add contention.
+DEFAULT_LOAD_CONCURRENCY = {"docker": 2, "podman": 1}
+
+
+def _default_image_tag(tar_name: str) -> str:
+    stem = Path(tar_name).stem  # e.g. misp-modules-4698286-amd64
+    default_name = re.sub(r"-\d+.*$", "", stem)  # -> misp-modules
+    if default_name == stem:  # no -<digits> found, drop last segment
+        default_name = stem.rsplit("-", 1)[0]
+    return f"{default_name}-cibuild:latest"
+
+
+def _tar_image_ids(tar_file: Path) -> list[str]:
+    """
+    Image IDs (config digests) listed in the manifest.json of a `docker save`
+    / `podman save` tarball, or [] if it has none we can read.  Only the tar
+    headers are walked, the layer blobs are seeked over.
+    """
+    try:
+        with tarfile.open(tar_file, "r:") as tf:
+            fh = tf.extractfile("manifest.json")
+            manifest = json.load(fh) if fh else []
+    except (tarfile.TarError, KeyError, OSError, ValueError):
+        return []
+    ids = []
+    for entry in manifest if isinstance(manifest, list) else []:
+        # "Config" is "<hex>.json" (classic layout) or "blobs/sha256/<hex>" (OCI layout)
+        digest = Path(str((entry or {}).get("Config", ""))).name.removesuffix(".json")
+        if re.fullmatch(r"[0-9a-f]{64}", digest):
+            ids.append(f"sha256:{digest}")
+    return ids
+
+
+class ImageLoader:
+    """
+    Loads, tags and inspects image tarballs with bounded concurrency.
+
+    Loads run on a pool sized for the container engine; tag + inspect for an
+    image are queued on a second pool as soon as its load finishes, so they
+    overlap with the next load.  One loader is shared by every job of a batch
+    run.  Concurrency defaults to $IMAGE_LOAD_CONCURRENCY, else a per-engine
+    value from DEFAULT_LOAD_CONCURRENCY.  A load is skipped when the engine already has an image with the ID
+    recorded in the tarball's manifest.
+    """
+
+    def __init__(self, container_engine: str, concurrency: int | None = None) -> None:
+        self.container_engine = container_engine
+        concurrency = concurrency or int(os.environ.get("IMAGE_LOAD_CONCURRENCY") or 0)
+        if not concurrency:
+            concurrency = DEFAULT_LOAD_CONCURRENCY.get(Path(container_engine).name, 1)
+        self._loads = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="image-load")
+        self._tags = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="image-tag")
+
+    def close(self) -> None:
+        self._loads.shutdown(wait=True)
+        self._tags.shutdown(wait=True)
+
+    def __enter__(self) -> "ImageLoader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _present(self, image_ids: list[str]) -> bool:
+        for image_id in image_ids:
+            result = subprocess.run(
+                [self.container_engine, "image", "inspect", "--format", "{{.Id}}", image_id],
+                capture_output=True,
+                text=True,
+            )
+            if result.returncode != 0:
+                return False
+        return bool(image_ids)
+
+    def _load(self, tar_file: Path) -> dict:
+        started = time.monotonic()
+        image_ids = _tar_image_ids(tar_file)
+        if self._present(image_ids):
+            return {
+                "source": str(tar_file),
+                "returncode": 0,
+                "stdout": "",
+                "stderr": "",
+                "ref": image_ids[0],
+                "skipped": True,
+                "load_seconds": time.monotonic() - started,
+            }
+        log_info(f"Loading {self.container_engine} image from {tar_file.name}...")
+        result = subprocess.run(
+            [self.container_engine, "load", "-i", str(tar_file)],
+            capture_output=True,
+            text=True,
+        )
+        return {
+            "source": str(tar_file),
+            "returncode": result.returncode,
+            "stdout": result.stdout,
+            "stderr": result.stderr,
+            "load_seconds": time.monotonic() - started,
+        }
+
+    def _finish(self, result: dict, image_tag: str) -> dict:
+        started = time.monotonic()
+        result["tagged"] = _finish_image_load(self.container_engine, result, image_tag)
+        result["tag_seconds"] = time.monotonic() - started
+        image = Path(result["source"]).name
+        metrics.record("engine_load", result["load_seconds"], image=image, skipped=bool(result.get("skipped")))
+        metrics.record("engine_tag", result["tag_seconds"], image=image, ok=result["tagged"])
+        return result
+
+    def load(self, tars: list[tuple[Path, str]], piped: list[tuple[dict, str]] | None = None) -> list[dict]:
+        """
+        Load every (tar_file, image_tag) in tars and tag it; piped holds
+        (result, image_tag) for loads already done by EngineLoadPipe, which
+        only need tagging.  Blocks until all are done and returns the results.
+        """
+        tag_futures = [self._tags.submit(self._finish, result, tag) for result, tag in (piped or [])]
+        load_futures = {self._loads.submit(self._load, tar_file): tag for tar_file, tag in tars}
+        for future in as_completed(load_futures):
+            tag_futures.append(self._tags.submit(self._finish, future.result(), load_futures[future]))
+        results = [f.result() for f in tag_futures]
+        for r in results:
+            name = Path(r["source"]).name
+            if r.get("skipped"):
+                log_info(f"{name}: already present as {r['ref'][:19]}, load skipped ({r['load_seconds']:.1f}s)")
+            else:
+                status = "ok" if r["tagged"] else "failed"
+                log_info(f"{name}: {status}, load {r['load_seconds']:.1f}s, tag+inspect {r['tag_seconds']:.1f}s")
+        return results
+
+
+def load_docker_image(
+    output_dir: Path,
+    container_engine: str,
+    image_tag: str,
+    loaded: list[dict] | None = None,
+    image_loader: ImageLoader | None = None,
+) -> None:
+    """
+    Load every image tarball in the extracted artifacts and tag it.  Images
+    already piped into the engine during extraction (loaded holds
+    EngineLoadPipe results) are only tagged.  Uses image_loader if given
+    (shared across a batch run), otherwise a loader of its own.
+    """
     log_info(f"Looking for {container_engine} image in extracted artifacts...")
 
     # Prefer ci-artifacts/tar/**/*.tar
-    tar_file: Path | None = None
-    candidates = list(output_dir.glob("**/ci-artifacts/tar/**/*.tar"))
-    if candidates:
-        tar_file = candidates[0]
-    else:
-        log_warn(f"No tar found under ci-artifacts/tar/; falling back to any *.tar in {output_dir}")
-        all_tars = list(output_dir.rglob("*.tar"))
-        if all_tars:
-            tar_file = all_tars[0]
+    with metrics.span("find_tars"):
+        tar_files = sorted(output_dir.glob("**/ci-artifacts/tar/**/*.tar"))
+        if not tar_files and not loaded:
+            log_warn(f"No tar found under ci-artifacts/tar/; falling back to any *.tar in {output_dir}")
+            tar_files = sorted(output_dir.rglob("*.tar"))
 
-    if tar_file is None:
+    if not tar_files and not loaded:
         log_error(f"No {container_engine} tar file found in artifacts (searched: {output_dir})")
         return
 
-    log_info(f"Using tar file: {tar_file}")
+    for tar_file in tar_files:
+        log_info(f"Using tar file: {tar_file}")
+
+    if image_tag and len(tar_files) + len(loaded or []) > 1:
+        log_warn(f"Several image tarballs found; ignoring tag {image_tag} and deriving one per tarball")
+        image_tag = ""
+
+    loader = image_loader or ImageLoader(container_engine)
+    try:
+        loader.load([(tar_file, image_tag) for tar_file in tar_files], [(r, image_tag) for r in loaded or []])
+    finally:
+        if loader is not image_loader:
+            loader.close()
+
 
+def _finish_image_load(container_engine: str, result: dict, image_tag: str) -> bool:
+    """Check an `<engine> load` result, then tag and inspect the loaded image.  Returns True if tagged."""
+    tar_file = result["source"]
     # Derive a default tag from the filename if none was provided
     if not image_tag:
-        stem = tar_file.stem  # e.g. misp-modules-4698286-amd64
-        default_name = re.sub(r"-\d+.*$", "", stem)  # -> misp-modules
-        if default_name == stem:  # no -<digits> found, drop last segment
-            default_name = stem.rsplit("-", 1)[0]
-        image_tag = f"{default_name}-cibuild:latest"
+        image_tag = _default_image_tag(tar_file)
         log_info(f"No {container_engine} image tag provided; defaulting to: {image_tag}")
 
-    log_info(f"Loading {container_engine} image...")
-    result = subprocess.run(
-        [container_engine, "load", "-i", str(tar_file)],
-        capture_output=True,
-        text=True,
-    )
-    print(result.stdout)
-    if result.returncode != 0:
-        log_error(f"Failed to load {container_engine} image from: {tar_file}\n{result.stderr}")
-        return
+    if result["stdout"]:
+        with _output_lock:
+            print(result["stdout"])
+    if result["returncode"] != 0:
+        log_error(f"Failed to load {container_engine} image from: {tar_file}\n{result['stderr']}")
+        return False
 
     # Parse "Loaded image: repo/name:tag"  or  "Loaded image ID: sha256:..."
-    loaded_ref = ""
-    m = re.search(r"Loaded image: (.+)", result.stdout)
+    loaded_ref = result.get("ref", "")
+    m = re.search(r"Loaded image: (.+)", result["stdout"])
     if m:
         loaded_ref = m.group(1).strip()
     else:
-        m = re.search(r"Loaded image ID: (.+)", result.stdout)
+        m = re.search(r"Loaded image ID: (.+)", result["stdout"])
         if m:
             loaded_ref = m.group(1).strip()
 
     if not loaded_ref:
         log_error(f"{container_engine} load output did not contain 'Loaded image:' or 'Loaded image ID:'; not tagging.")
-        return
+        return False
 
     log_info(f"Loaded image reference: {loaded_ref}")
     log_info(f"Tagging image as: {image_tag}")
@@ -607,7 +3119,7 @@ def load_docker_image(output_dir: Path, container_engine: str, image_tag: str) -
     )
     if tag_result.returncode != 0:
         log_error(f"Failed to tag image: {tag_result.stderr}")
-        return
+        return False
 
     log_info(f"Successfully tagged image as: {image_tag}")
 
@@ -621,6 +3133,7 @@ def load_docker_image(output_dir: Path, container_engine: str, image_tag: str) -
             log_info(json.dumps(json.loads(inspect_result.stdout), indent=2))
         except json.JSONDecodeError:
             log_info(inspect_result.stdout)
+    return True
 
 
 # ---------------------------------------------------------------------------
@@ -641,6 +3154,491 @@ def resolve_project_id(raw: str) -> int | None:
     return pid
 
 
+def service_name(project_id: int) -> str:
+    """The SERVICE_TO_PROJECT_ID_MAP name of project_id, or the ID itself if it isn't mapped."""
+    for svc, pid in SERVICE_TO_PROJECT_ID_MAP.items():
+        if pid == project_id:
+            return svc
+    return str(project_id)
+
+
+def resolve_services(raw: list[str]) -> list[tuple[str, int]]:
+    """
+    Resolve a list of service names / project IDs (or the single word "all")
+    into [(service, project_id), ...], preserving order and dropping duplicates.
+    Raises ArtifactError for names that aren't in the map.
+    """
+    names = [n for item in raw for n in item.replace(",", " ").split()]
+    if any(n.lower() == "all" for n in names):
+        return [(svc, SERVICE_TO_PROJECT_ID_MAP[svc]) for svc in sorted(SERVICE_TO_PROJECT_ID_MAP)]
+    targets: list[tuple[str, int]] = []
+    seen: set[int] = set()
+    for name in names:
+        pid = resolve_project_id(name)
+        if pid is None:
+            raise ArtifactError(f"Unknown service: {name}")
+        if pid not in seen:
+            seen.add(pid)
+            targets.append((name.replace("-", "_"), pid))
+    return targets
+
+
+def print_services(targets: list[tuple[str, int]], output_format: str = "text") -> None:
+    """Print (service, project_id) pairs for --list-services, one tab-separated pair per line or as JSON."""
+    if output_format == "json":
+        print(json.dumps(dict(targets), indent=2))
+        return
+    for svc, pid in targets:
+        print(f"{svc}\t{pid}")
+
+
+# ---------------------------------------------------------------------------
+# Job execution (single and batch)
+# ---------------------------------------------------------------------------
+def run_job(
+    client: GitLabClient,
+    project_id: int,
+    job_id: int,
+    output_dir: Path,
+    clean_output_dir: bool,
+    container_engine: str,
+    docker_image_tag: str,
+    output_format: str = "text",
+    show_parent: bool = False,
+    long_output: bool = False,
+    status_filter: list[str] | None = None,
+    artifact_store: ArtifactStore | None = None,
+    download_connections: int = 1,
+    stream_extract: bool = True,
+    all_files: bool = False,
+    remote_members: bool = True,
+    pipe_load: bool = False,
+    image_loader: "ImageLoader | None" = None,
+    vat_store: VatStore | None = None,
+    service: str = "",
+) -> dict:
+    """
+    Fetch job info, download/extract its artifacts and run the job handler.
+    Unless all_files is set, only the artifact members the handler reads are
+    extracted, and for jobs in JOB_REMOTE_PATHS (with remote_members) they are
+    read straight out of the remote archive.  With pipe_load, a create-tar
+    image tarball is piped into the container engine instead of being written
+    to disk.  VAT results are recorded in vat_store, if given, under service
+    (default: the map name of project_id).
+    """
+    service = service or service_name(project_id)
+    with metrics.span("job", service=service, project_id=project_id, job_id=job_id) as job_span:
+        with metrics.span("job_info"):
+            job_info = get_job_info(client, project_id, job_id)
+        job_name = job_info.get("name", "")
+        job_span.labels["job_name"] = job_name
+        log_info(f"  Job name:         {job_name}")
+
+        loaded: list[dict] = []
+        sink_for = engine_load_sinks(container_engine, loaded) if pipe_load and job_name == "create-tar" else None
+        with metrics.span("artifacts"):
+            extracted = download_and_extract(
+                client=client,
+                project_id=project_id,
+                job_id=job_id,
+                output_dir=output_dir,
+                clean_output_dir=clean_output_dir,
+                artifact_store=artifact_store,
+                expected_size=(job_info.get("artifacts_file") or {}).get("size"),
+                connections=download_connections,
+                members=None if all_files else JOB_ARTIFACT_MEMBERS.get(job_name),
+                stream_extract=stream_extract,
+                remote_paths=JOB_REMOTE_PATHS.get(job_name) if remote_members and not all_files else None,
+                sink_for=sink_for,
+            )
+            metrics.add("files_extracted", len(extracted))
+
+        dispatch_job(
+            job_name=job_name,
+            extracted=extracted,
+            output_dir=output_dir,
+            container_engine=container_engine,
+            docker_image_tag=docker_image_tag,
+            output_format=output_format,
+            show_parent=show_parent,
+            long_output=long_output,
+            status_filter=status_filter,
+            loaded=loaded,
+            image_loader=image_loader,
+            vat_store=vat_store,
+            source={
+                "service": service,
+                "project_id": project_id,
+                "job_id": job_id,
+                "ref": job_info.get("ref", ""),
+            },
+        )
+        return {"job_name": job_name, "ref": job_info.get("ref", ""), "files": len(extracted)}
+
+
+def _run_batch_target(
+    service: str,
+    project_id: int,
+    job_name: str,
+    client: GitLabClient,
+    project_branch: str,
+    job_scope: list[str] | None,
+    output_dir: Path,
+    **job_kwargs,
+) -> dict:
+    """Resolve, download and handle the latest `job_name` job for one service. Never raises."""
+    result = {"service": service, "project_id": project_id, "job_id": None, "ref": "", "files": 0, "error": ""}
+    start = time.monotonic()
+    try:
+        with metrics.span("resolve_job", service=service, project_id=project_id):
+            found = get_latest_job_id_by_name(client, project_id, job_name, project_branch, scope=job_scope)
+        if not found:
+            raise ArtifactError(f'Did not find most recent job for "{job_name}"')
+        result["job_id"], result["ref"] = found
+        log_info(f'[{service}] Found "{result["job_id"]}" (in "{result["ref"]}") as most recent job for "{job_name}"')
+        job_result = run_job(
+            client=client,
+            project_id=project_id,
+            job_id=result["job_id"],
+            output_dir=output_dir / service,
+            service=service,
+            **job_kwargs,
+        )
+        result["files"] = job_result["files"]
+    except (ArtifactError, requests.RequestException, OSError, zipfile.BadZipFile) as e:
+        log_error(f"[{service}] {e}")
+        result["error"] = str(e) or e.__class__.__name__
+    except Exception as e:
+        # anything else fails this service only, not the rest of the batch
+        result["error"] = f"{e.__class__.__name__}: {e}"
+        log_error(f"[{service}] Unexpected error: {result['error']}")
+    result["elapsed"] = time.monotonic() - start
+    return result
+
+
+def run_batch(
+    targets: list[tuple[str, int]],
+    job_name: str,
+    client: GitLabClient,
+    project_branch: str,
+    job_scope: list[str] | None,
+    output_dir: Path,
+    workers: int,
+    **job_kwargs,
+) -> list[dict]:
+    """
+    Run `job_name` for every (service, project_id) in targets through a bounded
+    thread pool; each service gets its own subdirectory of output_dir.
+    Returns one result dict per target, in target order.
+    """
+    workers = max(1, min(workers, len(targets)))
+    log_info(f"Running '{job_name}' for {len(targets)} service(s) with {workers} worker(s)")
+    results: dict[str, dict] = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="artifacts") as pool:
+        futures = {
+            pool.submit(
+                _run_batch_target,
+                service,
+                project_id,
+                job_name,
+                client,
+                project_branch,
+                job_scope,
+                output_dir,
+                **job_kwargs,
+            ): service
+            for service, project_id in targets
+        }
+        for future in as_completed(futures):
+            res = future.result()
+            status = "failed" if res["error"] else "ok"
+            log_info(f"[{res['service']}] {status} in {res['elapsed']:.1f}s")
+            results[futures[future]] = res
+    return [results[service] for service, _ in targets]
+
+
+def print_batch_results(results: list[dict]) -> None:
+    """Print an aggregated result table for a batch run."""
+    width = max([len("SERVICE")] + [len(r["service"]) for r in results])
+    print(f"\n{'SERVICE':<{width}}  {'PROJECT':>7}  {'JOB':>10}  {'FILES':>5}  {'TIME':>7}  STATUS")
+    for r in results:
+        job_id = r["job_id"] if r["job_id"] is not None else "-"
+        status = f"FAILED: {r['error']}" if r["error"] else f"ok ({r['ref']})" if r["ref"] else "ok"
+        print(
+            f"{r['service']:<{width}}  {r['project_id']:>7}  {job_id:>10}  {r['files']:>5}  "
+            f"{r['elapsed']:>6.1f}s  {status}"
+        )
+    failed = sum(1 for r in results if r["error"])
+    print(f"\n{len(results) - failed} succeeded, {failed} failed")
+
+
+# ---------------------------------------------------------------------------
+# Watch mode (--watch)
+# ---------------------------------------------------------------------------
+WATCH_INTERVAL = 60
+WATCH_MAX_INTERVAL = 900
+# Factor a quiet target's poll interval grows by, up to the maximum
+WATCH_BACKOFF = 1.5
+
+
+def parse_watch_target(spec: str) -> tuple[str, int, str, str]:
+    """Parse a SERVICE:BRANCH:JOB --watch-target (BRANCH may be empty) into (service, project_id, branch, job)."""
+    parts = spec.split(":")
+    if len(parts) != 3 or not parts[0] or not parts[2]:
+        raise ArtifactError(f"Invalid watch target {spec!r}; expected SERVICE:BRANCH:JOB (e.g. api:development:create-tar)")
+    [(service, project_id)] = resolve_services([parts[0]])
+    return service, project_id, parts[1], parts[2]
+
+
+class Watcher:
+    """
+    Long-running --watch mode over (service, project_id, branch, job name)
+    targets.  Each poll is one conditional request for the newest pipeline on
+    the branch (or the newest successful job), sent with If-None-Match; only
+    when that changed is the job name resolved again, and a new successful
+    job is handed to run_job() on a background pool, so its image is loaded
+    before anyone asks for it.  Quiet targets back off from interval to
+    max_interval, a change resets them, and all polling pauses while GitLab
+    reports its rate limit as (nearly) used up.  The last job fetched for
+    each target is kept in state_path, so a restart doesn't fetch it again.
+    """
+
+    def __init__(
+        self,
+        client: GitLabClient,
+        targets: list[tuple[str, int, str, str]],
+        output_dir: Path,
+        workers: int,
+        state_path: Path,
+        interval: float = WATCH_INTERVAL,
+        max_interval: float = WATCH_MAX_INTERVAL,
+        **job_kwargs,
+    ) -> None:
+        self.client = client
+        self.targets = targets
+        self.output_dir = output_dir
+        self.interval = interval
+        self.max_interval = max(interval, max_interval)
+        self.state_path = state_path
+        self.job_kwargs = job_kwargs
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="watch")
+        self._running: dict[int, object] = {}
+        self._lock = threading.Lock()
+        try:
+            saved = json.loads(state_path.read_text())
+        except (OSError, json.JSONDecodeError):
+            saved = {}
+        self._saved: dict[str, dict] = saved if isinstance(saved, dict) else {}
+        self._state = [
+            {
+                "etag": "",
+                "marker": None,
+                "interval": interval,
+                "job_id": (self._saved.get(self._key(t)) or {}).get("job_id"),
+                "retry": False,
+            }
+            for t in targets
+        ]
+
+    def _key(self, target: tuple[str, int, str, str]) -> str:
+        _, project_id, branch, job_name = target
+        return "|".join(str(p) for p in (self.client.gitlab_url, project_id, branch, job_name))
+
+    def _save(self) -> None:
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self._saved, indent=2))
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            log_warn(f"Could not write watch state {self.state_path}: {e}")
+
+    def _poll(self, i: int) -> float:
+        """Poll target i, starting a fetch if it has a new successful job. Returns the delay until its next poll."""
+        service, project_id, branch, job_name = self.targets[i]
+        state = self._state[i]
+        with self._lock:
+            if i in self._running:
+                return state["interval"]
+        try:
+            marker, etag = _probe_latest(self.client, project_id, branch, ["success"], state["etag"])
+            changed = marker is not None and marker != state["marker"]
+            if not changed and not state["retry"]:
+                state["interval"] = min(state["interval"] * WATCH_BACKOFF, self.max_interval)
+                return state["interval"]
+            if changed:
+                state["marker"], state["etag"] = marker, etag
+            found = _resolve_job_name(self.client, project_id, job_name, branch, ["success"], 4)
+        except (ArtifactError, requests.RequestException, ValueError) as e:
+            log_warn(f"[{service}] poll failed: {e}")
+            state["interval"] = min(state["interval"] * 2, self.max_interval)
+            return state["interval"]
+
+        if found and found[0] != state["job_id"]:
+            job_id, ref = found
+            log_info(f'[{service}] New successful "{job_name}" job {job_id} (in "{ref}"); fetching')
+            with self._lock:
+                self._running[i] = self._pool.submit(metrics.bind(self._fetch), i, job_id, ref)
+            state["interval"] = self.interval
+        elif changed:
+            # something is happening on the branch (e.g. a running pipeline): keep polling briskly
+            state["interval"] = self.interval
+            state["retry"] = False
+        else:
+            state["interval"] = min(state["interval"] * WATCH_BACKOFF, self.max_interval)
+            state["retry"] = False
+        return state["interval"]
+
+    def _fetch(self, i: int, job_id: int, ref: str) -> None:
+        target = self.targets[i]
+        service, project_id, _, job_name = target
+        state = self._state[i]
+        start = time.monotonic()
+        error = ""
+        files = 0
+        try:
+            files = run_job(
+                client=self.client,
+                project_id=project_id,
+                job_id=job_id,
+                output_dir=self.output_dir / service / job_name,
+                service=service,
+                **self.job_kwargs,
+            )["files"]
+        except (ArtifactError, requests.RequestException, OSError, zipfile.BadZipFile) as e:
+            error = str(e) or e.__class__.__name__
+            log_error(f"[{service}] {e}")
+        except Exception as e:
+            # anything else (bad job JSON, a malformed zip, the VAT store) must not stop this target being watched
+            error = f"{e.__class__.__name__}: {e}"
+            log_error(f"[{service}] Unexpected error fetching job {job_id}: {error}")
+        elapsed = time.monotonic() - start
+        with self._lock:
+            if error:
+                # try again on a later poll, after the usual backoff
+                state["retry"] = True
+            else:
+                state["job_id"] = job_id
+                state["retry"] = False
+                self._saved[self._key(target)] = {"job_id": job_id, "ref": ref, "fetched": time.time()}
+                self._save()
+            del self._running[i]
+        status = f"FAILED: {error}" if error else f"ok, {files} file(s)"
+        with _output_lock:
+            print(f"{time.strftime('%Y-%m-%d %H:%M:%S')}  {service}  {job_name}  job {job_id} ({ref}): {status} in {elapsed:.1f}s")
+            sys.stdout.flush()
+        metrics.checkpoint()
+
+    def run(self, stop: threading.Event) -> None:
+        """Poll until stop is set, then wait for fetches in progress."""
+        log_info(
+            f"Watching {len(self.targets)} target(s) every {self.interval:g}s "
+            f"(backing off to {self.max_interval:g}s when quiet)"
+        )
+        # spread the first polls over a second so a long target list doesn't burst
+        now = time.monotonic()
+        spread = 1.0 / max(1, len(self.targets))
+        queue = [(now + n * spread, n) for n in range(len(self.targets))]
+        heapq.heapify(queue)
+        try:
+            while not stop.is_set():
+                throttle = self.client.throttle_delay()
+                if throttle > 0:
+                    log_warn(f"GitLab rate limit nearly used up; pausing polls for {throttle:.0f}s")
+                    stop.wait(throttle)
+                    continue
+                due, i = queue[0]
+                if due > time.monotonic():
+                    stop.wait(due - time.monotonic())
+                    continue
+                heapq.heappop(queue)
+                delay = self._poll(i)
+                # jitter so targets polled together drift apart
+                heapq.heappush(queue, (time.monotonic() + delay * random.uniform(0.9, 1.1), i))
+        finally:
+            log_info("Stopping watch; waiting for fetches in progress...")
+            self._pool.shutdown(wait=True)
+
+
+def watch_main(
+    args: argparse.Namespace,
+    client: GitLabClient,
+    artifact_store: ArtifactStore | None,
+    download_connections: int,
+    project_branch: str,
+    job_names_raw: str,
+    output_dir: Path,
+    _tmp_dir: str | None,
+    vat_store: VatStore | None = None,
+    clean_output_dir: bool = True,
+    stream_extract: bool = True,
+    remote_members: bool = True,
+    pipe_load: bool = False,
+) -> None:
+    """--watch half of main(): build the targets, then poll until SIGINT/SIGTERM."""
+    try:
+        targets = [parse_watch_target(spec) for spec in args.watch_target or []]
+        services = args.services or ([args.project_id] if args.project_id else [])
+        job_names = job_names_raw.replace(",", " ").split()
+        if services:
+            if not job_names or any(name.isdigit() for name in job_names):
+                raise ArtifactError("Watch mode requires job names (e.g. -j create-tar,vat); job IDs are per-project")
+            targets += [
+                (service, project_id, project_branch, name)
+                for service, project_id in resolve_services(services)
+                for name in job_names
+            ]
+        if not targets:
+            raise ArtifactError("Nothing to watch; give -s/-p with -j, or --watch-target SERVICE:BRANCH:JOB")
+    except ArtifactError as e:
+        log_error(str(e))
+        sys.exit(1)
+
+    container_engine = os.environ.get("CONTAINER_ENGINE", "docker")
+    check_dependencies(load_image=True, container_engine=container_engine)
+    interval = args.poll_interval or float(os.environ.get("WATCH_INTERVAL") or WATCH_INTERVAL)
+    max_interval = args.max_poll_interval or float(os.environ.get("WATCH_MAX_INTERVAL") or WATCH_MAX_INTERVAL)
+    workers = args.workers or int(os.environ.get("BATCH_WORKERS", "4"))
+    state_path = Path(os.environ.get("CACHE_DIR") or default_cache_dir()) / "watch.json"
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    image_loader = ImageLoader(container_engine)
+    with client, image_loader:
+        watcher = Watcher(
+            client,
+            targets,
+            output_dir,
+            workers,
+            state_path,
+            interval=interval,
+            max_interval=max_interval,
+            clean_output_dir=clean_output_dir,
+            container_engine=container_engine,
+            docker_image_tag="",
+            output_format=args.output_format,
+            show_parent=args.show_parent,
+            long_output=args.long_output,
+            status_filter=args.status_filter,
+            artifact_store=artifact_store,
+            download_connections=download_connections,
+            stream_extract=stream_extract,
+            all_files=args.all_files,
+            remote_members=remote_members,
+            pipe_load=pipe_load,
+            image_loader=image_loader,
+            vat_store=vat_store,
+        )
+        try:
+            watcher.run(stop)
+        except KeyboardInterrupt:
+            stop.set()
+    if vat_store:
+        vat_store.close()
+    if _tmp_dir:
+        shutil.rmtree(_tmp_dir, ignore_errors=True)
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -653,6 +3651,14 @@ def main() -> None:
     parser.add_argument("-p", "--project-id", dest="project_id", help="GitLab project ID or service name")
     parser.add_argument("-b", "--project-branch", dest="project_branch", help="GitLab project branch name")
     parser.add_argument("-j", "--job-id", dest="job_id", help="GitLab job ID (or job name)")
+    parser.add_argument(
+        "--job-scope",
+        dest="job_scope",
+        action="append",
+        metavar="STATUS",
+        help="Only match jobs with this status when resolving a job name (repeatable; e.g. success). "
+        "Default: $JOB_SCOPE or any status",
+    )
     parser.add_argument("-t", "--tag", dest="docker_image_tag", help="Docker image tag to apply after loading")
     parser.add_argument("-k", "--token", dest="token", help="GitLab access token")
     parser.add_argument("-o", "--output-dir", dest="output_dir", help="Output directory (default: temp dir)")
@@ -691,15 +3697,162 @@ def main() -> None:
         help="Filter findings by status (repeatable); e.g. 'Needs Justification'. "
         "Only applies with --long. If omitted, all statuses shown.",
     )
+    parser.add_argument(
+        "-s",
+        "--services",
+        dest="services",
+        nargs="+",
+        metavar="SERVICE",
+        help="Batch mode: run the --job-id job name for each listed service/project ID (or 'all') concurrently",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        type=int,
+        default=None,
+        help="Batch mode: maximum concurrent services (default: $BATCH_WORKERS or 4)",
+    )
+    parser.add_argument(
+        "--pool-size",
+        dest="pool_size",
+        type=int,
+        default=None,
+        help="Maximum pooled keep-alive connections to GitLab (default: $GITLAB_POOL_SIZE or 10)",
+    )
+    parser.add_argument(
+        "-c",
+        "--connections",
+        dest="connections",
+        type=int,
+        default=None,
+        help="Parallel ranged connections per large artifact download (default: $DOWNLOAD_CONNECTIONS or 1)",
+    )
+    parser.add_argument(
+        "-A",
+        "--all-files",
+        dest="all_files",
+        action="store_true",
+        help="Extract every artifact file, not just the ones the job handler reads (*.tar for create-tar, *.json for vat)",
+    )
+    parser.add_argument(
+        "--pipe-load",
+        dest="pipe_load",
+        action="store_true",
+        help="Pipe the create-tar image tarball straight into '<engine> load' instead of extracting it to disk ($PIPE_LOAD)",
+    )
+    parser.add_argument(
+        "--vat-store",
+        dest="vat_store",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="PATH",
+        help="Record VAT results in a SQLite store (default path: $VAT_STORE or <cache dir>/vat.sqlite); "
+        "setting $VAT_STORE enables this too",
+    )
+    parser.add_argument(
+        "--vat-query",
+        dest="vat_query",
+        nargs="+",
+        metavar="QUERY",
+        help="Answer a query from the VAT store without contacting GitLab: 'cve <ID>' (images carrying it), "
+        "'status <STATUS>' (count per service) or 'changes' (since each service's previous run). "
+        "Uses -f and -P",
+    )
+    parser.add_argument(
+        "--list-services",
+        "--resolve-only",
+        dest="list_services",
+        action="store_true",
+        help="Print service names and project IDs and exit, without contacting GitLab; "
+        "with -s/-p, only resolve those (exit 1 if one is unknown)",
+    )
+    parser.add_argument(
+        "--metrics",
+        dest="metrics_file",
+        metavar="PATH",
+        help="Write per-phase timings and counters at exit (and after every fetch with --watch): JSON lines, "
+        "or a Prometheus textfile if PATH ends in .prom (default: $METRICS_FILE)",
+    )
+    parser.add_argument(
+        "--watch",
+        dest="watch",
+        action="store_true",
+        help="Keep running: poll the -s/-p services for new successful -j jobs (comma-separated names allowed) "
+        "and fetch and load each one in the background as it appears",
+    )
+    parser.add_argument(
+        "--watch-target",
+        dest="watch_target",
+        action="append",
+        metavar="SERVICE:BRANCH:JOB",
+        help="Watch one service/branch/job name (repeatable; BRANCH may be empty); implies --watch",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        dest="poll_interval",
+        type=float,
+        default=None,
+        help=f"Watch mode: seconds between polls of an active target (default: $WATCH_INTERVAL or {WATCH_INTERVAL})",
+    )
+    parser.add_argument(
+        "--max-poll-interval",
+        dest="max_poll_interval",
+        type=float,
+        default=None,
+        help=f"Watch mode: longest poll interval a quiet target backs off to "
+        f"(default: $WATCH_MAX_INTERVAL or {WATCH_MAX_INTERVAL})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="no_cache",
+        action="store_true",
+        help="Don't use the on-disk job and artifact caches ($CACHE_DIR, default ~/.cache/gitlab-artifacts-download)",
+    )
     args = parser.parse_args()
 
     logging.getLogger().setLevel(getattr(logging, args.log_level.upper()))
     load_local_env()
 
+    metrics_file = args.metrics_file or os.environ.get("METRICS_FILE", "")
+    if metrics_file:
+        metrics.enable(Path(metrics_file))
+
+    if args.list_services:
+        raw = args.services or ([args.project_id] if args.project_id else [])
+        try:
+            targets = resolve_services(raw) if raw else sorted(SERVICE_TO_PROJECT_ID_MAP.items())
+        except ArtifactError as e:
+            log_error(str(e))
+            sys.exit(1)
+        print_services([(service_name(pid) if svc.isdigit() else svc, pid) for svc, pid in targets], args.output_format)
+        return
+
+    # VAT store queries are answered from disk alone, before any prompt or API call
+    vat_store_path = Path(
+        args.vat_store
+        or os.environ.get("VAT_STORE")
+        or Path(os.environ.get("CACHE_DIR") or default_cache_dir()) / "vat.sqlite"
+    )
+    if args.vat_query:
+        if not vat_store_path.exists():
+            log_error(f"No VAT store at {vat_store_path}; record one with --vat-store first")
+            sys.exit(1)
+        store = VatStore(vat_store_path)
+        try:
+            sys.exit(run_vat_query(store, args.vat_query, args.output_format, args.show_parent))
+        finally:
+            store.close()
+    vat_store = None
+    if args.vat_store is not None or os.environ.get("VAT_STORE"):
+        vat_store = VatStore(vat_store_path)
+
     # CLI args win over env; env already loaded above via load_local_env()
     gitlab_url = args.gitlab_url or os.environ.get("GITLAB_URL", "")
     project_id_raw = args.project_id or os.environ.get("PROJECT_ID", "")
     project_branch = args.project_branch or os.environ.get("PROJECT_BRANCH", "")
+    job_scope = args.job_scope or os.environ.get("JOB_SCOPE", "").replace(",", " ").split()
     job_id_raw = args.job_id or os.environ.get("JOB_ID", "")
     docker_image_tag = args.docker_image_tag or os.environ.get("DOCKER_IMAGE_TAG", "")
     token = args.token or os.environ.get("GITLAB_ACCESS_TOKEN", "")
@@ -707,6 +3860,9 @@ def main() -> None:
     container_engine = os.environ.get("CONTAINER_ENGINE", "docker")
     output_dir_str = args.output_dir or os.environ.get("OUTPUT_DIR", "")
     clean_output_dir = os.environ.get("CLEAN_OUTPUT_DIR", "true").lower() == "true"
+    stream_extract = os.environ.get("STREAM_EXTRACT", "true").lower() == "true"
+    remote_members = os.environ.get("REMOTE_EXTRACT", "true").lower() == "true"
+    pipe_load = args.pipe_load or os.environ.get("PIPE_LOAD", "false").lower() == "true"
 
     if output_dir_str:
         output_dir = Path(output_dir_str)
@@ -728,6 +3884,62 @@ def main() -> None:
     else:
         log_info("GITLAB_ACCESS_TOKEN is already set (value hidden)")
 
+    pool_size = args.pool_size or int(os.environ.get("GITLAB_POOL_SIZE", "10"))
+    if (args.services or args.watch or args.watch_target) and (not gitlab_url or not token):
+        log_error("GITLAB_URL and GITLAB_ACCESS_TOKEN must be set")
+        sys.exit(1)
+    download_connections = max(1, args.connections or int(os.environ.get("DOWNLOAD_CONNECTIONS", "1")))
+    concurrent = args.services or args.watch or args.watch_target
+    workers = (args.workers or int(os.environ.get("BATCH_WORKERS", "4"))) if concurrent else 1
+    # every batch/watch worker and download segment holds a connection, so never pool fewer than that
+    pool_size = max(pool_size, workers * download_connections)
+    job_cache = None
+    artifact_store = None
+    if not args.no_cache:
+        cache_dir = Path(os.environ.get("CACHE_DIR") or default_cache_dir())
+        job_cache = JobCache(cache_dir / "jobs.json", ttl=float(os.environ.get("JOB_CACHE_TTL", "3600")))
+        max_gb = float(os.environ.get("ARTIFACT_CACHE_MAX_GB", "20"))
+        if max_gb > 0:
+            artifact_store = ArtifactStore(cache_dir / "artifacts", max_bytes=int(max_gb * 1024**3))
+    client = GitLabClient(gitlab_url, token, pool_size=pool_size, job_cache=job_cache)
+
+    if args.watch or args.watch_target:
+        watch_main(
+            args,
+            client,
+            artifact_store,
+            download_connections,
+            project_branch,
+            job_id_raw,
+            output_dir,
+            _tmp_dir,
+            vat_store,
+            clean_output_dir=clean_output_dir,
+            stream_extract=stream_extract,
+            remote_members=remote_members,
+            pipe_load=pipe_load,
+        )
+        return
+
+    if args.services:
+        run_batch_main(
+            args,
+            client,
+            artifact_store,
+            download_connections,
+            project_branch,
+            job_scope,
+            job_id_raw,
+            output_dir,
+            _tmp_dir,
+            vat_store,
+            clean_output_dir=clean_output_dir,
+            stream_extract=stream_extract,
+            remote_members=remote_members,
+            pipe_load=pipe_load,
+        )
+        return
+
     # Project ID resolution
     project_id: int
     if project_id_raw:
@@ -746,7 +3958,8 @@ def main() -> None:
     job_id: int
     if job_id_raw and not job_id_raw.isdigit():
         old_job_id = job_id_raw
-        result = get_latest_job_id_by_name(gitlab_url, project_id, token, old_job_id, project_branch)
+        with metrics.span("resolve_job", project_id=project_id):
+            result = get_latest_job_id_by_name(client, project_id, old_job_id, project_branch, scope=job_scope)
         if result:
             job_id, ref = result
             log_info(f'Found "{job_id}" (in "{ref}") as most recent job for "{old_job_id}"')
@@ -787,30 +4000,34 @@ def main() -> None:
     if docker_image_tag:
         log_info(f"  {container_engine} Image Tag (preconfigured): {docker_image_tag}")
 
-    job_info = get_job_info(gitlab_url, project_id, job_id, token)
-    job_name = job_info.get("name", "")
-    log_info(f"  Job name:         {job_name}")
-
-    extracted = download_and_extract(
-        gitlab_url=gitlab_url,
-        project_id=project_id,
-        job_id=job_id,
-        token=token,
-        output_dir=output_dir,
-        clean_output_dir=clean_output_dir,
-    )
-
-    dispatch_job(
-        job_name=job_name,
-        extracted=extracted,
-        output_dir=output_dir,
-        container_engine=container_engine,
-        docker_image_tag=docker_image_tag,
-        output_format=args.output_format,
-        show_parent=args.show_parent,
-        long_output=args.long_output,
-        status_filter=args.status_filter,
-    )
+    try:
+        run_job(
+            client=client,
+            project_id=project_id,
+            job_id=job_id,
+            output_dir=output_dir,
+            clean_output_dir=clean_output_dir,
+            container_engine=container_engine,
+            docker_image_tag=docker_image_tag,
+            output_format=args.output_format,
+            show_parent=args.show_parent,
+            long_output=args.long_output,
+            status_filter=args.status_filter,
+            artifact_store=artifact_store,
+            download_connections=download_connections,
+            stream_extract=stream_extract,
+            all_files=args.all_files,
+            remote_members=remote_members,
+            pipe_load=pipe_load,
+            vat_store=vat_store,
+        )
+    except ArtifactError as e:
+        log_error(str(e))
+        sys.exit(1)
+    finally:
+        client.close()
+        if vat_store:
+            vat_store.close()
 
     log_info("Download completed successfully!")
 
@@ -819,5 +4036,82 @@ def main() -> None:
         log_info(f"Removed temp directory: {_tmp_dir}")
 
 
+def run_batch_main(
+    args: argparse.Namespace,
+    client: GitLabClient,
+    artifact_store: ArtifactStore | None,
+    download_connections: int,
+    project_branch: str,
+    job_scope: list[str] | None,
+    job_name: str,
+    output_dir: Path,
+    _tmp_dir: str | None,
+    vat_store: VatStore | None = None,
+    clean_output_dir: bool = True,
+    stream_extract: bool = True,
+    remote_members: bool = True,
+    pipe_load: bool = False,
+) -> None:
+    """Batch-mode half of main(): validate, run every service concurrently, print the result table."""
+    try:
+        targets = resolve_services(args.services)
+    except ArtifactError as e:
+        log_error(str(e))
+        sys.exit(1)
+    if not job_name or job_name.isdigit():
+        log_error("Batch mode requires a job name (e.g. -j create-tar); job IDs are per-project")
+        sys.exit(1)
+
+    container_engine = os.environ.get("CONTAINER_ENGINE", "docker")
+    if args.docker_image_tag or os.environ.get("DOCKER_IMAGE_TAG", ""):
+        log_warn("Ignoring DOCKER_IMAGE_TAG in batch mode; tags are derived from each tar file name")
+    workers = args.workers or int(os.environ.get("BATCH_WORKERS", "4"))
+    check_dependencies(load_image=True, container_engine=container_engine)
+
+    image_loader = ImageLoader(container_engine)
+    with client, image_loader:
+        results = run_batch(
+            targets,
+            job_name,
+            client,
+            project_branch,
+            job_scope,
+            output_dir,
+            workers,
+            clean_output_dir=clean_output_dir,
+            container_engine=container_engine,
+            docker_image_tag="",
+            output_format=args.output_format,
+            show_parent=args.show_parent,
+            long_output=args.long_output,
+            status_filter=args.status_filter,
+            artifact_store=artifact_store,
+            download_connections=download_connections,
+            stream_extract=stream_extract,
+            all_files=args.all_files,
+            remote_members=remote_members,
+            pipe_load=pipe_load,
+            image_loader=image_loader,
+            vat_store=vat_store,
+        )
+    if vat_store:
+        vat_store.close()
+    print_batch_results(results)
+
+    if _tmp_dir:
+        shutil.rmtree(_tmp_dir, ignore_errors=True)
+        log_info(f"Removed temp directory: {_tmp_dir}")
+    if any(r["error"] for r in results):
+        sys.exit(1)
+
+
 if __name__ == "__main__":
-    main()
+    _exit_code = 1
+    try:
+        main()
+        _exit_code = 0
+    except SystemExit as e:
+        _exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+        raise
+    finally:
+        metrics.flush(_exit_code)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Microbenchmark for the per-packet address handling in subnets-from-broadcast.py.
+#
+# Compares what the packet loop costs per IPv4 packet when every MAC/IP is turned into netaddr
+# objects (and compared against freshly built broadcast EUI/IPAddress objects, as the script used
+# to do) with the native-int pipeline, with and without the broadcast prefilter the script applies
+# before parsing. Parsing every packet alone is measured as a reference.
+#
+# Before the timings, the synthetic capture is also grown between two --state runs with --jobs to
+# check that resuming ends up with the same sighting counts as a one-shot run (and as a --merge of it).
+#
+#   ./benchmark-host-pairs.py                    # synthetic capture of --packets packets
+#   ./benchmark-host-pairs.py -i capture.pcap    # or real captures
+
+import argparse
+import importlib.util
+import os
+import random
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import netaddr
+
+from collections import namedtuple
+
+###################################################################################################
+script_path = os.path.dirname(os.path.realpath(__file__))
+
+spec = importlib.util.spec_from_file_location('subnets_from_broadcast', os.path.join(script_path, 'subnets-from-broadcast.py'))
+sfb = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sfb)
+
+Host = namedtuple("Host", ["mac", "ip"])
+
+
+###################################################################################################
+# synthetic capture: Ethernet/IPv4/UDP frames, broadcastRatio of them to a directed broadcast address
+def writeCapture(fileName, packets, broadcastRatio, seed):
+    rng = random.Random(seed)
+    with open(fileName, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, sfb.LINKTYPE_ETHERNET))
+        for i in range(packets):
+            net = (10 << 24) | (rng.randrange(256) << 16) | (rng.randrange(16) << 8)
+            srcMac = rng.getrandbits(48) & ~(1 << 40)
+            srcIp = net | rng.randrange(1, 255)
+            if rng.random() < broadcastRatio:
+                dstMac, dstIp = sfb.BROADCAST_MAC, net | 0xFF
+            else:
+                dstMac, dstIp = rng.getrandbits(48) & ~(1 << 40), net | rng.randrange(1, 255)
+            ip = struct.pack('!BBHHHBBHII', 0x45, 0, 28, i & 0xFFFF, 0, 64, 17, 0, srcIp, dstIp)
+            frame = dstMac.to_bytes(6, 'big') + srcMac.to_bytes(6, 'big') + b'\x08\x00' + ip + bytes(8)
+            f.write(struct.pack('<IIII', i // 1000, i % 1000, len(frame), len(frame)) + frame)
+
+
+###################################################################################################
+# per-packet loops
+def parseOnly(chunks):
+    for chunk in chunks:
+        for _ in sfb.ipv4HostPairs(chunk):
+            pass
+
+
+def netaddrObjects(chunks):
+    ipv4Pairs = list()
+    for chunk in chunks:
+        for srcMac, srcIp, dstMac, dstIp, _, _ in sfb.ipv4HostPairs(chunk):
+            pair = sorted(
+                [
+                    Host(netaddr.EUI(srcMac), netaddr.IPAddress(srcIp)),
+                    Host(netaddr.EUI(dstMac), netaddr.IPAddress(dstIp)),
+                ]
+            )
+            ipv4Pairs.append(pair)
+    return [
+        x
+        for pair in ipv4Pairs
+        for x in pair
+        if x.mac == netaddr.EUI('ff-ff-ff-ff-ff-ff') and x.ip != netaddr.IPAddress('255.255.255.255')
+    ]
+
+
+def nativeInts(chunks):
+    subnets = sfb.BroadcastSubnets()
+    for chunk in chunks:
+        for ip, vlan, ts in sfb.broadcastAddresses(sfb.ipv4HostPairs(chunk)):
+            subnets.add(ip, vlan, ts)
+    return subnets.networks()
+
+
+def prefiltered(chunks):
+    subnets = sfb.BroadcastSubnets()
+    for chunk in chunks:
+        for ip, vlan, ts in sfb.broadcastAddresses(sfb.ipv4HostPairs(chunk, broadcastOnly=True)):
+            subnets.add(ip, vlan, ts)
+    return subnets.networks()
+
+
+CASES = [
+    ('parse only', parseOnly),
+    ('netaddr objects', netaddrObjects),
+    ('native ints', nativeInts),
+    ('prefiltered', prefiltered),
+]
+
+
+def countIpv4(chunks):
+    return sum(1 for chunk in chunks for _ in sfb.ipv4HostPairs(chunk))
+
+
+def measure(fn, chunks, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(chunks)
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn(chunks)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak
+
+
+###################################################################################################
+# --state resume check
+def stateCounts(fileName):
+    subnets = sfb.BroadcastSubnets()
+    sfb.loadState(fileName, subnets, missingOk=False)
+    return {key: count for key, (_, _, count) in subnets.sightings.items()}
+
+
+def checkResume(fileName, workDir, jobs):
+    """
+    Read fileName in two --state runs, growing it in between, and in one; the sighting counts
+    (and those of a --merge of the resumed state) have to be the same.
+    """
+    size = os.path.getsize(fileName)
+    # small enough for both runs to be split across the workers
+    splitMb = str(size / 4 / 1024 / 1024)
+
+    def run(*args):
+        subprocess.run(
+            [sys.executable, spec.origin, '--sensor', 'bench', '-j', str(jobs), '--split-size', splitMb, *args],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+
+    oneShot, resumed, merged = (os.path.join(workDir, f'{name}.json') for name in ('one-shot', 'resumed', 'merged'))
+    run('-i', fileName, '--state', oneShot)
+    with open(fileName, 'rb') as f:
+        data = f.read()
+    cut = next(sfb.pcapSplits(data, size // 2))[0]
+    growing = os.path.join(workDir, 'growing.pcap')
+    with open(growing, 'wb') as f:
+        # and a partial record, as a capture being written would have
+        f.write(data[: cut + 4])
+    run('-i', growing, '--state', resumed)
+    with open(growing, 'r+b') as f:
+        f.seek(cut)
+        f.write(data[cut:])
+    run('-i', growing, '--state', resumed)
+    run('--merge', resumed, '--state', merged)
+    expected = stateCounts(oneShot)
+    return (stateCounts(resumed) == expected) and (stateCounts(merged) == expected)
+
+
+###################################################################################################
+# main
+def main():
+    parser = argparse.ArgumentParser(description='Per-packet cost of netaddr objects vs. native ints in subnets-from-broadcast.py')
+    parser.add_argument('-i', '--input', dest='input', nargs='*', type=str, default=None, help="Capture file(s) (default: a synthetic one)")
+    parser.add_argument('--packets', dest='packets', type=int, default=200000, help="Packets in the synthetic capture (default: 200000)")
+    parser.add_argument('--broadcast', dest='broadcast', type=float, default=0.05, help="Share of synthetic packets sent to a broadcast address (default: 0.05)")
+    parser.add_argument('--repeat', dest='repeat', type=int, default=3, help="Runs per case; the median is reported (default: 3)")
+    parser.add_argument('--seed', dest='seed', type=int, default=0)
+    parser.add_argument('--jobs', dest='jobs', type=int, default=2, help="Worker processes for the --state resume check (default: 2)")
+    args = parser.parse_args()
+
+    tmpDir = tempfile.TemporaryDirectory(prefix='bench-sfb-')
+    synthetic = os.path.join(tmpDir.name, 'synthetic.pcap')
+    writeCapture(synthetic, args.packets, args.broadcast, args.seed)
+    files = args.input or [synthetic]
+
+    try:
+        if not checkResume(synthetic, tmpDir.name, args.jobs):
+            print(f'Resuming a grown capture with --jobs {args.jobs} gave different sighting counts than reading it once', file=sys.stderr)
+            return 1
+        chunks = [sfb.Chunk(fileName, None, None, None) for fileName in files]
+        packets = countIpv4(chunks)
+        if not packets:
+            print('No Ethernet/IPv4 packets in the input', file=sys.stderr)
+            return 1
+        print(f'{packets} IPv4 packets')
+        print(f"{'case':<18} {'seconds':>9} {'ns/packet':>10} {'peak KB':>10}")
+        for name, fn in CASES:
+            seconds, peak = measure(fn, chunks, args.repeat)
+            print(f'{name:<18} {seconds:>9.3f} {seconds / packets * 1e9:>10.0f} {peak / 1024:>10.0f}')
+    finally:
+        tmpDir.cleanup()
+    return 0
+
+
+###################################################################################################
+if __name__ == '__main__':
+    sys.exit(main())
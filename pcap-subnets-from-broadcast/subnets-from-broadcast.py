@@ -2,15 +2,24 @@
 # -*- coding: utf-8 -*-
 
 import argparse
-import itertools
+import fnmatch
+import json
 import logging
 import math
+import mmap
+import multiprocessing
 import os
+import signal
+import socket
+import struct
 import sys
+import time
 import netaddr
 
 from scapy.all import *
 from collections import namedtuple
+from datetime import datetime, timezone
+from functools import partial
 
 ###################################################################################################
 args = None
@@ -18,7 +27,38 @@ script_name = os.path.basename(__file__)
 script_path = os.path.dirname(os.path.realpath(__file__))
 orig_path = os.getcwd()
 
-Host = namedtuple("Host", ["mac", "ip"])
+# MAC and IPv4 addresses are handled as plain ints throughout; netaddr is only used for output
+BROADCAST_MAC = 0xFFFFFFFFFFFF
+BROADCAST_IP = 0xFFFFFFFF
+
+# default size of the pieces large captures are split into with --jobs, in MB
+SPLIT_SIZE_MB = 256
+
+# part of a capture file: records from byte offset start (inclusive) to end (exclusive); section
+# is the pcapng (byteOrder, linkTypes, tsScales) in effect at start. start is None for the whole file,
+# end is None for the rest of it.
+Chunk = namedtuple("Chunk", ["fileName", "start", "end", "section"])
+
+# defaults for --watch and --state
+POLL_INTERVAL = 5
+CHECKPOINT_INTERVAL = 30
+WATCH_PATTERN = '*.pcap*'
+STATE_VERSION = 2
+
+
+class Cursor(object):
+    """
+    Where to resume reading a capture file that may have grown since: the offset of the next record
+    (block, for pcapng) and the pcapng (byteOrder, linkTypes, tsScales) in effect there. offset is None for a
+    file not read yet; section is None when it's unknown, and the file has to be read from the start.
+    inode tells a file rotated in under the same name apart.
+    """
+
+    def __init__(self, inode=None, offset=None, section=('<', (), ())):
+        self.inode = inode
+        self.offset = offset
+        self.section = section
+
 
 # function to find the position of rightmost set bit
 def getPosOfRightmostSetBit(n):
@@ -40,6 +80,657 @@ def getPosOfRightMostUnsetBit(n):
     return getPosOfRightmostSetBit(~n)
 
 
+# subnet whose directed broadcast address ip looks like, as (network, prefixLen), or None
+def subnetFromBroadcast(ip):
+    prefixLen = 32 - ((getPosOfRightMostUnsetBit(ip) // 8) * 8)
+    if prefixLen > 0 and prefixLen < 32:
+        return ip & ~((1 << (32 - prefixLen)) - 1), prefixLen
+    return None
+
+
+class BroadcastSubnets(object):
+    """
+    Unique IPv4 addresses (as ints) seen with the broadcast MAC address, and the subnets inferred
+    from them as they come in. Memory grows with the number of unique addresses, not packets.
+
+    Every address is also tracked per (sensor, VLAN) with when it was first and last seen and how
+    often, and instances from other runs or sensors can be merged in.
+    """
+
+    def __init__(self, sensor=''):
+        self.sensor = sensor
+        self.addresses = set()
+        self.subnets = set()
+        # (sensor, vlan, ip) -> [firstSeen, lastSeen, count]
+        self.sightings = dict()
+
+    def add(self, ip, vlan=None, ts=None):
+        """Record an address seen (at ts, on vlan); returns its (network, prefixLen) if that's a newly seen subnet."""
+        if ip == BROADCAST_IP:
+            return None
+        self.seen((self.sensor, vlan, ip), ts, ts, 1)
+        return self.infer(ip)
+
+    def seen(self, key, first, last, count):
+        sighting = self.sightings.get(key)
+        if sighting is None:
+            self.sightings[key] = [first, last, count]
+            return
+        if (first is not None) and ((sighting[0] is None) or (first < sighting[0])):
+            sighting[0] = first
+        if (last is not None) and ((sighting[1] is None) or (last > sighting[1])):
+            sighting[1] = last
+        sighting[2] += count
+
+    def infer(self, ip):
+        """Returns the (network, prefixLen) of a new address if that's a newly seen subnet."""
+        if ip in self.addresses:
+            return None
+        self.addresses.add(ip)
+        subnet = subnetFromBroadcast(ip)
+        if (subnet is None) or (subnet in self.subnets):
+            return None
+        self.subnets.add(subnet)
+        return subnet
+
+    def merge(self, other):
+        """
+        Add another run's or sensor's sightings (first/last seen are combined, counts summed); returns
+        [(subnet, (sensor, vlan, ip))] for the subnets that are new here.
+        """
+        newSubnets = []
+        for key, (first, last, count) in other.sightings.items():
+            self.seen(key, first, last, count)
+            subnet = self.infer(key[2])
+            if subnet is not None:
+                newSubnets.append((subnet, key))
+        return newSubnets
+
+    def networks(self):
+        return sorted(netaddr.IPNetwork(subnet) for subnet in self.subnets)
+
+    def summary(self):
+        """Yield (IPNetwork, firstSeen, lastSeen, count, sensors, vlans) for every subnet, sorted by subnet."""
+        bySubnet = dict()
+        for (sensor, vlan, ip), (first, last, count) in self.sightings.items():
+            subnet = subnetFromBroadcast(ip)
+            if subnet not in self.subnets:
+                continue
+            entry = bySubnet.setdefault(subnet, [None, None, 0, set(), set()])
+            if (first is not None) and ((entry[0] is None) or (first < entry[0])):
+                entry[0] = first
+            if (last is not None) and ((entry[1] is None) or (last > entry[1])):
+                entry[1] = last
+            entry[2] += count
+            entry[3].add(sensor)
+            entry[4].add(vlan)
+        for network in self.networks():
+            first, last, count, sensors, vlans = bySubnet[(network.first, network.prefixlen)]
+            yield network, first, last, count, sorted(sensors), sorted(vlans, key=lambda v: -1 if v is None else v)
+
+
+###################################################################################################
+# lightweight pcap/pcapng reader
+#
+# Capture files are memory-mapped and only the few header fields needed here are unpacked at fixed
+# offsets. scapy is only used for encapsulations the fast path doesn't know (non-Ethernet link types,
+# MPLS, PPPoE, ...) and for files that can't be mapped (e.g., compressed captures).
+
+LINKTYPE_ETHERNET = 1
+
+ETHERTYPE_IPV4 = 0x0800
+# 802.1Q, 802.1ad and pre-standard QinQ tags
+VLAN_ETHERTYPES = frozenset((0x8100, 0x88A8, 0x9100))
+# EtherTypes scapy never finds IPv4 in: IPv6, ARP, RARP, PPPoE discovery, slow protocols, EAPOL,
+# LLDP, MACsec, PTP, loopback. Frames with any other (unknown) EtherType are handed to scapy.
+NON_IPV4_ETHERTYPES = frozenset((0x86DD, 0x0806, 0x8035, 0x8863, 0x8809, 0x888E, 0x88CC, 0x88E5, 0x88F7, 0x9000))
+
+# pcap magic (as stored) -> (byte order, seconds per timestamp fraction unit); microsecond and
+# nanosecond timestamp variants
+PCAP_MAGICS = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+}
+PCAP_HEADER_LEN = 24
+PCAP_RECORD_HEADER_LEN = 16
+
+PCAPNG_SHB = b'\x0a\x0d\x0d\x0a'
+PCAPNG_SHB_TYPE = 0x0A0D0D0A
+PCAPNG_BYTE_ORDER_LE = b'\x4d\x3c\x2b\x1a'
+PCAPNG_IDB = 1
+PCAPNG_PB = 2
+PCAPNG_SPB = 3
+PCAPNG_EPB = 6
+# if_tsresol interface option, and the default resolution without it
+PCAPNG_OPT_TSRESOL = 9
+PCAPNG_TS_SCALE = 1e-6
+
+# returned by etherIpv4() for frames only scapy can dissect
+NEEDS_SCAPY = object()
+
+# raw form of BROADCAST_MAC for the prefilter, which drops frames without it before any parsing
+BROADCAST_MAC_BYTES = b'\xff' * 6
+
+# destination and source MAC as 32+16 bit halves, and IPv4 source and destination
+ETHER_ADDRS = struct.Struct('!IHIH')
+IPV4_ADDRS = struct.Struct('!II')
+
+
+def pcapRecords(buf, start=PCAP_HEADER_LEN, end=None, cursor=None):
+    """
+    Yield (linkType, offset, capLen, timestamp) for every record of a memory-mapped pcap file. A
+    cursor is advanced past every complete record; an incomplete one at the end is left for next time.
+    """
+    endian, scale = PCAP_MAGICS[bytes(buf[:4])]
+    linkType = struct.unpack_from(endian + 'I', buf, 20)[0] & 0xFFFF
+    recordAt = struct.Struct(endian + 'II4xI').unpack_from
+    size = len(buf)
+    end = size if end is None else end
+    offset = start
+    while offset + PCAP_RECORD_HEADER_LEN <= end:
+        seconds, fraction, capLen = recordAt(buf, offset)
+        offset += PCAP_RECORD_HEADER_LEN
+        if offset + capLen > size:
+            if cursor is None:
+                logging.warning(f'Truncated pcap record at offset {offset - PCAP_RECORD_HEADER_LEN}')
+            return
+        if cursor is not None:
+            cursor.offset = offset + capLen
+        yield linkType, offset, capLen, seconds + fraction * scale
+        offset += capLen
+
+
+def pcapngInterface(buf, offset, blockLen, endian):
+    """(linkType, seconds per timestamp unit) from the interface description block at offset."""
+    linkType = struct.unpack_from(endian + 'H', buf, offset + 8)[0]
+    scale = PCAPNG_TS_SCALE
+    pos = offset + 16
+    while pos + 4 <= offset + blockLen - 4:
+        code, length = struct.unpack_from(endian + 'HH', buf, pos)
+        if code == 0:
+            break
+        if (code == PCAPNG_OPT_TSRESOL) and (length >= 1):
+            resolution = buf[pos + 4]
+            scale = 2.0 ** -(resolution & 0x7F) if resolution & 0x80 else 10.0**-resolution
+        pos += 4 + ((length + 3) & ~3)
+    return linkType, scale
+
+
+def pcapngRecords(buf, start=0, end=None, section=('<', (), ()), cursor=None):
+    """
+    Yield (linkType, offset, capLen, timestamp) for every packet block of a memory-mapped pcapng file
+    (timestamp is None for simple packet blocks, which have none). A cursor is advanced past every
+    complete block; an incomplete one at the end is left for next time.
+    """
+    size = len(buf)
+    end = size if end is None else end
+    offset = start
+    endian, linkTypes, scales = section[0], list(section[1]), list(section[2])
+    while offset + 12 <= end:
+        if buf[offset : offset + 4] == PCAPNG_SHB:
+            # each section header sets the byte order and starts a new list of interfaces
+            endian = '<' if buf[offset + 8 : offset + 12] == PCAPNG_BYTE_ORDER_LE else '>'
+            linkTypes, scales = [], []
+        blockType, blockLen = struct.unpack_from(endian + 'II', buf, offset)
+        if blockLen < 12 or offset + blockLen > size:
+            if cursor is None:
+                logging.warning(f'Truncated pcapng block at offset {offset}')
+            return
+        if cursor is not None:
+            cursor.offset = offset + blockLen
+        if blockType == PCAPNG_EPB:
+            ifId, tsHigh, tsLow, capLen = struct.unpack_from(endian + 'IIII', buf, offset + 8)
+            yield linkTypes[ifId], offset + 28, capLen, ((tsHigh << 32) | tsLow) * scales[ifId]
+        elif blockType == PCAPNG_SPB:
+            origLen = struct.unpack_from(endian + 'I', buf, offset + 8)[0]
+            yield linkTypes[0], offset + 12, min(origLen, blockLen - 16), None
+        elif blockType == PCAPNG_PB:
+            ifId, tsHigh, tsLow, capLen = struct.unpack_from(endian + 'H2xIII', buf, offset + 8)
+            yield linkTypes[ifId], offset + 28, capLen, ((tsHigh << 32) | tsLow) * scales[ifId]
+        elif blockType == PCAPNG_IDB:
+            linkType, scale = pcapngInterface(buf, offset, blockLen, endian)
+            linkTypes.append(linkType)
+            scales.append(scale)
+        if (cursor is not None) and (blockType in (PCAPNG_IDB, PCAPNG_SHB_TYPE)):
+            cursor.section = (endian, tuple(linkTypes), tuple(scales))
+        offset += blockLen
+
+
+def pcapSplits(buf, splitSize, start=PCAP_HEADER_LEN):
+    """Yield (offset, None) for the first record at or after every splitSize bytes of a pcap file (from start)."""
+    capLenAt = struct.Struct(PCAP_MAGICS[bytes(buf[:4])][0] + '8xI').unpack_from
+    size = len(buf)
+    offset = start
+    nextSplit = offset + splitSize
+    while offset + PCAP_RECORD_HEADER_LEN <= size:
+        if offset >= nextSplit:
+            yield offset, None
+            nextSplit = offset + splitSize
+        offset += PCAP_RECORD_HEADER_LEN + capLenAt(buf, offset)[0]
+
+
+def pcapngSplits(buf, splitSize, start=0, section=('<', (), ())):
+    """
+    Yield (offset, section) for the first block at or after every splitSize bytes of a pcapng file
+    (from start, where section is in effect), with the (byteOrder, linkTypes, tsScales) a reader
+    starting there needs.
+    """
+    size = len(buf)
+    offset = start
+    nextSplit = start + splitSize
+    endian = section[0]
+    interfaces = list(zip(section[1], section[2]))
+    while offset + 12 <= size:
+        if offset >= nextSplit:
+            yield offset, (endian, tuple(i[0] for i in interfaces), tuple(i[1] for i in interfaces))
+            nextSplit = offset + splitSize
+        if buf[offset : offset + 4] == PCAPNG_SHB:
+            endian = '<' if buf[offset + 8 : offset + 12] == PCAPNG_BYTE_ORDER_LE else '>'
+            interfaces = []
+        blockType, blockLen = struct.unpack_from(endian + 'II', buf, offset)
+        if blockLen < 12:
+            return
+        if blockType == PCAPNG_IDB:
+            interfaces.append(pcapngInterface(buf, offset, blockLen, endian))
+        offset += blockLen
+
+
+def captureChunks(fileName, splitSize, cursor=None):
+    """
+    Split a capture file at record boundaries into Chunks of about splitSize bytes; with a Cursor,
+    only the part from where it points on. The last Chunk runs to the end of the file.
+    """
+    start, section = (cursor.offset, cursor.section) if cursor is not None else (None, None)
+    whole = [Chunk(fileName, start, None, section)]
+    with open(fileName, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            return whole
+        with buf:
+            if len(buf) - (start or 0) <= splitSize:
+                return whole
+            if buf[:4] in PCAP_MAGICS:
+                start = PCAP_HEADER_LEN if start is None else start
+                splits = [(start, None)] + list(pcapSplits(buf, splitSize, start))
+            elif buf[:4] == PCAPNG_SHB:
+                start, section = (0, ('<', (), ())) if start is None else (start, section)
+                splits = [(start, section)] + list(pcapngSplits(buf, splitSize, start, section))
+            else:
+                # compressed or otherwise not mappable by us, scapy has to read it start to finish
+                return whole
+    ends = [offset for offset, _ in splits[1:]] + [None]
+    return [Chunk(fileName, start, end, section) for (start, section), end in zip(splits, ends)]
+
+
+def etherIpv4(buf, offset, capLen, ts=None):
+    """
+    Parse an Ethernet frame for its outermost IPv4 header (after any VLAN tags). Returns
+    (srcMac, srcIp, dstMac, dstIp, vlan, ts) with addresses as ints and the outermost VLAN ID (or
+    None), None if the frame carries no IPv4, or NEEDS_SCAPY for EtherTypes only scapy knows how
+    to look into.
+    """
+    end = offset + capLen
+    pos = offset + 12
+    if pos + 2 > end:
+        return None
+    etherType = (buf[pos] << 8) | buf[pos + 1]
+    pos += 2
+    vlan = None
+    while etherType in VLAN_ETHERTYPES:
+        if pos + 4 > end:
+            return None
+        if vlan is None:
+            vlan = ((buf[pos] << 8) | buf[pos + 1]) & 0x0FFF
+        etherType = (buf[pos + 2] << 8) | buf[pos + 3]
+        pos += 4
+    if etherType == ETHERTYPE_IPV4:
+        if pos + 20 > end:
+            return None
+        dstHi, dstLo, srcHi, srcLo = ETHER_ADDRS.unpack_from(buf, offset)
+        srcIp, dstIp = IPV4_ADDRS.unpack_from(buf, pos + 12)
+        return (srcHi << 16) | srcLo, srcIp, (dstHi << 16) | dstLo, dstIp, vlan, ts
+    if etherType < 0x0600 or etherType in NON_IPV4_ETHERTYPES:
+        # 802.3 length field (LLC frames, dissected as Dot3 rather than Ether) or no IPv4 inside
+        return None
+    return NEEDS_SCAPY
+
+
+def scapyHostPair(p, ts=None):
+    """etherIpv4()'s (srcMac, srcIp, dstMac, dstIp, vlan, ts) from a scapy packet, or None if it has no Ethernet/IPv4."""
+    if (Ether in p) and (IP in p):
+        # outermost tag (Dot1AD is a Dot1Q subclass)
+        vlan = None
+        layer = p
+        while layer:
+            if isinstance(layer, Dot1Q):
+                vlan = layer.vlan
+                break
+            layer = layer.payload
+        return (
+            int(p[Ether].src.replace(':', ''), 16),
+            int.from_bytes(socket.inet_aton(p[IP].src), 'big'),
+            int(p[Ether].dst.replace(':', ''), 16),
+            int.from_bytes(socket.inet_aton(p[IP].dst), 'big'),
+            vlan,
+            ts,
+        )
+    return None
+
+
+def hostPair(buf, offset, capLen, linkType, broadcastOnly=False, ts=None):
+    """
+    etherIpv4()'s (srcMac, srcIp, dstMac, dstIp, vlan, ts) for the frame at buf[offset:offset + capLen],
+    or None if it has no Ethernet/IPv4 layers. With broadcastOnly, frames that can't have a broadcast MAC address
+    are dropped first by looking for ff:ff:ff:ff:ff:ff in the raw bytes (in the address fields for
+    Ethernet, anywhere in the frame for other link types), without decoding them.
+    """
+    if linkType == LINKTYPE_ETHERNET:
+        if broadcastOnly and (buf.find(BROADCAST_MAC_BYTES, offset, offset + 12) < 0):
+            return None
+        pair = etherIpv4(buf, offset, capLen, ts)
+        if pair is NEEDS_SCAPY:
+            pair = scapyHostPair(Ether(buf[offset : offset + capLen]), ts)
+        return pair
+    if broadcastOnly and (buf.find(BROADCAST_MAC_BYTES, offset, offset + capLen) < 0):
+        return None
+    return scapyHostPair(conf.l2types.get(linkType, conf.raw_layer)(buf[offset : offset + capLen]), ts)
+
+
+def rawHostPairs(reader, broadcastOnly=False):
+    """ipv4HostPairs() for a scapy RawPcapReader, for input that can't be memory-mapped."""
+    for data, metadata in reader:
+        # pcapng metadata carries the link type and timestamp resolution of each packet's interface
+        linkType = getattr(metadata, 'linktype', None)
+        if linkType is None:
+            linkType = reader.linktype
+            ts = metadata.sec + metadata.usec * (1e-9 if getattr(reader, 'nano', False) else 1e-6)
+        else:
+            # simple packet blocks have no timestamp
+            ts = None if metadata.tshigh is None else ((metadata.tshigh << 32) | metadata.tslow) / metadata.tsresol
+        pair = hostPair(data, 0, len(data), linkType, broadcastOnly, ts)
+        if pair is not None:
+            yield pair
+
+
+def ipv4HostPairs(chunk, useScapy=False, broadcastOnly=False, cursor=None):
+    """
+    Yield etherIpv4()'s (srcMac, srcIp, dstMac, dstIp, vlan, ts) for every packet with Ethernet and
+    IPv4 layers in a Chunk of a pcap or pcapng file, i.e., what scapy's p[Ether] and p[IP] would give
+    (with the capture timestamp in seconds, if the file has one). With
+    broadcastOnly, only packets with a broadcast MAC address are guaranteed to be included. A file
+    name of '-' reads a capture stream from stdin. With a Cursor, reading starts where it points
+    (instead of at the chunk's start) and it's advanced as records are read.
+    """
+    fileName = chunk.fileName
+    if fileName == '-':
+        with RawPcapReader(sys.stdin.buffer) as reader:
+            yield from rawHostPairs(reader, broadcastOnly)
+        return
+
+    with open(fileName, 'rb') as f:
+        if useScapy:
+            for p in PcapReader(fileName):
+                pair = scapyHostPair(p, float(p.time))
+                if pair is not None:
+                    yield pair
+            buf = None
+        else:
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # empty, or not a regular file
+                buf = None
+            if (buf is None) or ((buf[:4] not in PCAP_MAGICS) and (buf[:4] != PCAPNG_SHB)):
+                if buf is not None:
+                    buf.close()
+                    buf = None
+                    logging.info(f'{fileName} is not an uncompressed pcap/pcapng file, reading it with scapy')
+                # scapy's raw reader still lets the prefilter run before anything is dissected
+                with RawPcapReader(fileName) as reader:
+                    yield from rawHostPairs(reader, broadcastOnly)
+        if buf is None:
+            # read whole; if it grows, it has to be read from the start again
+            if cursor is not None:
+                cursor.offset, cursor.section = os.fstat(f.fileno()).st_size, None
+            return
+
+        with buf:
+            isPcap = buf[:4] in PCAP_MAGICS
+            if cursor is not None:
+                if (cursor.offset is None) or (cursor.section is None):
+                    cursor.offset, cursor.section = (PCAP_HEADER_LEN if isPcap else 0), ('<', (), ())
+                records = (
+                    pcapRecords(buf, cursor.offset, cursor=cursor)
+                    if isPcap
+                    else pcapngRecords(buf, cursor.offset, None, cursor.section, cursor)
+                )
+            elif isPcap:
+                records = pcapRecords(buf) if chunk.start is None else pcapRecords(buf, chunk.start, chunk.end)
+            else:
+                records = (
+                    pcapngRecords(buf)
+                    if chunk.start is None
+                    else pcapngRecords(buf, chunk.start, chunk.end, chunk.section)
+                )
+            for linkType, offset, capLen, ts in records:
+                pair = hostPair(buf, offset, capLen, linkType, broadcastOnly, ts)
+                if pair is not None:
+                    yield pair
+
+
+def broadcastAddresses(pairs):
+    """Yield (ip, vlan, ts) for the IPv4 addresses paired with the broadcast MAC address in ipv4HostPairs() output."""
+    for srcMac, srcIp, dstMac, dstIp, vlan, ts in pairs:
+        if srcMac == BROADCAST_MAC:
+            yield srcIp, vlan, ts
+        if dstMac == BROADCAST_MAC:
+            yield dstIp, vlan, ts
+
+
+# process pool worker: the file name and the broadcast addresses of one chunk, as a
+# BroadcastSubnets with the pool's sensor name, and for the chunk that runs to the end of the
+# file the Cursor to resume reading it at (None for the others)
+def chunkBroadcastAddresses(chunk, useScapy=False, sensor=''):
+    IP.payload_guess = []
+    subnets = BroadcastSubnets(sensor)
+    cursor = None
+    if chunk.end is None:
+        cursor = Cursor(offset=chunk.start)
+        if chunk.section is not None:
+            cursor.section = chunk.section
+    for ip, vlan, ts in broadcastAddresses(ipv4HostPairs(chunk, useScapy, broadcastOnly=True, cursor=cursor)):
+        subnets.add(ip, vlan, ts)
+    return chunk.fileName, subnets, cursor
+
+
+###################################################################################################
+# incremental state, checkpoints and streaming inputs
+
+
+def ipToStr(ip):
+    return socket.inet_ntoa(ip.to_bytes(4, 'big'))
+
+
+def strToIp(address):
+    return int.from_bytes(socket.inet_aton(address), 'big')
+
+
+def isoTime(ts):
+    return None if ts is None else datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec='seconds')
+
+
+def loadState(fileName, subnets, cursors=None, missingOk=True):
+    """
+    Add the sightings written by saveState() to subnets (quietly, as already known), and restore the
+    file Cursors into cursors unless it's None. Nothing happens if fileName doesn't exist and
+    missingOk is set (e.g., a --state file before the first run).
+    """
+    try:
+        with open(fileName, 'r') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        if missingOk:
+            return
+        raise
+    for sensor, vlan, address, first, last, count in state.get('sightings', []):
+        ip = strToIp(address)
+        subnets.seen((sensor, vlan, ip), first, last, count)
+        subnets.infer(ip)
+    # version 1 state only had the addresses
+    for address in state.get('addresses', []):
+        ip = strToIp(address)
+        subnets.seen((subnets.sensor, None, ip), None, None, 0)
+        subnets.infer(ip)
+    if cursors is not None:
+        for name, cursor in state.get('files', {}).items():
+            section = cursor.get('section')
+            if section and (len(section) < 3):
+                # version 1 didn't record timestamp resolutions, assume the default
+                section = section + [[PCAPNG_TS_SCALE] * len(section[1])]
+            cursors[name] = Cursor(
+                cursor.get('inode'),
+                cursor.get('offset'),
+                (section[0], tuple(section[1]), tuple(section[2])) if section else None,
+            )
+    logging.info(f'Loaded {len(subnets.sightings)} sighting(s) of {len(subnets.addresses)} address(es) from {fileName}')
+
+
+def saveState(fileName, subnets, cursors):
+    """
+    Write the sightings and file Cursors to fileName (atomically, via a temporary file). Sightings
+    are [sensor, vlan, address, firstSeen, lastSeen, count] lists, timestamps in epoch seconds.
+    """
+    state = {
+        'version': STATE_VERSION,
+        'sightings': [
+            [sensor, vlan, ipToStr(ip), first, last, count]
+            for (sensor, vlan, ip), (first, last, count) in sorted(
+                subnets.sightings.items(), key=lambda item: (item[0][0], -1 if item[0][1] is None else item[0][1], item[0][2])
+            )
+        ],
+        'files': {
+            name: {
+                'inode': cursor.inode,
+                'offset': cursor.offset,
+                'section': [cursor.section[0], list(cursor.section[1]), list(cursor.section[2])] if cursor.section else None,
+            }
+            for name, cursor in cursors.items()
+        },
+    }
+    tmpName = f'{fileName}.tmp'
+    with open(tmpName, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmpName, fileName)
+
+
+class Checkpoint(object):
+    """Saves state to a file at most every interval seconds, so a restart doesn't reprocess old data."""
+
+    def __init__(self, fileName, interval, subnets, cursors):
+        self.fileName = fileName
+        self.interval = interval
+        self.subnets = subnets
+        self.cursors = cursors
+        self.lastSave = time.monotonic()
+
+    def save(self, force=False):
+        if self.fileName and (force or (time.monotonic() - self.lastSave >= self.interval)):
+            saveState(self.fileName, self.subnets, self.cursors)
+            self.lastSave = time.monotonic()
+
+
+def printSubnet(subnet, asJson=False, **fields):
+    """Print a subnet as CIDR, or as a JSON line with any other fields given."""
+    network = netaddr.IPNetwork(subnet)
+    if asJson:
+        print(json.dumps({'subnet': str(network.cidr), **fields}), flush=True)
+    else:
+        print(network.cidr, flush=True)
+
+
+def readCaptureFile(fileName, cursors, subnets, report, useScapy=False, growing=False):
+    """
+    Add the broadcast addresses in the part of a capture file not read yet (per its Cursor in
+    cursors) to subnets, calling report(subnet, ip, fileName, vlan, ts) for each. growing is for
+    files that may still be written to.
+    """
+    try:
+        st = os.stat(fileName)
+    except FileNotFoundError:
+        if growing:
+            # rotated away
+            return
+        raise
+    cursor = cursors.get(fileName)
+    if (
+        (cursor is None)
+        or (cursor.inode != st.st_ino)
+        or ((cursor.offset is not None) and (st.st_size < cursor.offset))
+    ):
+        cursor = cursors[fileName] = Cursor(st.st_ino)
+    elif st.st_size == cursor.offset:
+        return
+    if growing and (st.st_size < PCAP_HEADER_LEN):
+        # file header not written yet
+        return
+    for ip, vlan, ts in broadcastAddresses(ipv4HostPairs(Chunk(fileName, None, None, None), useScapy, True, cursor)):
+        report(subnets.add(ip, vlan, ts), ip, fileName, vlan, ts)
+    if (not growing) and (cursor.offset is not None) and (cursor.offset < st.st_size):
+        logging.warning(f'{fileName}: {st.st_size - cursor.offset} byte(s) at offset {cursor.offset} not read (truncated?)')
+
+
+def watchDirectory(directory, pattern, pollInterval, cursors, subnets, report, checkpoint, useScapy=False):
+    """
+    Follow a directory of (rotating) capture files, e.g., written by tcpdump -G/-C: every
+    pollInterval seconds read new files, and whatever has been appended to known ones.
+    """
+    directory = os.path.abspath(directory)
+
+    def modified(fileName):
+        try:
+            return os.path.getmtime(fileName)
+        except FileNotFoundError:
+            return 0
+
+    while True:
+        # (scapy's star import shadows the glob module, hence fnmatch)
+        fileNames = sorted(
+            (os.path.join(directory, name) for name in fnmatch.filter(os.listdir(directory), pattern)),
+            key=lambda name: (modified(name), name),
+        )
+        # forget files that have been rotated away
+        for fileName in [name for name in cursors if os.path.dirname(name) == directory]:
+            if fileName not in fileNames:
+                del cursors[fileName]
+        for fileName in fileNames:
+            try:
+                readCaptureFile(fileName, cursors, subnets, report, useScapy=useScapy, growing=True)
+            except Exception as e:
+                # e.g., a compressed file that's only partially written; it's retried next time
+                logging.warning(f'{fileName}: {e}')
+        checkpoint.save()
+        time.sleep(pollInterval)
+
+
+def liveCapture(iface, subnets, report, checkpoint):
+    """Read frames from a network interface as they arrive (needs capture privileges)."""
+    sock = conf.L2listen(iface=iface)
+    try:
+        while True:
+            cls, data, ts = sock.recv_raw()
+            if data is not None:
+                pair = hostPair(data, 0, len(data), conf.l2types.layer2num.get(cls), broadcastOnly=True, ts=ts)
+                if pair is not None:
+                    for ip, vlan, ts in broadcastAddresses((pair,)):
+                        report(subnets.add(ip, vlan, ts), ip, iface, vlan, ts)
+            checkpoint.save()
+    finally:
+        sock.close()
+
+
 ###################################################################################################
 # main
 def main():
@@ -64,7 +755,101 @@ def main():
         type=str,
         default=None,
         required=False,
-        help="Input value(s)",
+        help="Input pcap/pcapng file(s); - reads a capture stream from stdin (e.g., tcpdump -w -)",
+    )
+    parser.add_argument(
+        '--live',
+        dest='live',
+        type=str,
+        default=None,
+        metavar='IFACE',
+        help="Capture from a network interface and print subnets as they're found",
+    )
+    parser.add_argument(
+        '--watch',
+        dest='watch',
+        type=str,
+        default=None,
+        metavar='DIR',
+        help="Follow a directory of (rotating) capture files and print subnets as they're found",
+    )
+    parser.add_argument(
+        '--pattern',
+        dest='pattern',
+        type=str,
+        default=WATCH_PATTERN,
+        help=f"With --watch, capture file name pattern (default: {WATCH_PATTERN})",
+    )
+    parser.add_argument(
+        '--poll-interval',
+        dest='pollInterval',
+        type=float,
+        default=POLL_INTERVAL,
+        help=f"With --watch, seconds between directory scans (default: {POLL_INTERVAL})",
+    )
+    parser.add_argument(
+        '--state',
+        dest='state',
+        type=str,
+        default=None,
+        metavar='FILE',
+        help="Load addresses seen and file read positions from FILE, and checkpoint them there",
+    )
+    parser.add_argument(
+        '--checkpoint-interval',
+        dest='checkpointInterval',
+        type=float,
+        default=CHECKPOINT_INTERVAL,
+        help=f"Seconds between --state checkpoints while running (default: {CHECKPOINT_INTERVAL})",
+    )
+    parser.add_argument(
+        '--json',
+        dest='json',
+        action='store_true',
+        help="Print subnets as JSON lines",
+    )
+    parser.add_argument(
+        '--sensor',
+        dest='sensor',
+        type=str,
+        default=socket.gethostname(),
+        help="Name addresses seen in this run are recorded under in --state (default: host name)",
+    )
+    parser.add_argument(
+        '--merge',
+        dest='merge',
+        nargs='*',
+        type=str,
+        default=None,
+        metavar='FILE',
+        help="Merge in --state file(s) of other runs or sensors (first/last seen are combined, counts summed)",
+    )
+    parser.add_argument(
+        '--incremental',
+        dest='incremental',
+        action='store_true',
+        help="Print each subnet as soon as it's first inferred instead of a sorted list at the end\n(implied by --live, --watch and -i -)",
+    )
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        dest='jobs',
+        type=int,
+        default=1,
+        help="Worker processes to spread input files (and pieces of large ones) across; 0 for one per CPU",
+    )
+    parser.add_argument(
+        '--split-size',
+        dest='splitSize',
+        type=float,
+        default=SPLIT_SIZE_MB,
+        help=f"With --jobs, split captures larger than this many MB at packet boundaries (default: {SPLIT_SIZE_MB})",
+    )
+    parser.add_argument(
+        '--scapy',
+        dest='scapy',
+        action='store_true',
+        help="Dissect every packet with scapy instead of the built-in pcap/pcapng reader (slow)",
     )
     try:
         parser.error = parser.exit
@@ -85,44 +870,112 @@ def main():
 
     IP.payload_guess = []
 
-    ipv4Pairs = list()
-
-    for file in args.input:
-        for p in PcapReader(file):
-            if (Ether in p) and (IP in p):
-                ipv4Pairs.append(
-                    sorted(
-                        [
-                            Host(
-                                netaddr.EUI(p[Ether].src),
-                                netaddr.IPAddress(p[IP].src),
-                            ),
-                            Host(
-                                netaddr.EUI(p[Ether].dst),
-                                netaddr.IPAddress(p[IP].dst),
-                            ),
-                        ]
+    subnets = BroadcastSubnets(args.sensor)
+    cursors = dict()
+    if args.state:
+        loadState(args.state, subnets, cursors)
+    checkpoint = Checkpoint(args.state, args.checkpointInterval, subnets, cursors)
+    inputs = args.input or []
+    incremental = args.incremental or bool(args.live) or bool(args.watch) or ('-' in inputs)
+
+    def report(subnet, ip, source, vlan=None, ts=None, sensor=None):
+        if (subnet is not None) and incremental:
+            printSubnet(
+                subnet,
+                args.json,
+                broadcast=ipToStr(ip),
+                vlan=vlan,
+                sensor=subnets.sensor if sensor is None else sensor,
+                source=source,
+                time=isoTime(ts),
+            )
+
+    for fileName in args.merge or []:
+        other = BroadcastSubnets()
+        loadState(fileName, other, missingOk=False)
+        for subnet, (sensor, vlan, ip) in subnets.merge(other):
+            report(subnet, ip, fileName, vlan, other.sightings[(sensor, vlan, ip)][0], sensor)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if args.live:
+            liveCapture(args.live, subnets, report, checkpoint)
+        elif args.watch:
+            watchDirectory(
+                args.watch, args.pattern, args.pollInterval, cursors, subnets, report, checkpoint, useScapy=args.scapy
+            )
+        else:
+            if '-' in inputs:
+                for ip, vlan, ts in broadcastAddresses(ipv4HostPairs(Chunk('-', None, None, None), broadcastOnly=True)):
+                    report(subnets.add(ip, vlan, ts), ip, 'stdin', vlan, ts)
+            fileNames = [os.path.abspath(file) for file in inputs if file != '-']
+            jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+            if jobs == 1:
+                for fileName in fileNames:
+                    readCaptureFile(fileName, cursors, subnets, report, useScapy=args.scapy)
+                    checkpoint.save()
+            else:
+                # like readCaptureFile(), only the part of a file not read yet (per --state) is split up
+                # and read; files read before that can't be resumed (e.g., compressed) are read again
+                resume = dict()
+                for fileName in fileNames:
+                    st = os.stat(fileName)
+                    cursor = cursors.get(fileName)
+                    if (
+                        (cursor is None)
+                        or (cursor.inode != st.st_ino)
+                        or (cursor.offset is None)
+                        or (st.st_size < cursor.offset)
+                    ):
+                        resume[fileName] = (st, None)
+                    elif cursor.offset == st.st_size:
+                        logging.info(f'{fileName} has already been read')
+                    else:
+                        resume[fileName] = (st, cursor if cursor.section is not None else None)
+                splitSize = max(1, int(args.splitSize * 1024 * 1024))
+                chunks = [
+                    chunk
+                    for fileName, (st, cursor) in resume.items()
+                    for chunk in (
+                        captureChunks(fileName, splitSize, cursor)
+                        if not args.scapy
+                        else [Chunk(fileName, None, None, None)]
                     )
-                )
+                ]
+                logging.info(f'Processing {len(chunks)} piece(s) of {len(resume)} file(s) with {jobs} workers')
+                # cursors only move once every piece is in, so an interrupted run reads them all again
+                finished = dict()
+                if chunks:
+                    with multiprocessing.Pool(min(jobs, len(chunks))) as pool:
+                        for fileName, found, cursor in pool.imap_unordered(
+                            partial(chunkBroadcastAddresses, useScapy=args.scapy, sensor=args.sensor), chunks
+                        ):
+                            for subnet, (sensor, vlan, ip) in subnets.merge(found):
+                                report(subnet, ip, fileName, vlan, found.sightings[(sensor, vlan, ip)][0])
+                            if cursor is not None:
+                                cursor.inode = resume[fileName][0].st_ino
+                                finished[fileName] = cursor
+                cursors.update(finished)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        checkpoint.save(force=True)
 
-    ipv4Pairs = [i for i, _ in itertools.groupby(sorted(ipv4Pairs))]
-    subnetsFromBroadcast = [
-        subnet
-        for subnet in sorted(
-            list(
-                set(
-                    [
-                        netaddr.IPNetwork(f"{x.ip}/{32 - ((getPosOfRightMostUnsetBit(int(x.ip)) // 8) * 8)}")
-                        for x in list(itertools.chain(*ipv4Pairs))
-                        if x.mac == netaddr.EUI('ff-ff-ff-ff-ff-ff') and x.ip != netaddr.IPAddress('255.255.255.255')
-                    ]
+    if not incremental:
+        if args.json:
+            for subnet, first, last, count, sensors, vlans in subnets.summary():
+                printSubnet(
+                    subnet,
+                    True,
+                    firstSeen=isoTime(first),
+                    lastSeen=isoTime(last),
+                    count=count,
+                    sensors=sensors,
+                    vlans=vlans,
                 )
-            )
-        )
-        if subnet.prefixlen > 0 and subnet.prefixlen < 32
-    ]
-    for subnet in subnetsFromBroadcast:
-        print(subnet.cidr)
+        else:
+            for subnet in subnets.networks():
+                printSubnet(subnet)
 
 
 ###################################################################################################